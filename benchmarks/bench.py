@@ -0,0 +1,235 @@
+# Times each stage of page generation over a synthetic corpus and writes the
+# results as JSON, so runs can be compared across commits. Run from the
+# project root:
+#   python3 benchmarks/bench.py --pages 200 --output bench.json
+# Comparing a --minify run against a plain one shows what minifying costs in
+# time and saves in output bytes.
+import json
+from argparse import ArgumentParser, Namespace
+from os import path
+from platform import python_version
+from subprocess import DEVNULL, CalledProcessError, check_output
+from sys import argv, path as sys_path, stderr
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+ROOT = path.join(path.dirname(path.abspath(__file__)), "..")
+sys_path.insert(0, path.join(ROOT, "src"))
+
+from corpus import CorpusGenerator, DEFAULT_MIX, parse_mix  # noqa: E402
+from markdownblock import (  # noqa: E402
+    block_to_blocktype,
+    block_to_htmlnode,
+    iter_blocks,
+    markdown_to_blocks,
+)
+from template import load_template  # noqa: E402
+from textnode import text_to_textnodes  # noqa: E402
+
+
+STAGES: tuple[str, ...] = (
+    "markdown_to_blocks",
+    "block_to_blocktype",
+    "text_to_textnodes",
+    "block_to_htmlnode",
+    "to_html",
+    "template_fill",
+    "disk_write",
+)
+# Stages that are timed on their own but also run inside a later stage, by
+# the stage they're part of. block_to_htmlnode parses each block's inline
+# markup itself, so text_to_textnodes is reported as a breakdown of it and
+# left out of total_seconds, which would otherwise count that work twice.
+NESTED_STAGES: dict[str, str] = {
+    "text_to_textnodes": "block_to_htmlnode",
+}
+
+
+def run_stages(
+    pages: list[str],
+    template_path: str,
+    out_dir: str,
+    minify: bool = False
+) -> tuple[dict, int]:
+    timings = dict.fromkeys(STAGES, 0.0)
+    output_bytes = 0
+    template = load_template(template_path)
+    if minify:
+        template = template.minified
+
+    def timed(stage: str, work):
+        start = perf_counter()
+        result = work()
+        timings[stage] += perf_counter() - start
+        return result
+
+    for index, markdown in enumerate(pages):
+        timed("markdown_to_blocks", lambda: markdown_to_blocks(markdown))
+        blocks = list(iter_blocks(markdown))
+        texts = [block.text for block in blocks]
+        timed(
+            "block_to_blocktype",
+            lambda: [block_to_blocktype(text) for text in texts]
+        )
+        timed(
+            "text_to_textnodes",
+            lambda: [
+                text_to_textnodes(" ".join(block.lines)) for block in blocks
+            ]
+        )
+        nodes = timed(
+            "block_to_htmlnode",
+            lambda: [block_to_htmlnode(block) for block in blocks]
+        )
+        content = timed(
+            "to_html",
+            lambda: "".join(node.to_html(minify) for node in nodes)
+        )
+        html = timed(
+            "template_fill",
+            lambda: template.render_to_string(
+                {"Title": f"Page {index}", "Content": content}
+            )
+        )
+        output_bytes += len(html.encode())
+        page_path = path.join(out_dir, f"page-{index}.html")
+
+        def write():
+            with open(page_path, "w") as f:
+                f.write(html)
+
+        timed("disk_write", write)
+    return timings, output_bytes
+
+
+# Prints each stage's time against a previous report, to stderr so the JSON
+# on stdout stays machine-readable.
+def compare(report: dict, baseline_path: str) -> None:
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    print(
+        f"{'stage':<20} {'baseline':>10} {'current':>10} {'change':>8}",
+        file=stderr
+    )
+    for stage, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        before = previous["ms_per_page"]
+        after = current["ms_per_page"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(
+            f"{stage:<20} {before:>10.4f} {after:>10.4f} {change:>+7.1f}%",
+            file=stderr
+        )
+    before = baseline.get("output_bytes")
+    if before:
+        after = report["output_bytes"]
+        change = (after - before) / before * 100
+        print(
+            f"{'output_bytes':<20} {before:>10} {after:>10} {change:>+7.1f}%",
+            file=stderr
+        )
+
+
+def git_commit() -> str | None:
+    try:
+        return check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            stderr=DEVNULL,
+            text=True
+        ).strip()
+    except (OSError, CalledProcessError):
+        return None
+
+
+def parse_args(args: list[str]) -> Namespace:
+    parser = ArgumentParser(description="Benchmarks page generation stages.")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--blocks", type=int, default=40,
+                        help="blocks per page")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="block weights, e.g. paragraph=6,list=2,code=1")
+    parser.add_argument("--inline-density", type=float, default=0.2,
+                        help="share of words carrying inline markup")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per stage; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--template", default=path.join(ROOT, "template.html"))
+    parser.add_argument("--minify", action="store_true",
+                        help="minify pages as they're serialized")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--baseline",
+                        help="a previous JSON report to compare against")
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args(argv[1:])
+    generator = CorpusGenerator(
+        args.blocks,
+        args.mix,
+        args.inline_density,
+        args.seed
+    )
+    pages = generator.pages(args.pages)
+    source_bytes = sum(len(page.encode()) for page in pages)
+
+    runs = []
+    with TemporaryDirectory() as out_dir:
+        for _ in range(args.repeat):
+            timings, output_bytes = run_stages(
+                pages,
+                args.template,
+                out_dir,
+                args.minify
+            )
+            runs.append(timings)
+
+    stages = {}
+    for stage in STAGES:
+        best = min(run[stage] for run in runs)
+        stages[stage] = {
+            "seconds": round(best, 6),
+            "ms_per_page": round(best * 1000 / args.pages, 4),
+        }
+        if stage in NESTED_STAGES:
+            stages[stage]["part_of"] = NESTED_STAGES[stage]
+    report = {
+        "commit": git_commit(),
+        "python": python_version(),
+        "corpus": {
+            "pages": args.pages,
+            "blocks_per_page": args.blocks,
+            "mix": args.mix,
+            "inline_density": args.inline_density,
+            "seed": args.seed,
+            "source_bytes": source_bytes,
+        },
+        "minify": args.minify,
+        "output_bytes": output_bytes,
+        "repeat": args.repeat,
+        "stages": stages,
+        "total_seconds": round(
+            sum(
+                timing["seconds"] for stage, timing in stages.items()
+                if stage not in NESTED_STAGES
+            ),
+            6
+        ),
+    }
+
+    if args.baseline:
+        compare(report, args.baseline)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Generates synthetic markdown pages for benchmarking. Pages are built from a
+# configurable mix of blocks, and the same seed always gives the same corpus.
+from os import makedirs, path
+from random import Random
+
+
+WORDS = (
+    "lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing",
+    "elit", "sed", "do", "eiusmod", "tempor", "incididunt", "labore",
+)
+INLINE = (
+    "**bold words**", "_italic_", "`code`", "[a link](/blog/tom)",
+    "[**bold** link](/contact)", "![an image](/images/tom.png)",
+)
+
+# Relative weights of each block kind in a page.
+DEFAULT_MIX: dict[str, int] = {
+    "paragraph": 6,
+    "list": 2,
+    "code": 1,
+    "quote": 1,
+    "image": 1,
+}
+
+
+# Parses a block mix given as "paragraph=6,list=2,code=1".
+def parse_mix(spec: str) -> dict[str, int]:
+    mix = {}
+    for item in spec.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"unknown block kind: {kind}")
+        mix[kind] = int(weight or 1)
+    return mix
+
+
+class CorpusGenerator():
+    def __init__(
+        self,
+        blocks_per_page: int = 40,
+        mix: dict[str, int] | None = None,
+        inline_density: float = 0.2,
+        seed: int = 0
+    ):
+        self.blocks_per_page = blocks_per_page
+        self.mix = mix or DEFAULT_MIX
+        self.inline_density = inline_density
+        self.rng = Random(seed)
+
+    def words(self, count: int) -> str:
+        words = []
+        for _ in range(count):
+            if self.rng.random() < self.inline_density:
+                words.append(self.rng.choice(INLINE))
+            else:
+                words.append(self.rng.choice(WORDS))
+        return " ".join(words)
+
+    def block(self, kind: str) -> str:
+        match kind:
+            case "paragraph":
+                lines = (self.words(12) for _ in range(self.rng.randint(2, 6)))
+                return "\n".join(lines)
+            case "list":
+                count = self.rng.randint(5, 30)
+                if self.rng.random() < 0.5:
+                    return "\n".join(f"- {self.words(8)}" for _ in range(count))
+                return "\n".join(
+                    f"{i}. {self.words(8)}" for i in range(1, count + 1)
+                )
+            case "code":
+                body = (
+                    f"    value_{i} = compute(**kwargs)  # {self.words(3)}"
+                    for i in range(self.rng.randint(3, 15))
+                )
+                return "```\n" + "\n".join(body) + "\n```"
+            case "quote":
+                count = self.rng.randint(1, 5)
+                return "\n".join(f"> {self.words(10)}" for _ in range(count))
+            case "image":
+                return f"![{self.words(3)}](/images/rivendell.png)"
+        raise ValueError(f"unknown block kind: {kind}")
+
+    def page(self, index: int = 0) -> str:
+        kinds = list(self.mix)
+        weights = [self.mix[kind] for kind in kinds]
+        blocks = [f"# Page {index}: {self.words(4)}"]
+        for kind in self.rng.choices(kinds, weights, k=self.blocks_per_page):
+            blocks.append(self.block(kind))
+        return "\n\n".join(blocks) + "\n"
+
+    def pages(self, count: int) -> list[str]:
+        return [self.page(index) for index in range(count)]
+
+    # Writes count pages under dest_dir as page-N/index.md and returns their
+    # paths.
+    def write(self, dest_dir: str, count: int) -> list[str]:
+        paths = []
+        for index in range(count):
+            page_dir = path.join(dest_dir, f"page-{index}")
+            makedirs(page_dir, exist_ok=True)
+            page_path = path.join(page_dir, "index.md")
+            with open(page_path, "w") as f:
+                f.write(self.page(index))
+            paths.append(page_path)
+        return paths
@@ -0,0 +1,92 @@
+# Measures the memory the nodes of a large synthetic page take with
+# __slots__ and with a plain per-instance __dict__, using tracemalloc, and
+# reports both per node with the difference. Run from the project root:
+#   python3 benchmarks/node_memory.py [blocks]
+import tracemalloc
+from os import path
+from sys import argv, path as sys_path
+
+sys_path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+from corpus import CorpusGenerator  # noqa: E402
+from htmlnode import HTMLNode  # noqa: E402
+from markdownblock import markdown_to_htmlnode  # noqa: E402
+from textnode import TextNode, text_to_textnodes  # noqa: E402
+
+
+# Returns two bare classes with the fields of node_class: one declaring them
+# in __slots__, as node_class does, and one keeping them in a __dict__.
+def node_versions(node_class: type) -> tuple[type, type]:
+    name = node_class.__name__
+    slotted = type(f"Slotted{name}", (), {"__slots__": node_class.__slots__})
+    plain = type(f"Plain{name}", (), {})
+    return slotted, plain
+
+
+# Copies node, and its children, into instances of version. Only the nodes
+# and their lists of children are new; the values they hold are shared with
+# the original, so measuring a copy measures the nodes alone.
+def copy_nodes(node, version: type, fields: tuple[str, ...]):
+    copy = object.__new__(version)
+    for field in fields:
+        value = getattr(node, field)
+        if field == "children" and value is not None:
+            value = [copy_nodes(child, version, fields) for child in value]
+        setattr(copy, field, value)
+    return copy
+
+
+def count_nodes(node) -> int:
+    return 1 + sum(count_nodes(child) for child in node.children or ())
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(
+        stat.size_diff for stat in after.compare_to(before, "filename")
+    )
+    del result
+    return allocated
+
+
+# Prints the bytes per node of roots (a list of node trees) copied into each
+# version of node_class.
+def report(label: str, roots: list, node_class: type) -> None:
+    nodes = sum(count_nodes(root) for root in roots)
+    fields = node_class.__slots__
+    slotted, plain = node_versions(node_class)
+    slotted_size = measure(
+        lambda: [copy_nodes(root, slotted, fields) for root in roots]
+    )
+    plain_size = measure(
+        lambda: [copy_nodes(root, plain, fields) for root in roots]
+    )
+    saved = (plain_size - slotted_size) / nodes
+    print(
+        f"{label}: {nodes} nodes, "
+        f"{plain_size / nodes:.1f} bytes/node with __dict__, "
+        f"{slotted_size / nodes:.1f} with __slots__ "
+        f"({saved:.1f} bytes/node, "
+        f"{saved * nodes / plain_size * 100:.1f}% less)"
+    )
+
+
+def main():
+    blocks = int(argv[1]) if len(argv) > 1 else 2000
+    markdown = CorpusGenerator(blocks, inline_density=0.5).page()
+    lines = markdown.split("\n\n")
+
+    report("HTMLNode tree", [markdown_to_htmlnode(markdown)], HTMLNode)
+    report(
+        "TextNodes",
+        [node for line in lines for node in text_to_textnodes(line)],
+        TextNode
+    )
+
+
+if __name__ == "__main__":
+    main()
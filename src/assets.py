@@ -0,0 +1,103 @@
+import json
+from os import path
+from posixpath import splitext
+
+from filehash import FileHashes
+from urlpolicy import split_url_suffix
+from writer import write_if_changed
+
+
+# Static files renamed after their content. Pages and the files browsers look
+# up by name (favicon.ico, robots.txt) keep their names.
+FINGERPRINT_EXTENSIONS: tuple[str, ...] = (
+    ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg",
+    ".woff", ".woff2", ".ttf", ".otf",
+)
+# Hex digits of the content hash kept in a fingerprinted name.
+FINGERPRINT_LENGTH = 8
+ASSET_MANIFEST_NAME = "assets.json"
+
+
+# Returns url_path (or a relative path) with the content hash inserted before
+# its extension: /index.css becomes /index.3f9a1c2e.css.
+def fingerprinted(url_path: str, digest: str) -> str:
+    root, extension = splitext(url_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+# Models the fingerprinted names of a static directory's assets, keyed by the
+# site-root URL each is written as ("/index.css" -> "/index.3f9a1c2e.css").
+# Fingerprinted assets never change under the same name, so they can be
+# served with far-future cache headers. Files are hashed through file_hashes
+# (see filehash), which keeps hashes from one build to the next. The URLs of
+# assets whose name changed since the previous scan (or, on the first, since
+# the hashes were cached), or that were added or removed, are kept in
+# changed, for watch mode; builds compare the names each page was rendered
+# against instead (see URLPolicy.asset_urls). Only site-root URLs are
+# renamed, as those are the ones a URLPolicy rewrites.
+class AssetManifest():
+    def __init__(
+        self,
+        static_dir: str,
+        file_hashes: FileHashes | None = None
+    ):
+        self.static_dir = static_dir
+        self.file_hashes = file_hashes or FileHashes(static_dir)
+        self.names: dict[str, str] = {}
+        self.changed: set[str] = set()
+        # Path relative to static_dir -> hash, as of the previous scan.
+        self.files = self.file_hashes.hashes(FINGERPRINT_EXTENSIONS)
+
+    def __getstate__(self):
+        # Worker processes only look names up.
+        return {"static_dir": self.static_dir, "names": self.names}
+
+    def __setstate__(self, state):
+        self.__init__(state["static_dir"])
+        self.names = state["names"]
+
+    # The names of the files as of the previous scan, by URL.
+    def file_names(self) -> dict[str, str]:
+        names = {}
+        for relative, digest in self.files.items():
+            url_path = "/" + relative.replace(path.sep, "/")
+            names[url_path] = fingerprinted(url_path, digest)
+        return names
+
+    # Names every asset in the static directory. Returns self, so a scanned
+    # AssetManifest can be made in one go.
+    def scan(self) -> "AssetManifest":
+        previous = self.file_names()
+        self.files = self.file_hashes.scan(FINGERPRINT_EXTENSIONS)
+        self.names = self.file_names()
+        self.changed = {
+            url for url in previous.keys() | self.names.keys()
+            if previous.get(url) != self.names.get(url)
+        }
+        return self
+
+    # Returns the name the static file at relative (a path within the static
+    # directory) is published under.
+    def dest_name(self, relative: str) -> str:
+        digest = self.files.get(relative)
+        if digest is None:
+            return relative
+        return fingerprinted(relative, digest)
+
+    # Returns url with its path swapped for the asset's fingerprinted name,
+    # keeping any query or fragment.
+    def rewrite(self, url: str) -> str:
+        url_path, suffix = split_url_suffix(url)
+        name = self.names.get(url_path)
+        if name is None:
+            return url
+        return name + suffix
+
+    # Writes the manifest of original and fingerprinted URLs to dest_dir,
+    # for servers and scripts that need to find an asset by its original
+    # name. Returns the path written.
+    def write(self, dest_dir: str) -> str:
+        manifest_path = path.join(dest_dir, ASSET_MANIFEST_NAME)
+        data = json.dumps(self.names, indent=2, sort_keys=True) + "\n"
+        write_if_changed(manifest_path, data.encode())
+        return manifest_path
@@ -0,0 +1,225 @@
+import json
+from hashlib import sha256
+from inspect import getsource
+from os import getpid, makedirs, path, remove, replace, stat, utime, walk
+
+import assets
+import htmlnode
+import imagesize
+import markdownblock
+import textnode
+import urlpolicy
+from htmlnode import RawNode
+from imagesize import PageImages
+from markdownblock import Block, block_handlers, block_to_htmlnode
+from textnode import TextType
+from urlpolicy import URLPolicy
+
+
+# Hashes the source of every module that decides how a block is rendered, so
+# cached HTML is never reused across a change to the renderer itself.
+def renderer_version() -> str:
+    digest = sha256()
+    for module in (
+        assets, htmlnode, imagesize, markdownblock, textnode, urlpolicy
+    ):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+RENDERER_VERSION: str = renderer_version()
+
+
+# Hashes the render function of every registered block handler, so a
+# plugin's cached blocks are rendered again when its renderer changes.
+# Functions whose source can't be read are hashed by name alone.
+def handlers_version() -> str:
+    digest = sha256()
+    for handler in block_handlers():
+        render = handler.render
+        name = getattr(render, "__qualname__", type(render).__name__)
+        name = f"{getattr(render, '__module__', '')}.{name}"
+        digest.update(f"{handler.block_type}\0{name}\0".encode())
+        try:
+            digest.update(getsource(render).encode())
+        except (OSError, TypeError):
+            continue
+    return digest.hexdigest()
+
+
+# The version of the renderer together with the block handlers registered
+# now, which cached blocks and built pages (see manifest) are only reused
+# under.
+def render_version() -> str:
+    return sha256((RENDERER_VERSION + handlers_version()).encode()).hexdigest()
+
+
+# Stores the rendered HTML of markdown blocks on disk, keyed by the hash of
+# the block's text, the renderer version (with the block handlers registered
+# when the cache is made), the URL policy (and, for relative URLs, the page)
+# and whether it's minified. Each entry keeps the block's links next to its
+# HTML, so a cached block still reports them, and the attributes its images
+# got (see imagesize.PageImages) and the names of its assets (see assets),
+# which must still match for the entry to be used. Identical blocks are
+# rendered once, whichever page and build they appear in. Entries are plain
+# files, one per block, written atomically, so worker processes can share a
+# cache without coordinating. Reading an entry marks it as recently used;
+# evict() trims the least recently used entries once the cache grows past
+# max_bytes. Reading and writing entries costs more than rendering most
+# blocks from scratch, so the cache only pays off for rebuilds that leave
+# most blocks unchanged, and builds leave it off unless asked for.
+class BlockCache():
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = render_version()
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self,
+        block: Block,
+        url_policy: URLPolicy | None,
+        minify: bool = False
+    ) -> str:
+        digest = sha256(self.version.encode())
+        if url_policy is not None:
+            digest.update(f"\0{url_policy.key}\0{url_policy.page_url}".encode())
+        if minify:
+            digest.update(b"\0minify")
+        # A block handler registered by a plugin can take lines over from
+        # a built-in type (see markdownblock.register_block_handler).
+        digest.update(f"\0{block.block_type}\0".encode())
+        digest.update(block.text.encode())
+        return digest.hexdigest()
+
+    # Describes what the block's HTML depends on beyond its text, from its
+    # links: the attributes of its images and the names of its assets.
+    # eager_left is handed to PageImages.cache_key.
+    def context(
+        self,
+        links: list[tuple[TextType, str]],
+        url_policy: URLPolicy | None,
+        images: PageImages | None,
+        eager_left: int | None = None
+    ) -> str:
+        context = ""
+        if images is not None:
+            image_urls = [
+                url for text_type, url in links if text_type == TextType.IMAGE
+            ]
+            context += "images:" + images.cache_key(image_urls, eager_left)
+        if url_policy is not None and url_policy.assets is not None:
+            context += "\0assets:" + ",".join(
+                url_policy.rewrite_asset(url) for _, url in links
+                if url.startswith("/")
+            )
+        return context
+
+    def entry_path(self, key: str) -> str:
+        return path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str) -> str | None:
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, "r") as f:
+                html = f.read()
+            utime(entry_path)
+        except OSError:
+            return None
+        return html
+
+    def put(self, key: str, html: str) -> None:
+        entry_path = self.entry_path(key)
+        temp_path = f"{entry_path}.{getpid()}.tmp"
+        try:
+            makedirs(path.dirname(entry_path), exist_ok=True)
+            with open(temp_path, "w") as f:
+                f.write(html)
+            replace(temp_path, entry_path)
+        except OSError:
+            # The cache only ever saves work; failing to fill it is harmless.
+            return
+
+    # Returns the (html, links, context) of the entry under key, or None.
+    def read_entry(
+        self,
+        key: str
+    ) -> tuple[str, list[tuple[TextType, str]], str] | None:
+        entry = self.get(key)
+        if entry is None:
+            return None
+        try:
+            data = json.loads(entry)
+            links = [(TextType[name], url) for name, url in data["links"]]
+            return data["html"], links, data["context"]
+        except (ValueError, KeyError, TypeError):
+            # Entries written by another version are rendered again.
+            return None
+
+    # Returns the block as a node, from the cache when it was rendered before
+    # in the same context. The block's links are appended to links, when
+    # given, either way.
+    def render(
+        self,
+        block: Block,
+        url_policy: URLPolicy | None = None,
+        images: PageImages | None = None,
+        minify: bool = False,
+        links: list[tuple[TextType, str]] | None = None
+    ) -> RawNode:
+        key = self.key(block, url_policy, minify)
+        entry = self.read_entry(key)
+        if entry is not None:
+            html, block_links, context = entry
+            if context == self.context(block_links, url_policy, images):
+                self.hits += 1
+                if images is not None:
+                    images.skip(sum(
+                        text_type == TextType.IMAGE
+                        for text_type, _ in block_links
+                    ))
+                if links is not None:
+                    links.extend(block_links)
+                return RawNode(html)
+        self.misses += 1
+        eager_left = None if images is None else images.eager_left
+        block_links = []
+        node = block_to_htmlnode(block, url_policy, images, block_links)
+        html = node.to_html(minify)
+        context = self.context(block_links, url_policy, images, eager_left)
+        self.put(key, json.dumps({
+            "html": html,
+            "links": [(text_type.name, url) for text_type, url in block_links],
+            "context": context,
+        }))
+        if links is not None:
+            links.extend(block_links)
+        return RawNode(html)
+
+    # Removes the least recently used entries until the cache fits in
+    # max_bytes. Returns the number of entries removed.
+    def evict(self) -> int:
+        entries = []
+        total = 0
+        for root, _, files in walk(self.cache_dir):
+            for name in files:
+                entry_path = path.join(root, name)
+                try:
+                    info = stat(entry_path)
+                except OSError:
+                    continue
+                entries.append((info.st_mtime_ns, info.st_size, entry_path))
+                total += info.st_size
+        removed = 0
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                remove(entry_path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
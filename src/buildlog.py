@@ -0,0 +1,113 @@
+import json
+from sys import stderr
+
+
+# How much the build prints. Quiet builds only report errors, normal builds
+# report each stage and the summary, and verbose builds report every file.
+QUIET = "quiet"
+NORMAL = "normal"
+VERBOSE = "verbose"
+LOG_LEVELS: tuple[str, ...] = (QUIET, NORMAL, VERBOSE)
+
+_level: int = LOG_LEVELS.index(NORMAL)
+
+
+def set_level(level: str) -> None:
+    global _level
+    _level = LOG_LEVELS.index(level)
+
+
+def get_level() -> str:
+    return LOG_LEVELS[_level]
+
+
+# Reports the progress of the build as a whole.
+def info(msg: str) -> None:
+    if _level >= 1:
+        print(msg)
+
+
+# Reports work done on a single file.
+def detail(msg: str) -> None:
+    if _level >= 2:
+        print(msg)
+
+
+# Reports a failure. Errors are printed at every level.
+def error(msg: str) -> None:
+    print(msg, file=stderr)
+
+
+# Models the end-of-build summary: what was copied, rendered and written, the
+# bytes read and produced, and how fast each stage went through its files.
+class BuildSummary():
+    def __init__(self):
+        self.files_copied = 0
+        self.files_unchanged = 0
+        self.files_removed = 0
+        self.pages_rendered = 0
+        self.pages_unchanged = 0
+        self.pages_failed = 0
+        self.pages_written = 0
+        self.pages_identical = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.broken_links = 0
+        # Stage name -> (files handled, seconds).
+        self.stages: dict[str, tuple[int, float]] = {}
+
+    def record_stage(self, name: str, files: int, seconds: float) -> None:
+        self.stages[name] = (files, seconds)
+
+    def rate(self, name: str) -> float:
+        files, seconds = self.stages[name]
+        return files / seconds if seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "files": {
+                "copied": self.files_copied,
+                "unchanged": self.files_unchanged,
+                "removed": self.files_removed,
+            },
+            "pages": {
+                "rendered": self.pages_rendered,
+                "unchanged": self.pages_unchanged,
+                "failed": self.pages_failed,
+                "written": self.pages_written,
+                "identical": self.pages_identical,
+            },
+            "bytes": {"in": self.bytes_in, "out": self.bytes_out},
+            "broken_links": self.broken_links,
+            "stages": {
+                name: {
+                    "files": files,
+                    "seconds": round(seconds, 6),
+                    "per_second": round(self.rate(name), 1),
+                }
+                for name, (files, seconds) in self.stages.items()
+            },
+        }
+
+    def report(self) -> str:
+        lines = [
+            f"Copied {self.files_copied} static file(s) "
+            f"({self.files_unchanged} unchanged, {self.files_removed} removed)",
+            f"Rendered {self.pages_rendered} page(s) "
+            f"({self.pages_unchanged} unchanged, {self.pages_failed} failed), "
+            f"wrote {self.pages_written} "
+            f"({self.pages_identical} identical on disk)",
+            f"Read {self.bytes_in} bytes, produced {self.bytes_out} bytes",
+        ]
+        if self.broken_links:
+            lines.append(f"Found {self.broken_links} broken link(s)")
+        for name, (files, seconds) in self.stages.items():
+            lines.append(
+                f"  {name:<8} {files:>6} file(s) in {seconds:.3f}s"
+                f" ({self.rate(name):.1f}/s)"
+            )
+        return "\n".join(lines)
+
+    def write_json(self, file_path: str) -> None:
+        with open(file_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
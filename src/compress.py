@@ -0,0 +1,150 @@
+import gzip
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from os import path, remove, stat, utime, walk
+
+from buildlog import detail, error
+from copystatic import TEXT_EXTENSIONS
+from manifest import BuildManifest
+from writer import write_if_changed
+
+
+GZIP = "gzip"
+BROTLI = "br"
+ZSTD = "zstd"
+# File suffix of each encoding's precompressed sibling.
+SUFFIXES: dict[str, str] = {GZIP: ".gz", BROTLI: ".br", ZSTD: ".zst"}
+# Text outputs compress well; images and fonts are compressed already.
+COMPRESSIBLE_EXTENSIONS: tuple[str, ...] = TEXT_EXTENSIONS + (
+    ".map", ".ico", ".wasm",
+)
+# Smaller files fit in a packet either way and aren't worth a sibling.
+MIN_SIZE = 256
+
+
+def gzip_compress(data: bytes) -> bytes:
+    # No timestamp in the header, so the same input always compresses to the
+    # same bytes.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+# Returns a compressor for every encoding this Python can produce: gzip
+# always, brotli and zstd when their modules are installed.
+def available_encoders() -> dict[str, Callable[[bytes], bytes]]:
+    encoders = {GZIP: gzip_compress}
+    try:
+        import brotli
+        encoders[BROTLI] = lambda data: brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+    try:
+        from compression import zstd
+        encoders[ZSTD] = lambda data: zstd.compress(data, level=19)
+    except ImportError:
+        try:
+            import zstandard
+            compressor = zstandard.ZstdCompressor(level=19)
+            encoders[ZSTD] = compressor.compress
+        except ImportError:
+            pass
+    return encoders
+
+
+# Writes precompressed siblings (index.html.gz, and .br and .zst when those
+# encoders are available) next to every compressible file of at least
+# MIN_SIZE bytes in dest_dir, for servers that send them in place of the
+# original. Each sibling is stamped with its original's mtime, and an
+# original whose siblings all carry its current mtime is skipped: pages
+# rendered the same as before and static files left alone keep their mtimes,
+# so only outputs that changed are compressed again. Siblings of files that
+# no longer exist (or of encodings no longer available) are removed. Files
+# are compressed over a pool of threads, as the compressors release the GIL.
+# A file that fails is reported and left without siblings. Every sibling
+# left in place is recorded in the manifest, when given. Returns the numbers
+# of files compressed and skipped.
+def precompress(
+    dest_dir: str,
+    threads: int = 4,
+    encoders: dict[str, Callable[[bytes], bytes]] | None = None,
+    manifest: BuildManifest | None = None
+) -> tuple[int, int]:
+    if encoders is None:
+        encoders = available_encoders()
+    suffixes = tuple(SUFFIXES[encoding] for encoding in encoders)
+    originals = []
+    for root, _, names in walk(dest_dir):
+        for name in names:
+            file_path = path.join(root, name)
+            original = sibling_original(file_path)
+            if original is not None:
+                if not path.isfile(original) or not name.endswith(suffixes):
+                    detail(f"Removing stale {file_path}")
+                    remove(file_path)
+                continue
+            if name.startswith(".") or not name.lower().endswith(
+                COMPRESSIBLE_EXTENSIONS
+            ):
+                continue
+            originals.append(file_path)
+
+    def compress(file_path: str) -> bool:
+        try:
+            return compress_file(file_path, encoders)
+        except OSError as e:
+            error(f"Failed to compress {file_path}: {e}")
+            return False
+
+    with ThreadPoolExecutor(
+        max_workers=threads,
+        thread_name_prefix="compress"
+    ) as pool:
+        results = list(pool.map(compress, originals))
+    if manifest is not None:
+        for file_path in originals:
+            for suffix in suffixes:
+                if path.isfile(file_path + suffix):
+                    manifest.record_sibling(file_path + suffix)
+    compressed = results.count(True)
+    return compressed, len(results) - compressed
+
+
+# Returns the file a precompressed sibling was made from, or None when
+# file_path isn't one: archive.tar.gz is a file in its own right, as .tar
+# isn't compressible.
+def sibling_original(file_path: str) -> str | None:
+    original, suffix = path.splitext(file_path)
+    if suffix not in SUFFIXES.values():
+        return None
+    if not original.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+        return None
+    return original
+
+
+# Compresses file_path with every encoder, unless it's too small or its
+# siblings are up to date. Returns True when siblings were written.
+def compress_file(
+    file_path: str,
+    encoders: dict[str, Callable[[bytes], bytes]]
+) -> bool:
+    info = stat(file_path)
+    siblings = {
+        encoding: file_path + SUFFIXES[encoding] for encoding in encoders
+    }
+    if info.st_size < MIN_SIZE:
+        for sibling in siblings.values():
+            if path.isfile(sibling):
+                remove(sibling)
+        return False
+    if all(
+        path.isfile(sibling) and stat(sibling).st_mtime_ns == info.st_mtime_ns
+        for sibling in siblings.values()
+    ):
+        return False
+
+    with open(file_path, "rb") as f:
+        data = f.read()
+    for encoding, sibling in siblings.items():
+        detail(f"Compressing {file_path} to {sibling}")
+        write_if_changed(sibling, encoders[encoding](data))
+        utime(sibling, ns=(info.st_atime_ns, info.st_mtime_ns))
+    return True
@@ -1,35 +1,134 @@
-from os import listdir, mkdir, path
-from shutil import copy, rmtree
+from os import link, listdir, makedirs, path, remove, stat
+from shutil import copy2, copystat
 
+from buildlog import BuildSummary, detail, error, info
+from filehash import hash_file
+from manifest import BuildManifest
 
-# Copies the contents of ./src to ./dst
-def static_to_public(src: str, dst: str) -> None:
+
+# How static files are placed in the destination. Links only apply to binary
+# assets; text assets are always copied, so later build stages can never write
+# through a link into ./static.
+COPY = "copy"
+HARDLINK = "hardlink"
+REFLINK = "reflink"
+LINK_MODES: tuple[str, ...] = (COPY, HARDLINK, REFLINK)
+TEXT_EXTENSIONS: tuple[str, ...] = (
+    ".css", ".js", ".html", ".htm", ".svg", ".txt", ".json", ".xml", ".md",
+)
+
+# ioctl request number for FICLONE on Linux (copy-on-write clone).
+FICLONE = 0x40049409
+
+
+# Syncs the contents of ./src into ./dst. An existing destination is kept,
+# since it also holds generated pages and the build manifest. Files are only
+# copied when their size or mtime differ (or their content, with checksum).
+# When a manifest is given, files removed from ./src since the last build are
+# deleted from ./dst - anything the manifest didn't record, such as generated
+# pages, is left alone. Copies are counted into the summary, when given.
+# Given an AssetManifest (see assets), assets are published under their
+# fingerprinted names; the manifest then prunes the names they had before.
+def static_to_public(
+    src: str,
+    dst: str,
+    manifest: BuildManifest | None = None,
+    checksum: bool = False,
+    link_mode: str = COPY,
+    summary: BuildSummary | None = None,
+    assets=None
+) -> None:
     if not path.exists(src):
-        print(f"Source, {src}, doesn't exist. Stopping")
+        error(f"Source, {src}, doesn't exist. Stopping")
         return
-    if path.exists(dst):
-        print(f"Destination already exists. Deleting {dst}")
-        rmtree(dst)
-    print(f"Creating new {dst} directory")
-    mkdir(dst)
-
-    # shutil.copy() works on single files, and we must check each listdir()
-    # item to see if it's a directory for mkdir() or file for copy(). We'll
-    # do this recursively, so here's a helper function to avoid re-making
-    # our destination directory over and over.
+    if not path.exists(dst):
+        info(f"Creating new {dst} directory")
+    makedirs(dst, exist_ok=True)
+
+    root = src
+
+    # We'll walk ./src recursively, so here's a helper function to avoid
+    # re-making our destination directory over and over.
     def copy_recursive(src: str, dst: str) -> None:
         items: list[str] = listdir(src)
         for item in items:
             current_src: str = path.join(src, item)
             current_dst: str = path.join(dst, item)
             if path.isfile(current_src):
-                print(f"Found file. Copying {current_src} to {current_dst}")
-                copy(current_src, current_dst)
+                if assets is not None:
+                    relative = path.relpath(current_src, root)
+                    current_dst = path.join(
+                        dst,
+                        path.basename(assets.dest_name(relative))
+                    )
+                if manifest:
+                    manifest.record_asset(current_src, current_dst)
+                if is_up_to_date(current_src, current_dst, checksum):
+                    if summary:
+                        summary.files_unchanged += 1
+                    continue
+                detail(f"Copying {current_src} to {current_dst}")
+                place_file(current_src, current_dst, link_mode)
+                if summary:
+                    size = path.getsize(current_src)
+                    summary.files_copied += 1
+                    summary.bytes_in += size
+                    summary.bytes_out += size
             else:
-                print(f"Found directory. Creating {current_dst}")
-                mkdir(current_dst)
-                print(f"Starting crawl through next directory {current_src}")
+                detail(f"Creating {current_dst}")
+                makedirs(current_dst, exist_ok=True)
                 copy_recursive(current_src, current_dst)
 
-    print(f"Starting crawl through source {src}...")
     copy_recursive(src, dst)
+
+    if manifest:
+        for stale in manifest.prune_assets():
+            detail(f"Removed deleted static file {stale}")
+            if summary:
+                summary.files_removed += 1
+
+
+# Compares a source file with its copy. Size is always checked first, since
+# it's free. Hardlinked copies share an inode, so they're trivially current.
+def is_up_to_date(src: str, dst: str, checksum: bool = False) -> bool:
+    if not path.isfile(dst):
+        return False
+    src_stat = stat(src)
+    dst_stat = stat(dst)
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(src) == hash_file(dst)
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+# Places src at dst using the requested link mode, falling back to a plain
+# copy when linking isn't possible (text assets, other filesystems, no CoW).
+def place_file(src: str, dst: str, link_mode: str = COPY) -> None:
+    if path.lexists(dst):
+        remove(dst)
+    if link_mode == COPY or src.lower().endswith(TEXT_EXTENSIONS):
+        copy2(src, dst)
+        return
+    try:
+        if link_mode == HARDLINK:
+            link(src, dst)
+        else:
+            reflink(src, dst)
+    except OSError:
+        if path.lexists(dst):
+            remove(dst)
+        copy2(src, dst)
+
+
+def reflink(src: str, dst: str) -> None:
+    # fcntl is unix-only; without it, reflinks simply aren't supported.
+    try:
+        from fcntl import ioctl
+    except ImportError as e:
+        raise OSError("reflinks are not supported on this platform") from e
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    copystat(src, dst)
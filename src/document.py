@@ -0,0 +1,189 @@
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from functools import cached_property
+from itertools import chain
+
+from htmlnode import ParentNode
+from markdownblock import Block, blocks_to_htmlnode, scan_blocks
+from siteindex import PageInfo
+from urlpolicy import URLPolicy
+
+
+FRONT_MATTER_FENCE = "---"
+
+
+# Models a markdown source, parsed once and shared by everything that needs
+# it: the front-matter metadata, the blocks, the title and the rendered tree
+# are each worked out the first time they're asked for and kept from then on.
+# Front matter is an optional leading section of "key: value" lines between
+# two "---" lines:
+#
+#     ---
+#     date: 2024-05-01
+#     ---
+#     # Title
+class Document():
+    def __init__(self, markdown: str, src_path: str = ""):
+        self.src_path = src_path
+        self.lines = markdown.split("\n")
+        # What the tree was rendered with, so it's rendered again on change.
+        self.rendered_with: tuple | None = None
+        self.tree: ParentNode | None = None
+        # The anchors and links found while rendering the tree.
+        self.rendered_info: PageInfo | None = None
+
+    @classmethod
+    def read(cls, src_path: str) -> "Document":
+        with open(src_path, "r") as f:
+            return cls(f.read(), src_path)
+
+    # Index of the first line after the front matter.
+    @cached_property
+    def body_start(self) -> int:
+        if self.lines[0].rstrip() != FRONT_MATTER_FENCE:
+            return 0
+        for number, line in enumerate(self.lines[1:], 1):
+            if line.rstrip() == FRONT_MATTER_FENCE:
+                return number + 1
+        # An unclosed fence isn't front matter, just a line of dashes.
+        return 0
+
+    @cached_property
+    def metadata(self) -> dict[str, str]:
+        return parse_front_matter(self.lines[:self.body_start])
+
+    @cached_property
+    def blocks(self) -> list[Block]:
+        return list(
+            scan_blocks(self.lines[self.body_start:], self.body_start)
+        )
+
+    @cached_property
+    def title(self) -> str:
+        return document_title(
+            self.metadata,
+            self.blocks[0] if self.blocks else None
+        )
+
+    # The front matter's date, as a timestamp. None when the document has no
+    # date.
+    @cached_property
+    def date(self) -> float | None:
+        return front_matter_date(self.metadata)
+
+    # Returns the document rendered to an HTMLNode tree. The tree is kept, and
+    # only rendered again when asked for with another URL policy, cache,
+    # PageImages or minify (see markdownblock.markdown_to_htmlnode).
+    def htmlnode(
+        self,
+        url_policy: URLPolicy | None = None,
+        block_cache=None,
+        images=None,
+        minify: bool = False
+    ) -> ParentNode:
+        rendered_with = (url_policy, block_cache, images, minify)
+        if self.tree is None or self.rendered_with != rendered_with:
+            self.rendered_info = PageInfo()
+            self.tree = blocks_to_htmlnode(
+                self.blocks,
+                url_policy,
+                block_cache,
+                self.rendered_info,
+                images,
+                minify
+            )
+            self.rendered_with = rendered_with
+        return self.tree
+
+    # Records the document's title, date, anchors and links in page_info.
+    # Links are found as the document is rendered, which this does first when
+    # it hasn't been.
+    def describe(self, page_info: PageInfo) -> PageInfo:
+        if self.rendered_info is None:
+            self.htmlnode()
+        page_info.title = self.title
+        page_info.date = self.date
+        page_info.anchors.extend(self.rendered_info.anchors)
+        page_info.urls.extend(self.rendered_info.urls)
+        return page_info
+
+
+# Models a markdown source read as a stream of lines, for documents too large
+# to hold in memory. The front matter and the first block are read up front,
+# for the title and date; blocks is then a single-use iterator over every
+# block, scanned as it is consumed. Only a "---" line that is never closed
+# makes the stream hold on to lines, as it can't tell it from front matter
+# before reaching the end.
+class DocumentStream():
+    def __init__(self, lines: Iterable[str]):
+        lines = iter(lines)
+        head = []
+        body_start = 0
+        first = next(lines, None)
+        if first is not None:
+            head.append(first)
+        if first is not None and first.rstrip() == FRONT_MATTER_FENCE:
+            for line in lines:
+                head.append(line)
+                if line.rstrip() == FRONT_MATTER_FENCE:
+                    body_start = len(head)
+                    break
+        self.metadata = parse_front_matter(head[:body_start])
+        self.date = front_matter_date(self.metadata)
+        blocks = scan_blocks(chain(head[body_start:], lines), body_start)
+        first_block = next(blocks, None)
+        self.title = document_title(self.metadata, first_block)
+        self.blocks: Iterator[Block] = (
+            chain([first_block], blocks) if first_block else blocks
+        )
+
+
+# Yields the lines of a text file without their line endings, exactly as
+# str.split("\n") would split the whole file, but reading it a buffer at a
+# time.
+def iter_lines(f: Iterable[str]) -> Iterator[str]:
+    line = ""
+    for line in f:
+        yield line[:-1] if line.endswith("\n") else line
+    if line == "" or line.endswith("\n"):
+        yield ""
+
+
+# Parses front matter, fences included, into a dictionary of lowercase keys.
+def parse_front_matter(lines: list[str]) -> dict[str, str]:
+    metadata = {}
+    for number, line in enumerate(lines[1:-1], 2):
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            continue
+        key, colon, value = line.partition(":")
+        if not colon or not key.strip():
+            raise ValueError(
+                f"Front matter line {number} must be 'key: value'"
+            )
+        metadata[key.strip().lower()] = value.strip().strip("\"'")
+    return metadata
+
+
+# A document's title is set in its front matter or, failing that, by the H1
+# it starts with. Raises a ValueError when there is neither.
+def document_title(metadata: dict[str, str], first_block: Block | None) -> str:
+    if metadata.get("title"):
+        return metadata["title"]
+    if first_block is None or not first_block.lines[0].startswith("# "):
+        raise ValueError("Markdown document must start with a title as H1 (#)")
+    return first_block.text[2:].strip()
+
+
+# Dates without a time zone are taken as UTC.
+def front_matter_date(metadata: dict[str, str]) -> float | None:
+    value = metadata.get("date")
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Front matter date {value!r} isn't an ISO date")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
@@ -0,0 +1,176 @@
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from email.utils import formatdate
+from os import makedirs, path
+from xml.sax.saxutils import escape
+
+from siteindex import PageInfo, SiteIndex
+from writer import write_if_changed
+
+
+RSS = "rss"
+ATOM = "atom"
+FEED_FORMATS: tuple[str, ...] = (RSS, ATOM)
+FEED_NAME = "feed.xml"
+SITEMAP_NAME = "sitemap.xml"
+# The sitemap protocol allows at most this many URLs per file. Larger sites
+# get a sitemap index pointing at numbered sitemaps.
+SITEMAP_LIMIT = 50000
+FEED_LIMIT = 20
+
+
+# Returns the public URL path of a page: index.html pages are served by their
+# directory.
+def public_path(page_url: str) -> str:
+    if page_url.endswith("/index.html"):
+        return page_url[:-len("index.html")]
+    return page_url
+
+
+# Writes sitemap.xml (plus numbered sitemaps, past SITEMAP_LIMIT pages) for
+# every page in the index, from the metadata gathered while the pages were
+# rendered. site_url is the origin and base path the site is served from.
+# Returns the paths written.
+def write_sitemap(
+    site_index: SiteIndex,
+    site_url: str,
+    dest_dir: str
+) -> list[str]:
+    pages = sorted(site_index.pages.items())
+    chunks = [
+        pages[start:start + SITEMAP_LIMIT]
+        for start in range(0, len(pages), SITEMAP_LIMIT)
+    ]
+    if len(chunks) <= 1:
+        sitemap_path = path.join(dest_dir, SITEMAP_NAME)
+        write_xml(sitemap_path, sitemap_xml(pages, site_url))
+        return [sitemap_path]
+
+    written = []
+    for number, chunk in enumerate(chunks, start=1):
+        chunk_path = path.join(dest_dir, f"sitemap-{number}.xml")
+        write_xml(chunk_path, sitemap_xml(chunk, site_url))
+        written.append(chunk_path)
+    index_path = path.join(dest_dir, SITEMAP_NAME)
+    write_xml(index_path, sitemap_index_xml(len(chunks), site_url))
+    return [index_path] + written
+
+
+def sitemap_xml(
+    pages: list[tuple[str, tuple[PageInfo, float]]],
+    site_url: str
+) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for page_url, (_, updated) in pages:
+        yield (
+            f"<url><loc>{escape(site_url + public_path(page_url))}</loc>"
+            f"<lastmod>{iso_date(updated)}</lastmod></url>\n"
+        )
+    yield "</urlset>\n"
+
+
+def sitemap_index_xml(count: int, site_url: str) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield (
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    )
+    for number in range(1, count + 1):
+        loc = escape(f"{site_url}/sitemap-{number}.xml")
+        yield f"<sitemap><loc>{loc}</loc></sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+# Writes a feed of the most recently updated pages within section (a URL path
+# such as /blog) to feed.xml in the section's directory. The section's own
+# index page titles the feed. Returns the path written.
+def write_feed(
+    site_index: SiteIndex,
+    site_url: str,
+    dest_dir: str,
+    section: str,
+    feed_format: str = RSS,
+    limit: int = FEED_LIMIT
+) -> str:
+    section = section.strip("/")
+    section_path = f"/{section}/" if section else "/"
+    section_index = section_path + "index.html"
+    entries = [
+        (page_url, page_info, updated)
+        for page_url, (page_info, updated) in site_index.pages.items()
+        if page_url.startswith(section_path) and page_url != section_index
+    ]
+    entries.sort(key=lambda entry: (-entry[2], entry[0]))
+    entries = entries[:limit]
+
+    index_info = site_index.pages.get(section_index)
+    title = index_info[0].title if index_info else section
+    feed_url = site_url + section_path + FEED_NAME
+    if feed_format == ATOM:
+        xml = atom_xml(entries, title, site_url, feed_url)
+    else:
+        xml = rss_xml(entries, title, site_url, section_path)
+    feed_path = path.join(dest_dir, section, FEED_NAME)
+    write_xml(feed_path, xml)
+    return feed_path
+
+
+def rss_xml(
+    entries: list[tuple[str, PageInfo, float]],
+    title: str,
+    site_url: str,
+    section_path: str
+) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<rss version="2.0"><channel>\n'
+    yield f"<title>{escape(title)}</title>\n"
+    yield f"<link>{escape(site_url + section_path)}</link>\n"
+    yield f"<description>{escape(title)}</description>\n"
+    for page_url, page_info, updated in entries:
+        link = escape(site_url + public_path(page_url))
+        yield (
+            f"<item><title>{escape(page_info.title)}</title>"
+            f"<link>{link}</link><guid>{link}</guid>"
+            f"<pubDate>{formatdate(updated, usegmt=True)}</pubDate></item>\n"
+        )
+    yield "</channel></rss>\n"
+
+
+def atom_xml(
+    entries: list[tuple[str, PageInfo, float]],
+    title: str,
+    site_url: str,
+    feed_url: str
+) -> Iterator[str]:
+    updated = max((entry[2] for entry in entries), default=0.0)
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+    yield f"<title>{escape(title)}</title>\n"
+    yield f"<id>{escape(feed_url)}</id>\n"
+    yield f'<link rel="self" href="{escape(feed_url)}"/>\n'
+    yield f"<updated>{iso_datetime(updated)}</updated>\n"
+    yield f"<author><name>{escape(title)}</name></author>\n"
+    for page_url, page_info, page_updated in entries:
+        link = escape(site_url + public_path(page_url))
+        yield (
+            f"<entry><title>{escape(page_info.title)}</title>"
+            f'<link href="{link}"/><id>{link}</id>'
+            f"<updated>{iso_datetime(page_updated)}</updated></entry>\n"
+        )
+    yield "</feed>\n"
+
+
+def iso_date(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).date().isoformat()
+
+
+def iso_datetime(timestamp: float) -> str:
+    moment = datetime.fromtimestamp(int(timestamp), timezone.utc)
+    return moment.isoformat().replace("+00:00", "Z")
+
+
+# Feeds are written through write_if_changed, so an unchanged feed keeps its
+# mtime like an unchanged page does.
+def write_xml(file_path: str, xml: Iterator[str]) -> None:
+    makedirs(path.dirname(file_path), exist_ok=True)
+    write_if_changed(file_path, "".join(xml).encode())
@@ -0,0 +1,93 @@
+import json
+from hashlib import sha256
+from os import getpid, makedirs, path, replace, stat, walk
+
+
+# Returns the hex sha256 digest of the file at file_path. Files are read in
+# chunks so large sources don't need to be held in memory just to be hashed.
+def hash_file(file_path: str) -> str:
+    digest = sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_bytes(data: bytes) -> str:
+    return sha256(data).hexdigest()
+
+
+# Models the content hashes of the files in a directory. With a cache_path,
+# hashes are kept on disk from one build to the next, and files are only
+# hashed again when their size or mtime changes. Every scanner of the static
+# directory (see imagesize and assets) shares one FileHashes, so a file is
+# hashed once however many of them look at it.
+class FileHashes():
+    def __init__(self, root_dir: str, cache_path: str | None = None):
+        self.root_dir = root_dir
+        self.cache_path = cache_path
+        # Path relative to root_dir -> (mtime, size, hash) as last hashed.
+        self.files: dict[str, tuple[int, int, str]] = {}
+        self.load()
+
+    def load(self) -> None:
+        if self.cache_path is None or not path.isfile(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+            self.files = {
+                name: tuple(entry) for name, entry in data["files"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            # A corrupt cache only costs hashing the files again.
+            self.files = {}
+
+    def save(self) -> None:
+        if self.cache_path is None:
+            return
+        temp_path = f"{self.cache_path}.{getpid()}.tmp"
+        try:
+            makedirs(path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(temp_path, "w") as f:
+                json.dump({"files": self.files}, f, sort_keys=True)
+            replace(temp_path, self.cache_path)
+        except OSError:
+            return
+
+    # The hashes last recorded for the files with the given extensions, by
+    # path relative to root_dir.
+    def hashes(self, extensions: tuple[str, ...]) -> dict[str, str]:
+        return {
+            relative: entry[2] for relative, entry in self.files.items()
+            if relative.lower().endswith(extensions)
+        }
+
+    # Hashes every file in the directory with one of the given extensions,
+    # skipping those unchanged since they were last hashed, and returns their
+    # hashes by relative path. Files with other extensions are left as they
+    # were, for other scanners.
+    def scan(self, extensions: tuple[str, ...]) -> dict[str, str]:
+        files = {
+            relative: entry for relative, entry in self.files.items()
+            if not relative.lower().endswith(extensions)
+        }
+        for root, _, names in walk(self.root_dir):
+            for name in names:
+                if not name.lower().endswith(extensions):
+                    continue
+                file_path = path.join(root, name)
+                relative = path.relpath(file_path, self.root_dir)
+                try:
+                    info = stat(file_path)
+                    stamp = (info.st_mtime_ns, info.st_size)
+                    entry = self.files.get(relative)
+                    if entry is None or entry[:2] != stamp:
+                        entry = stamp + (hash_file(file_path),)
+                except OSError:
+                    continue
+                files[relative] = entry
+        if files != self.files:
+            self.files = files
+            self.save()
+        return self.hashes(extensions)
@@ -1,69 +1,629 @@
-from os import listdir, mkdir, path
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from os import listdir, makedirs, path
 
-from markdownblock import markdown_to_htmlnode, markdown_to_blocks
+from blockcache import BlockCache
+from buildlog import BuildSummary, detail, error, get_level, set_level
+from document import Document, DocumentStream, iter_lines
+from filehash import hash_bytes
+from imagesize import ImageSizes, PageImages
+from manifest import BuildManifest
+from markdownblock import blocks_to_html
+from profiling import BuildProfile, PageProfile
+from siteindex import PageInfo, SiteIndex
+from template import Template, cache_template, load_template
+from urlpolicy import URLPolicy, as_url_policy
+from writer import OutputWriter, write_if_changed, write_stream_if_changed
+
+
+# Sources of at least this many bytes are streamed (see stream_page) rather
+# than rendered in memory.
+STREAM_THRESHOLD = 16 * 1024 * 1024
+
+
+# Models the options every page of a build is rendered with. base_path is
+# the base path the site is served from or a URLPolicy, through which every
+# site-root link is written. A block_cache reuses unchanged blocks, and
+# image_sizes size images (see imagesize). With minify, pages are minified as
+# they're serialized. Sources of stream_threshold bytes or more are streamed.
+class RenderOptions():
+    def __init__(
+        self,
+        base_path: str | URLPolicy = "/",
+        block_cache: BlockCache | None = None,
+        image_sizes: ImageSizes | None = None,
+        minify: bool = False,
+        stream_threshold: int = STREAM_THRESHOLD
+    ):
+        self.url_policy = as_url_policy(base_path)
+        self.block_cache = block_cache
+        self.image_sizes = image_sizes
+        self.minify = minify
+        self.stream_threshold = stream_threshold
+
+    # Returns the options with relative URLs computed against output_dir.
+    def with_output_dir(self, output_dir: str) -> "RenderOptions":
+        return RenderOptions(
+            self.url_policy.with_output_dir(output_dir),
+            block_cache=self.block_cache,
+            image_sizes=self.image_sizes,
+            minify=self.minify,
+            stream_threshold=self.stream_threshold
+        )
 
 
 # Reads the markdown file at from_path and, using the template, populates the
-# {{ Content }} tag with HTML generated using the markdown document.
+# {{ Content }} tag with HTML generated using the markdown document. The page
+# is written through write_if_changed (see writer), so an unchanged page is
+# left untouched on disk. With profile, the page is timed stage by stage and
+# its PageProfile returned; otherwise large sources are streamed. The page's
+# title, links and dependencies are recorded in page_info, when given.
 def generate_page(
     src_path: str,
     template_path: str,
     dest_path: str,
-    base_path: str
-) -> None:
+    options: RenderOptions,
+    profile: bool = False,
+    page_info: PageInfo | None = None
+) -> PageProfile | None:
+    if not profile and path.getsize(src_path) >= options.stream_threshold:
+        fragments = stream_page(
+            src_path,
+            template_path,
+            dest_path,
+            options,
+            page_info=page_info
+        )
+        write_stream_if_changed(dest_path, fragments)
+        return None
+
+    html, page_profile, _ = render_output(
+        src_path,
+        template_path,
+        dest_path,
+        options,
+        profile=profile,
+        page_info=page_info
+    )
+    if page_profile is None:
+        write_if_changed(dest_path, html)
+        return None
+    with page_profile.stage("write"):
+        write_if_changed(dest_path, html)
+    return page_profile
+
+
+# Renders a page to the bytes to be written to dest_path, leaving the writing
+# to the caller. With profile, the page's PageProfile (with every stage but
+# the write timed) is returned alongside, and with index_pages, its PageInfo
+# (page_info, when given).
+def render_output(
+    src_path: str,
+    template_path: str,
+    dest_path: str,
+    options: RenderOptions,
+    profile: bool = False,
+    index_pages: bool = False,
+    page_info: PageInfo | None = None
+) -> tuple[bytes, PageProfile | None, PageInfo | None]:
     msg = f"Generating page from {src_path}"
     msg += f" to {dest_path}"
     msg += f" using {template_path}"
-    print(msg)
+    detail(msg)
+
+    if page_info is None and index_pages:
+        page_info = PageInfo()
+    if profile:
+        html, page_profile = profile_page(
+            src_path,
+            template_path,
+            dest_path,
+            options,
+            page_info=page_info
+        )
+        return html, page_profile, page_info
+
+    fragments = render_page(
+        src_path,
+        template_path,
+        dest_path,
+        options,
+        page_info=page_info
+    )
+    return "".join(fragments).encode(), None, page_info
 
+
+# Renders the markdown file at src_path through the template, yielding the
+# page as HTML fragments. dest_path is where the page will be served from,
+# which relative URL policies need. The source is parsed once, into a
+# Document, and the page's title, date, anchors and links are recorded in
+# page_info, when given.
+def render_page(
+    src_path: str,
+    template_path: str,
+    dest_path: str,
+    options: RenderOptions,
+    page_info: PageInfo | None = None
+) -> Iterator[str]:
+    document = Document.read(src_path)
+    template, url_policy, images = page_setup(
+        template_path,
+        dest_path,
+        options
+    )
+
+    node = document.htmlnode(
+        url_policy,
+        options.block_cache,
+        images,
+        options.minify
+    )
+    if page_info is not None:
+        document.describe(page_info)
+
+    values = {
+        "Title": document.title,
+        "Content": node.iter_html(options.minify)
+    }
+    yield from template.render(values, url_policy)
+    if page_info is not None:
+        page_info.dependencies = page_dependencies(url_policy, images)
+
+
+# Renders a page like render_page, but without ever holding the whole source
+# or page: the markdown is read a buffer at a time and scanned into blocks as
+# it's read, and each block's HTML is yielded as soon as it's rendered, ready
+# to be written out (see writer.write_stream_if_changed). Memory use depends
+# on the largest block rather than on the size of the page. The page is
+# the same as the one render_page yields.
+def stream_page(
+    src_path: str,
+    template_path: str,
+    dest_path: str,
+    options: RenderOptions,
+    page_info: PageInfo | None = None
+) -> Iterator[str]:
     with open(src_path, "r") as f:
-        md = f.read()
-    with open(template_path, "r") as f:
-        template = f.read()
+        document = DocumentStream(iter_lines(f))
+        template, url_policy, images = page_setup(
+            template_path,
+            dest_path,
+            options
+        )
+        if page_info is not None:
+            page_info.title = document.title
+            page_info.date = document.date
 
-    content = markdown_to_htmlnode(md).to_html()
-    title = extract_title(md)
-    with_title = template.replace("{{ Title }}", title)
-    with_content = with_title.replace("{{ Content }}", content)
-    with_base_href = with_content.replace('href="/', f'href="/{base_path}/')
-    with_base_src = with_base_href.replace('src="/', f'src="/{base_path}/')
+        content = blocks_to_html(
+            document.blocks,
+            url_policy,
+            options.block_cache,
+            page_info,
+            images,
+            options.minify
+        )
+        values = {"Title": document.title, "Content": content}
+        yield from template.render(values, url_policy)
+        if page_info is not None:
+            page_info.dependencies = page_dependencies(url_policy, images)
 
-    with open(dest_path, "w") as f:
-        f.write(with_base_src)
 
+# Renders a page like render_output, but one stage at a time so each can be
+# timed on its own. Stages that normally stream into each other are
+# materialized here. The write stage is timed by whoever writes the page.
+def profile_page(
+    src_path: str,
+    template_path: str,
+    dest_path: str,
+    options: RenderOptions,
+    page_info: PageInfo | None = None
+) -> tuple[bytes, PageProfile]:
+    profile = PageProfile(src_path, dest_path)
+    with profile.stage("read"):
+        with open(src_path, "r") as f:
+            md = f.read()
+    profile.source_bytes = len(md.encode())
+    template, url_policy, images = page_setup(
+        template_path,
+        dest_path,
+        options
+    )
 
-# Recursively generates public html files from provided markdown files.
+    with profile.stage("blocks"):
+        # The title is read from the first block, so this scans the blocks.
+        document = Document(md, src_path)
+        title = document.title
+    with profile.stage("inline"):
+        node = document.htmlnode(
+            url_policy,
+            options.block_cache,
+            images,
+            options.minify
+        )
+        if page_info is not None:
+            document.describe(page_info)
+    with profile.stage("serialize"):
+        content = node.to_html(options.minify)
+    with profile.stage("template"):
+        values = {"Title": title, "Content": content}
+        html = template.render_to_string(values, url_policy).encode()
+    if page_info is not None:
+        page_info.dependencies = page_dependencies(url_policy, images)
+    profile.output_bytes = len(html)
+    return html, profile
+
+
+# Recursively generates public html files from provided markdown files, each
+# rendered with the given RenderOptions. With a manifest, unchanged pages are
+# skipped; with jobs > 1, pages are rendered over a pool of worker processes.
+# Pages are profiled into profile, written through writer, counted into
+# summary and added to site_index, when given (see generate_pages).
+# Returns the (source, error) pairs of failed pages.
 def generate_pages_recursive(
     src_path: str,
     template_path: str,
     dest_path: str,
-    base_path: str
-) -> None:
-    items: list[str] = listdir(src_path)
+    options: RenderOptions,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    profile: BuildProfile | None = None,
+    writer: OutputWriter | None = None,
+    summary: BuildSummary | None = None,
+    site_index: SiteIndex | None = None
+) -> list[tuple[str, Exception]]:
+    pages = discover_pages(src_path, dest_path)
+    return generate_pages(
+        pages,
+        template_path,
+        options.with_output_dir(dest_path),
+        manifest=manifest,
+        jobs=jobs,
+        profile=profile,
+        writer=writer,
+        summary=summary,
+        site_index=site_index
+    )
+
+
+# Walks the content directory and returns (markdown source, html destination)
+# pairs for every page, creating the destination directories as it goes.
+def discover_pages(src_path: str, dest_path: str) -> list[tuple[str, str]]:
+    pages = []
+    items: list[str] = sorted(listdir(src_path))
     for item in items:
         current_src: str = path.join(src_path, item)
         current_dest: str = path.join(dest_path, item)
         if path.isfile(current_src):
             if current_src[-2:] != "md":
-                print("skipping non-markdown content file")
-            html_dest: str = current_dest[:-2] + "html"
-            generate_page(current_src, template_path, html_dest, base_path)
+                detail("skipping non-markdown content file")
+                continue
+            pages.append((current_src, current_dest[:-2] + "html"))
             continue
-        print(f"Creating destination directory {current_dest}")
-        mkdir(current_dest)
-        generate_pages_recursive(
-            current_src,
+        detail(f"Creating destination directory {current_dest}")
+        makedirs(current_dest, exist_ok=True)
+        pages.extend(discover_pages(current_src, current_dest))
+    return pages
+
+
+# Renders every discovered page, serially or over a process pool, handing
+# each rendered page to an OutputWriter. Large sources are streamed straight
+# to disk by this process instead, one at a time, so they're never held in
+# memory (nor sent back from a worker). Profiled pages are never streamed. A
+# failing page (or write) is reported and recorded, but never stops the
+# remaining pages. Without a writer, one is created for this call and closed
+# before returning. With a SiteIndex, every page is added to it along with
+# its PageInfo, for checking links and writing feeds once the build is done.
+def generate_pages(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    options: RenderOptions,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    profile: BuildProfile | None = None,
+    writer: OutputWriter | None = None,
+    summary: BuildSummary | None = None,
+    site_index: SiteIndex | None = None
+) -> list[tuple[str, Exception]]:
+    url_policy = options.url_policy
+    image_sizes = options.image_sizes
+    assets = url_policy.assets
+    profiling = profile is not None
+    # PageInfo is kept for indexing pages and, with image sizes or
+    # fingerprinted assets, for finding the pages that show an image whose
+    # size changed or link to an asset that was renamed.
+    index_pages = (
+        site_index is not None
+        or image_sizes is not None
+        or assets is not None
+    )
+    pending = []
+    for src, dest in pages:
+        if manifest and manifest.page_is_current(
+            src,
             template_path,
-            current_dest,
-            base_path
+            dest,
+            url_policy.key,
+            options.minify
+        ):
+            # Unchanged pages are indexed from the PageInfo the manifest kept
+            # for them; pages built before it was kept are rendered again.
+            stored_info = manifest.page_info(dest)
+            if index_pages and stored_info is None:
+                pending.append((src, dest))
+                continue
+            if index_pages:
+                page_info = PageInfo(**stored_info)
+                if not dependencies_current(
+                    manifest.page_dependencies(dest),
+                    options
+                ):
+                    pending.append((src, dest))
+                    continue
+            if site_index is not None:
+                site_index.add_page(dest, page_info, page_date(src, page_info))
+            detail(f"Skipping unchanged page {src}")
+            if summary:
+                summary.pages_unchanged += 1
+            continue
+        pending.append((src, dest))
+
+    streamed = []
+    if not profiling:
+        in_memory = []
+        for src, dest in pending:
+            if path.getsize(src) >= options.stream_threshold:
+                streamed.append((src, dest))
+            else:
+                in_memory.append((src, dest))
+        pending = in_memory
+
+    failures = []
+    # (source, destination, output hash, profile, PageInfo, write) of rendered
+    # pages.
+    writes: list[
+        tuple[str, str, str, PageProfile | None, PageInfo | None, Future]
+    ] = []
+
+    def page_failed(src: str, dest: str, page_error: Exception) -> None:
+        error(f"Failed to generate page from {src}: {page_error}")
+        failures.append((src, page_error))
+        if manifest:
+            manifest.keep(dest)
+        if summary:
+            summary.pages_failed += 1
+
+    def page_rendered(
+        src: str,
+        dest: str,
+        html: bytes,
+        page_profile: PageProfile | None,
+        page_info: PageInfo | None
+    ) -> None:
+        write = writer.submit(dest, html)
+        if summary:
+            summary.pages_rendered += 1
+            summary.bytes_in += path.getsize(src)
+            summary.bytes_out += len(html)
+        output_hash = hash_bytes(html)
+        writes.append(
+            (src, dest, output_hash, page_profile, page_info, write)
         )
 
+    def page_written(
+        src: str,
+        dest: str,
+        output_hash: str,
+        page_info: PageInfo | None
+    ) -> None:
+        if manifest:
+            dependencies = None
+            if page_info is not None:
+                dependencies = page_info.dependencies
+            manifest.record_page(
+                src,
+                template_path,
+                dest,
+                url_policy.key,
+                output_hash,
+                page_info,
+                options.minify,
+                dependencies
+            )
+        if site_index is not None:
+            site_index.add_page(dest, page_info, page_date(src, page_info))
+
+    own_writer = writer is None
+    if own_writer:
+        writer = OutputWriter()
+    try:
+        if jobs <= 1 or len(pending) <= 1:
+            for src, dest in pending:
+                try:
+                    html, page_profile, page_info = render_output(
+                        src,
+                        template_path,
+                        dest,
+                        options,
+                        profile=profiling,
+                        index_pages=index_pages
+                    )
+                except Exception as e:
+                    page_failed(src, dest, e)
+                    continue
+                page_rendered(src, dest, html, page_profile, page_info)
+        else:
+            render_pages_in_pool(
+                pending,
+                template_path,
+                options,
+                jobs,
+                profiling,
+                index_pages,
+                page_rendered,
+                page_failed
+            )
+
+        for src, dest, output_hash, page_profile, page_info, write in writes:
+            write_error = write.exception()
+            if write_error is not None:
+                page_failed(src, dest, write_error)
+                continue
+            page_written(src, dest, output_hash, page_info)
+            if page_profile is not None:
+                page_profile.stages["write"] = write.result()[1]
+                profile.add(page_profile)
+
+        for src, dest in streamed:
+            detail(f"Streaming page from {src} to {dest}")
+            page_info = PageInfo() if index_pages else None
+            fragments = stream_page(
+                src,
+                template_path,
+                dest,
+                options,
+                page_info=page_info
+            )
+            try:
+                _, output_hash, size = writer.write_stream(dest, fragments)
+            except Exception as e:
+                page_failed(src, dest, e)
+                continue
+            if summary:
+                summary.pages_rendered += 1
+                summary.bytes_in += path.getsize(src)
+                summary.bytes_out += size
+            page_written(src, dest, output_hash, page_info)
+    finally:
+        if own_writer:
+            writer.close()
+    return failures
+
+
+def render_pages_in_pool(
+    pending: list[tuple[str, str]],
+    template_path: str,
+    options: RenderOptions,
+    jobs: int,
+    profiling: bool,
+    index_pages: bool,
+    page_rendered,
+    page_failed
+) -> None:
+    # Workers are handed the template compiled here rather than each compiling
+    # it again.
+    template = load_template(template_path)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(template_path, template, get_level())
+    ) as pool:
+        futures = {
+            pool.submit(
+                render_output,
+                src,
+                template_path,
+                dest,
+                options,
+                profile=profiling,
+                index_pages=index_pages
+            ): (src, dest)
+            for src, dest in pending
+        }
+        for future in as_completed(futures):
+            src, dest = futures[future]
+            render_error = future.exception()
+            if render_error is not None:
+                page_failed(src, dest, render_error)
+                continue
+            html, page_profile, page_info = future.result()
+            page_rendered(src, dest, html, page_profile, page_info)
+
+
+def init_worker(template_path: str, template, log_level: str) -> None:
+    cache_template(template_path, template)
+    set_level(log_level)
+
+
+# Returns what every way of rendering the page at dest_path renders it with:
+# the template (minified, with minify), the URL policy bound to the page and
+# the page's PageImages.
+def page_setup(
+    template_path: str,
+    dest_path: str,
+    options: RenderOptions
+) -> tuple[Template, URLPolicy, PageImages | None]:
+    template = load_template(template_path)
+    if options.minify:
+        template = template.minified
+    url_policy = options.url_policy.for_page(dest_path)
+    images = page_images(options.image_sizes, dest_path, url_policy)
+    return template, url_policy, images
+
+
+def page_images(
+    image_sizes: ImageSizes | None,
+    dest_path: str,
+    url_policy: URLPolicy
+) -> PageImages | None:
+    if image_sizes is None:
+        return None
+    page_url = None
+    if url_policy.output_dir is not None:
+        relative = path.relpath(dest_path, url_policy.output_dir)
+        page_url = "/" + relative.replace(path.sep, "/")
+    return PageImages(image_sizes, page_url)
+
+
+# Returns the sizes of the images and the names of the assets a page was
+# rendered with, as recorded while rendering it. Pages record these in the
+# manifest, and are rendered again when they no longer hold.
+def page_dependencies(
+    url_policy: URLPolicy,
+    images: PageImages | None
+) -> dict:
+    dependencies = {}
+    if images is not None:
+        dependencies["images"] = images.rendered
+    if url_policy.asset_urls is not None:
+        dependencies["assets"] = url_policy.asset_urls
+    return dependencies
+
+
+# Returns whether the image sizes and asset names a page was rendered with
+# (see page_dependencies) are still the ones this build would use. Each is a
+# single lookup; no URL on the page is resolved again.
+def dependencies_current(
+    dependencies: dict | None,
+    options: RenderOptions
+) -> bool:
+    if dependencies is None:
+        return False
+    image_sizes = options.image_sizes
+    assets = options.url_policy.assets
+    if ("images" in dependencies) != (image_sizes is not None):
+        return False
+    if ("assets" in dependencies) != (assets is not None):
+        return False
+    for url_path, size in dependencies.get("images", {}).items():
+        current = image_sizes.size(url_path)
+        if (list(current) if current is not None else None) != size:
+            return False
+    for url, rewritten in dependencies.get("assets", {}).items():
+        if assets.rewrite(url) != rewritten:
+            return False
+    return True
+
+
+# Pages are dated by their front matter, or else by their source's
+# modification time.
+def page_date(src_path: str, page_info: PageInfo) -> float:
+    if page_info.date is not None:
+        return page_info.date
+    return path.getmtime(src_path)
+
 
 # Pulls the title (# / H1) from a markdown document. Raises an exception when
 # no title is found. Expects Google's standard for document layout (the title
 # is always the first line in the document).
 def extract_title(markdown: str) -> str:
-    heading = markdown_to_blocks(markdown)[0]
-    if not heading.startswith("# "):
-        raise ValueError("Markdown document must start with a title as H1 (#)")
-    return heading[2:].strip()
+    return Document(markdown).title
@@ -1,5 +1,41 @@
-# Models htmlnodes (element tags)
+from collections.abc import Iterator
+from re import compile
+from sys import intern
+from typing import TextIO
+
+
+# Tags and attribute names shared by every node that uses them. Keeping one
+# interned copy means a large page holds references rather than new strings.
+HEADING_TAGS: tuple[str, ...] = tuple(intern(f"h{rank}") for rank in range(7))
+HREF = intern("href")
+SRC = intern("src")
+ALT = intern("alt")
+
+# Leaves without props and with short values (single spaces, punctuation,
+# common words) are shared between nodes, up to this many distinct leaves.
+SHARED_LEAF_MAX_VALUE = 32
+SHARED_LEAF_LIMIT = 4096
+
+# Minified HTML (see HTMLNode.iter_html) collapses every run of whitespace in
+# text to a single space, except within these elements, whose whitespace is
+# significant.
+WHITESPACE_TAGS = frozenset(("pre", "textarea", "script", "style"))
+# Elements that never have content, whose closing slash is optional.
+VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "source", "track", "wbr",
+))
+WHITESPACE = compile(r"\s+")
+# Attribute values that are still unambiguous without quotes.
+UNQUOTED_VALUE = compile(r"[^\s\"'=<>`]+")
+
+
+# Models htmlnodes (element tags). Nodes are allocated by the tens of
+# thousands on large pages, so they use __slots__ instead of per-instance
+# dicts.
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -15,19 +51,39 @@ class HTMLNode():
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
 
-    def to_html(self):
+    def to_html(self, minify: bool = False) -> str:
+        return "".join(self.iter_html(minify))
+
+    # Yields the node's HTML as a series of fragments (tags and values) rather
+    # than one string, so a whole tree can be serialized without every level
+    # copying the text of its children again. With minify, the HTML is
+    # minified as it's serialized: whitespace in text is collapsed (outside
+    # WHITESPACE_TAGS) and attribute values are only quoted when they need to
+    # be.
+    def iter_html(self, minify: bool = False) -> Iterator[str]:
         raise NotImplementedError()
 
-    def props_to_html(self):
-        html_props = ""
+    # Streams the node's HTML straight into a file-like object.
+    def write_html(self, fp: TextIO, minify: bool = False) -> None:
+        fp.writelines(self.iter_html(minify))
+
+    def props_to_html(self, minify: bool = False) -> str:
         if not self.props:
-            return html_props
-        for prop, value in self.props.items():
-            html_props += f' {prop}="{value}"'
-        return html_props
+            return ""
+        if minify:
+            return "".join(
+                f" {prop}={value}" if UNQUOTED_VALUE.fullmatch(value)
+                else f' {prop}="{value}"'
+                for prop, value in self.props.items()
+            )
+        return "".join(
+            f' {prop}="{value}"' for prop, value in self.props.items()
+        )
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         value: str,
@@ -36,15 +92,22 @@ class LeafNode(HTMLNode):
     ):
         super().__init__(tag, value, None, props)
 
-    def to_html(self):
+    def iter_html(self, minify: bool = False) -> Iterator[str]:
         if not self.value:
             raise ValueError("all leaf nodes must have a value")
+        value = self.value
+        if minify and self.tag not in WHITESPACE_TAGS:
+            value = collapse_whitespace(value)
         if not self.tag:
-            return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            yield value
+            return
+        props = self.props_to_html(minify)
+        yield f"<{self.tag}{props}>{value}</{self.tag}>"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -53,13 +116,69 @@ class ParentNode(HTMLNode):
     ):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def iter_html(self, minify: bool = False) -> Iterator[str]:
         if not self.tag:
             raise ValueError("all parent nodes must have a tag")
         if not self.children:
             raise ValueError("all parent nodes must have children")
-        html = f"<{self.tag}{self.props_to_html()}>"
+        yield f"<{self.tag}{self.props_to_html(minify)}>"
+        # Text within <pre> and the like is kept as written, however deeply
+        # nested.
+        minify_children = minify and self.tag not in WHITESPACE_TAGS
         for child in self.children:
-            html += child.to_html()
-        html += f"</{self.tag}>"
-        return html
+            yield from child.iter_html(minify_children)
+        yield f"</{self.tag}>"
+
+
+# Models elements that never have content (see VOID_TAGS), such as <img>.
+# Everything they describe is in their props, and they have no closing tag.
+class VoidNode(HTMLNode):
+    __slots__ = ()
+
+    def __init__(self, tag: str, props: dict[str:str] | None = None):
+        super().__init__(tag, None, None, props)
+
+    def iter_html(self, minify: bool = False) -> Iterator[str]:
+        if self.tag not in VOID_TAGS:
+            raise ValueError(f"<{self.tag}> is not a void element")
+        yield f"<{self.tag}{self.props_to_html(minify)}>"
+
+
+# Models HTML that is already serialized, such as a block taken from a
+# BlockCache. It's yielded as it is, minified or not: it was minified (or
+# not) when it was serialized.
+class RawNode(LeafNode):
+    __slots__ = ()
+
+    def __init__(self, html: str):
+        super().__init__(html)
+
+    def iter_html(self, minify: bool = False) -> Iterator[str]:
+        if not self.value:
+            raise ValueError("all leaf nodes must have a value")
+        yield self.value
+
+
+# Collapses every run of whitespace in text to a single space. Most text has
+# none to collapse, which two checks in C tell without running the regex.
+def collapse_whitespace(text: str) -> str:
+    if text.isprintable() and "  " not in text:
+        return text
+    return WHITESPACE.sub(" ", text)
+
+
+_shared_leaves: dict[tuple[str | None, str], LeafNode] = {}
+
+
+# Returns a LeafNode for value, reusing one flyweight instance for short,
+# prop-less leaves. Shared leaves must be treated as immutable.
+def shared_leaf(value: str, tag: str | None = None) -> LeafNode:
+    if len(value) > SHARED_LEAF_MAX_VALUE:
+        return LeafNode(value, tag)
+    key = (tag, value)
+    leaf = _shared_leaves.get(key)
+    if leaf is None:
+        leaf = LeafNode(value, tag)
+        if len(_shared_leaves) < SHARED_LEAF_LIMIT:
+            _shared_leaves[key] = leaf
+    return leaf
@@ -0,0 +1,253 @@
+import json
+from os import getpid, makedirs, path, replace
+from posixpath import dirname, join, normpath
+from struct import unpack
+from typing import BinaryIO
+
+from filehash import FileHashes
+from urlpolicy import is_external, split_url_suffix
+
+
+IMAGE_EXTENSIONS: tuple[str, ...] = (
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Images on a page up to this many are left to load eagerly, as the first
+# ones are usually above the fold.
+EAGER_IMAGES = 1
+# JPEG start-of-frame markers, which hold the image's dimensions. C4, C8 and
+# CC are other segments sharing the range.
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+# Returns the (width, height) of the PNG, JPEG, GIF or WebP image at
+# file_path, read from its header alone, or None for any other file.
+def read_image_size(file_path: str) -> tuple[int, int] | None:
+    with open(file_path, "rb") as f:
+        head = f.read(32)
+        try:
+            if head[:8] == PNG_SIGNATURE and head[12:16] == b"IHDR":
+                return unpack(">II", head[16:24])
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return unpack("<HH", head[6:10])
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return webp_size(head)
+            if head[:2] == b"\xff\xd8":
+                return jpeg_size(f)
+        except Exception:
+            # A truncated or corrupt header just means no dimensions.
+            return None
+    return None
+
+
+def webp_size(head: bytes) -> tuple[int, int] | None:
+    match head[12:16]:
+        case b"VP8 ":
+            width, height = unpack("<HH", head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        case b"VP8L":
+            bits = unpack("<I", head[21:25])[0]
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        case b"VP8X":
+            width = int.from_bytes(head[24:27], "little") + 1
+            height = int.from_bytes(head[27:30], "little") + 1
+            return width, height
+    return None
+
+
+# Walks the JPEG's segments to its start-of-frame, skipping everything else
+# (EXIF data and embedded thumbnails can run to many kilobytes).
+def jpeg_size(f: BinaryIO) -> tuple[int, int] | None:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if byte == b"":
+            return None
+        marker = byte[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            continue
+        length = unpack(">H", f.read(2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            height, width = unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, 1)
+
+
+# Models the dimensions of every image in a static directory, keyed by the
+# site-root URL the image is served at ("/images/tom.png"). scan() reads the
+# directory before pages are rendered, so rendering only ever looks sizes up.
+# Files are hashed through file_hashes (see filehash), and with a cache_path,
+# sizes are kept on disk by file hash from one build to the next: an
+# unchanged image is never opened twice. The URLs of images whose size
+# changed since the previous scan (or, on the first, since the sizes were
+# cached), or that were added or removed, are kept in changed, for watch
+# mode; builds compare the sizes each page was rendered against instead (see
+# PageImages.rendered).
+class ImageSizes():
+    def __init__(
+        self,
+        static_dir: str,
+        cache_path: str | None = None,
+        file_hashes: FileHashes | None = None
+    ):
+        self.static_dir = static_dir
+        self.cache_path = cache_path
+        self.file_hashes = file_hashes or FileHashes(static_dir)
+        self.sizes: dict[str, tuple[int, int]] = {}
+        self.changed: set[str] = set()
+        # Path relative to static_dir -> hash, as of the previous scan.
+        self.files = self.file_hashes.hashes(IMAGE_EXTENSIONS)
+        # File hash -> dimensions (None when the header couldn't be read).
+        self.hashes: dict[str, tuple[int, int] | None] = {}
+        self.load()
+
+    def __getstate__(self):
+        # Worker processes only look sizes up.
+        return {"static_dir": self.static_dir, "sizes": self.sizes}
+
+    def __setstate__(self, state):
+        self.__init__(state["static_dir"])
+        self.sizes = state["sizes"]
+
+    # The sizes of the files as of the previous scan, by URL.
+    def file_sizes(self) -> dict[str, tuple[int, int] | None]:
+        return {
+            "/" + relative.replace(path.sep, "/"): self.hashes.get(digest)
+            for relative, digest in self.files.items()
+        }
+
+    def load(self) -> None:
+        if self.cache_path is None or not path.isfile(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+            self.hashes = {
+                digest: tuple(size) if size else None
+                for digest, size in data["hashes"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            # A corrupt cache only costs reading the images again.
+            self.hashes = {}
+
+    def save(self) -> None:
+        if self.cache_path is None:
+            return
+        temp_path = f"{self.cache_path}.{getpid()}.tmp"
+        try:
+            makedirs(path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(temp_path, "w") as f:
+                json.dump({"hashes": self.hashes}, f, sort_keys=True)
+            replace(temp_path, self.cache_path)
+        except OSError:
+            return
+
+    # Reads the dimensions of every image in the static directory, reading
+    # only the images whose hash has no size cached. Returns self, so a
+    # scanned ImageSizes can be made in one go.
+    def scan(self) -> "ImageSizes":
+        previous = self.file_sizes()
+        files = self.file_hashes.scan(IMAGE_EXTENSIONS)
+        hashes = {}
+        sizes = {}
+        for relative, digest in files.items():
+            if digest in self.hashes:
+                size = self.hashes[digest]
+            else:
+                file_path = path.join(self.static_dir, relative)
+                try:
+                    size = read_image_size(file_path)
+                except OSError:
+                    continue
+            hashes[digest] = size
+            if size is not None:
+                sizes["/" + relative.replace(path.sep, "/")] = size
+        changed = hashes != self.hashes
+        self.files = files
+        self.hashes = hashes
+        self.sizes = sizes
+        current = self.file_sizes()
+        self.changed = {
+            url for url in previous.keys() | current.keys()
+            if previous.get(url) != current.get(url)
+        }
+        if changed:
+            self.save()
+        return self
+
+    def size(self, url_path: str) -> tuple[int, int] | None:
+        return self.sizes.get(url_path)
+
+
+# Models the images of a single page as it's rendered, handing each one its
+# attributes in document order: width and height (when the image's size is
+# known), which let the browser lay the page out before images arrive, and
+# lazy loading for all but the first EAGER_IMAGES images. page_url (the
+# page's site-root URL) resolves page-relative image URLs.
+class PageImages():
+    def __init__(
+        self,
+        sizes: ImageSizes,
+        page_url: str | None = None,
+        eager: int = EAGER_IMAGES
+    ):
+        self.sizes = sizes
+        self.page_url = page_url
+        self.eager_left = eager
+        # Site-root path -> size of every image the page was rendered with,
+        # for recording what the page depends on (see
+        # gencontent.dependencies_current). Unknown sizes are None.
+        self.rendered: dict[str, list[int] | None] = {}
+
+    # Returns the site-root path of the image at url, as written on the page,
+    # or None for images off the site.
+    def resolve(self, url: str) -> str | None:
+        url_path = split_url_suffix(url)[0]
+        if url_path == "" or is_external(url_path):
+            return None
+        if url_path.startswith("/"):
+            return url_path
+        if self.page_url is None:
+            return None
+        return normpath(join(dirname(self.page_url), url_path))
+
+    # Returns the size of the image at url, recording it in rendered.
+    def size(self, url: str) -> tuple[int, int] | None:
+        url_path = self.resolve(url)
+        if url_path is None:
+            return None
+        size = self.sizes.size(url_path)
+        self.rendered[url_path] = list(size) if size is not None else None
+        return size
+
+    # Returns the attributes of the page's next image, found at url.
+    def props(self, url: str) -> dict[str, str]:
+        props = {}
+        size = self.size(url)
+        if size is not None:
+            props["width"] = str(size[0])
+            props["height"] = str(size[1])
+        if self.eager_left > 0:
+            self.eager_left -= 1
+        else:
+            props["loading"] = "lazy"
+            props["decoding"] = "async"
+        return props
+
+    # Describes the attributes the images at urls would get, for checking a
+    # block's cached HTML (see blockcache), without using any of them up.
+    # eager_left, when given, is the count to describe them from instead.
+    def cache_key(self, urls: list[str], eager_left: int | None = None) -> str:
+        if eager_left is None:
+            eager_left = self.eager_left
+        return ",".join(
+            f"{self.size(url)}:{index < eager_left}"
+            for index, url in enumerate(urls)
+        )
+
+    # Accounts for count images rendered elsewhere (taken from a cache), so
+    # the following images are handed the right attributes.
+    def skip(self, count: int) -> None:
+        self.eager_left = max(0, self.eager_left - count)
@@ -1,36 +1,521 @@
-# Uses markdown and static files to create a static site in /public .
+# Uses markdown and static files to create a static site in /docs .
 # The page is served from a configurable root, given as argv.
-from sys import argv
+from argparse import ArgumentParser, Namespace
+from cProfile import Profile
+from os import cpu_count, path
+from sys import argv, exit
+from time import perf_counter
 
-from gencontent import generate_pages_recursive
-from copystatic import static_to_public
+from assets import AssetManifest
+from blockcache import BlockCache
+from compress import precompress
+from buildlog import (
+    NORMAL,
+    QUIET,
+    VERBOSE,
+    BuildSummary,
+    detail,
+    error,
+    info,
+    set_level,
+)
+from filehash import FileHashes
+from feeds import FEED_FORMATS, RSS, write_feed, write_sitemap
+from gencontent import (
+    STREAM_THRESHOLD,
+    RenderOptions,
+    generate_pages_recursive
+)
+from copystatic import COPY, LINK_MODES, static_to_public
+from imagesize import ImageSizes
+from manifest import BuildManifest
+from profiling import BuildProfile
+from server import ReloadHub, serve_directory, render_server
+from siteindex import SiteIndex
+from urlpolicy import BASE, URL_MODES, URLPolicy
+from watch import SiteWatcher
+from writer import OutputWriter
+
+
+STATIC_SRC: str = "static"
+CONTENT_SRC: str = "content"
+TEMPLATE_PATH: str = "template.html"
+DEST_PATH: str = "docs"
+BLOCK_CACHE_PATH: str = ".cache/blocks"
+IMAGE_CACHE_PATH: str = ".cache/images.json"
+FILE_HASH_CACHE_PATH: str = ".cache/files.json"
 
 
 def main():
-    basepath: str = get_basepath(argv)
-
-    static_src: str = "static"
-    dest_path: str = "docs"
-    print("Copying static files to public ...")
-    static_to_public(static_src, dest_path)
-
-    content_src: str = "content"
-    template_path: str = "template.html"
-    print("Generating pages ...")
-    generate_pages_recursive(content_src, template_path, dest_path, basepath)
-
-
-def get_basepath(args: list[str]) -> str:
-    if len(args) == 2:
-        return args[1]
-
-    default = "/"
-    if len(args) < 2:
-        print("No arg found for the server's base path.")
-    elif len(args) > 2:
-        print("Program expects at most 1 arg.")
-    print(f"Using default basepath {default} .")
-    return default
+    args: Namespace = parse_args(argv[1:])
+    set_level(args.log_level)
+    if args.basepath == "/":
+        detail(f"Using default basepath {args.basepath} .")
+    if args.serve:
+        serve(args)
+        return
+    if args.cprofile:
+        # With --jobs, only the parent process (discovery, static files and
+        # scheduling) shows up in the dump.
+        profiler = Profile()
+        try:
+            summary = profiler.runcall(build, args)
+        finally:
+            profiler.dump_stats(args.cprofile)
+            info(f"Wrote cProfile stats to {args.cprofile}")
+    else:
+        summary = build(args)
+
+    if args.watch:
+        watch(args)
+    if summary.pages_failed:
+        exit(1)
+    if args.strict_links and summary.broken_links:
+        exit(1)
+
+
+def build(args: Namespace) -> BuildSummary:
+    basepath: str = args.basepath
+
+    static_src: str = STATIC_SRC
+    dest_path: str = DEST_PATH
+    # Images and fingerprinted assets are hashed once, for both.
+    file_hashes = FileHashes(static_src, FILE_HASH_CACHE_PATH)
+    assets = get_assets(args, file_hashes)
+    url_policy = get_url_policy(args, assets)
+    manifest = BuildManifest(dest_path)
+    summary = BuildSummary()
+    info("Copying static files to public ...")
+    start = perf_counter()
+    static_to_public(
+        static_src,
+        dest_path,
+        manifest,
+        args.checksum,
+        args.link,
+        summary,
+        assets
+    )
+    summary.record_stage(
+        "static",
+        summary.files_copied,
+        perf_counter() - start
+    )
+
+    # Every page and static file is indexed, so links can be checked against
+    # the whole site once it's built.
+    site_index = SiteIndex(dest_path)
+    for asset in manifest.current_assets:
+        site_index.add_asset(path.join(dest_path, asset))
+    # Pages link to assets by their original names, which pages are checked
+    # against.
+    if assets is not None:
+        for url in assets.names:
+            site_index.add_asset(path.join(dest_path, url[1:]))
+        written = assets.write(dest_path)
+        manifest.record_output(written)
+        info(f"Wrote {written}")
+
+    content_src: str = CONTENT_SRC
+    template_path: str = TEMPLATE_PATH
+    image_sizes = ImageSizes(
+        static_src,
+        IMAGE_CACHE_PATH,
+        file_hashes
+    ).scan()
+    profile = BuildProfile() if args.profile or args.profile_output else None
+    block_cache = None
+    if args.block_cache_size:
+        block_cache = BlockCache(
+            BLOCK_CACHE_PATH,
+            args.block_cache_size * 1024 * 1024
+        )
+    options = RenderOptions(
+        url_policy,
+        block_cache=block_cache,
+        image_sizes=image_sizes,
+        minify=args.minify,
+        stream_threshold=args.stream_threshold * 1024 * 1024
+    )
+    info("Generating pages ...")
+    start = perf_counter()
+    with OutputWriter(args.write_threads) as writer:
+        failures = generate_pages_recursive(
+            content_src,
+            template_path,
+            dest_path,
+            options,
+            manifest=manifest,
+            jobs=args.jobs,
+            profile=profile,
+            writer=writer,
+            summary=summary,
+            site_index=site_index
+        )
+    summary.record_stage(
+        "render",
+        summary.pages_rendered,
+        perf_counter() - start
+    )
+    summary.pages_written = writer.written
+    summary.pages_identical = writer.skipped
+    summary.record_stage(
+        "write",
+        writer.written + writer.skipped + writer.failed,
+        writer.seconds
+    )
+    if block_cache is not None:
+        evicted = block_cache.evict()
+        if evicted:
+            detail(f"Evicted {evicted} block(s) from the block cache")
+    for stale in manifest.prune():
+        detail(f"Removed stale page {stale}")
+
+    broken_links = site_index.broken_links()
+    summary.broken_links = len(broken_links)
+    for page_url, url, reason in broken_links:
+        error(f"Broken link in {page_url}: {url} ({reason})")
+
+    # Feeds are written from the metadata indexed while rendering; no source
+    # is read again.
+    site_url = (args.origin or "").rstrip("/") + url_policy.prefix
+    if args.sitemap:
+        for written in write_sitemap(site_index, site_url, dest_path):
+            manifest.record_output(written)
+            info(f"Wrote {written}")
+    if args.feed:
+        written = write_feed(
+            site_index,
+            site_url,
+            dest_path,
+            args.feed,
+            args.feed_format
+        )
+        manifest.record_output(written)
+        info(f"Wrote {written}")
+    # Sitemaps, feeds and asset manifests that earlier builds wrote and this
+    # one didn't are removed.
+    for stale in manifest.prune_outputs():
+        detail(f"Removed stale {stale}")
+
+    if args.precompress:
+        info("Compressing outputs ...")
+        start = perf_counter()
+        compressed, skipped = precompress(
+            dest_path,
+            args.compress_threads,
+            manifest=manifest
+        )
+        summary.record_stage(
+            "compress",
+            compressed + skipped,
+            perf_counter() - start
+        )
+        info(f"Compressed {compressed} file(s) ({skipped} unchanged or small)")
+    # Siblings from earlier builds that this one didn't keep (all of them,
+    # without --precompress) would be served in place of the new outputs.
+    for stale in manifest.prune_siblings():
+        detail(f"Removed stale {stale}")
+    manifest.save()
+
+    if profile is not None:
+        if args.profile:
+            info(profile.report(args.profile_top))
+        if args.profile_output:
+            profile.write_json(args.profile_output)
+            info(f"Wrote page profile to {args.profile_output}")
+
+    info(summary.report())
+    if args.summary_json:
+        summary.write_json(args.summary_json)
+        info(f"Wrote build summary to {args.summary_json}")
+
+    if failures:
+        error(f"{len(failures)} page(s) failed to generate:")
+        for src, page_error in failures:
+            error(f"  {src}: {page_error}")
+    return summary
+
+
+def get_url_policy(
+    args: Namespace,
+    assets: AssetManifest | None = None
+) -> URLPolicy:
+    return URLPolicy(
+        args.url_mode,
+        args.basepath,
+        args.origin,
+        DEST_PATH,
+        assets=assets
+    )
+
+
+def get_assets(
+    args: Namespace,
+    file_hashes: FileHashes
+) -> AssetManifest | None:
+    if not args.fingerprint:
+        return None
+    return AssetManifest(STATIC_SRC, file_hashes).scan()
+
+
+# Serves the output directory and rebuilds whatever changes, until stopped.
+def watch(args: Namespace) -> None:
+    hub = ReloadHub()
+    file_hashes = FileHashes(STATIC_SRC, FILE_HASH_CACHE_PATH)
+    url_policy = get_url_policy(args, get_assets(args, file_hashes))
+    server = serve_directory(
+        DEST_PATH,
+        args.port,
+        hub,
+        prefix=url_policy.prefix
+    )
+    url = f"http://localhost:{args.port}{url_policy.prefix}/"
+    info(f"Serving {DEST_PATH} at {url}")
+    watcher = SiteWatcher(
+        CONTENT_SRC,
+        STATIC_SRC,
+        TEMPLATE_PATH,
+        DEST_PATH,
+        url_policy,
+        hub,
+        args.link,
+        ImageSizes(STATIC_SRC, IMAGE_CACHE_PATH, file_hashes).scan(),
+        args.minify
+    )
+    try:
+        watcher.watch()
+    except KeyboardInterrupt:
+        info("Stopped watching.")
+    finally:
+        server.shutdown()
+
+
+# Renders pages from content/ as they are requested, without building.
+def serve(args: Namespace) -> None:
+    url_policy = get_url_policy(args)
+    server = render_server(
+        CONTENT_SRC,
+        STATIC_SRC,
+        TEMPLATE_PATH,
+        url_policy,
+        args.port,
+        args.cache_size * 1024 * 1024,
+        args.minify
+    )
+    url = f"http://localhost:{args.port}{url_policy.prefix}/"
+    info(f"Serving {CONTENT_SRC} at {url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        info("Stopped serving.")
+    finally:
+        server.server_close()
+
+
+def parse_args(args: list[str]) -> Namespace:
+    parser = ArgumentParser(description="Builds the static site into docs/.")
+    parser.add_argument(
+        "basepath",
+        nargs="?",
+        default="/",
+        help="root the site is served from (default: /)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render pages",
+    )
+    parser.add_argument(
+        "--write-threads",
+        type=int,
+        default=4,
+        metavar="N",
+        help="number of threads writing generated pages (default 4)",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="publish CSS, JS, images and fonts under content-hashed names "
+        f"(index.3f9a1c2e.css), listed in {DEST_PATH}/assets.json, and link "
+        "to them by those names",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="minify pages as they're written: collapse whitespace, drop "
+        "comments and unneeded attribute quotes",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write .gz siblings of compressible outputs (and .br and .zst "
+        "when brotli and zstd are installed) for servers that send them",
+    )
+    parser.add_argument(
+        "--compress-threads",
+        type=int,
+        default=cpu_count() or 1,
+        metavar="N",
+        help="number of threads compressing outputs (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size/mtime",
+    )
+    parser.add_argument(
+        "--link",
+        choices=LINK_MODES,
+        default=COPY,
+        help="how binary static assets are placed in the output",
+    )
+    parser.add_argument(
+        "--url-mode",
+        choices=URL_MODES,
+        default=BASE,
+        help="how site-root links are written: prefixed with the base path, "
+        "as absolute URLs on --origin, or relative to each page",
+    )
+    parser.add_argument(
+        "--origin",
+        help="scheme and host used by --url-mode absolute, e.g. https://x.io",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time each stage of every generated page and report the "
+        "slowest pages",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of pages --profile reports (default 10)",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        help="write the per-page, per-stage profile as JSON",
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="FILE",
+        help="dump cProfile stats for the whole build",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=0,
+        metavar="MB",
+        help=f"cache rendered blocks in {BLOCK_CACHE_PATH}, using up to MB "
+        "of disk space (default 0, off: the cache slows down cold builds "
+        "and only pays off when most blocks are unchanged)",
+    )
+    parser.add_argument(
+        "--stream-threshold",
+        type=int,
+        default=STREAM_THRESHOLD // (1024 * 1024),
+        metavar="MB",
+        help="stream pages whose markdown is at least this large instead of "
+        "rendering them in memory (default 16, 0 streams every page)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after building, serve docs/ with live reload and rebuild "
+        "changed pages and static files",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve pages rendered on request from content/ and static "
+        "files from static/, without building docs/",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=64,
+        metavar="MB",
+        help="memory --serve may use for rendered pages (default 64)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8888,
+        help="port used by --watch and --serve (default 8888)",
+    )
+    parser.add_argument(
+        "--sitemap",
+        action="store_true",
+        help="write sitemap.xml for every page (needs --origin)",
+    )
+    parser.add_argument(
+        "--feed",
+        metavar="SECTION",
+        help="write a feed of the pages under a section such as blog/ to "
+        "SECTION/feed.xml (needs --origin)",
+    )
+    parser.add_argument(
+        "--feed-format",
+        choices=FEED_FORMATS,
+        default=RSS,
+        help="format of --feed (default rss)",
+    )
+    parser.add_argument(
+        "--strict-links",
+        action="store_true",
+        help="fail the build when a page links to a page, file or heading "
+        "that doesn't exist",
+    )
+    parser.add_argument(
+        "--summary-json",
+        metavar="FILE",
+        help="write the end-of-build summary as JSON",
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "-q",
+        "--quiet",
+        dest="log_level",
+        action="store_const",
+        const=QUIET,
+        help="only report errors",
+    )
+    verbosity.add_argument(
+        "-v",
+        "--verbose",
+        dest="log_level",
+        action="store_const",
+        const=VERBOSE,
+        help="report every file copied and page generated",
+    )
+    parser.set_defaults(log_level=NORMAL)
+    parsed = parser.parse_args(args)
+    if parsed.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if parsed.write_threads < 1:
+        parser.error("--write-threads must be at least 1")
+    if parsed.compress_threads < 1:
+        parser.error("--compress-threads must be at least 1")
+    if parsed.url_mode == "absolute" and not parsed.origin:
+        parser.error("--url-mode absolute needs --origin")
+    if (parsed.sitemap or parsed.feed) and not parsed.origin:
+        parser.error("--sitemap and --feed need --origin")
+    if parsed.serve and parsed.watch:
+        parser.error("--serve and --watch can't be combined")
+    if parsed.block_cache_size < 0:
+        parser.error("--block-cache-size can't be negative")
+    if parsed.profile_top < 1:
+        parser.error("--profile-top must be at least 1")
+    if parsed.stream_threshold < 0:
+        parser.error("--stream-threshold can't be negative")
+    if parsed.cache_size < 0:
+        parser.error("--cache-size can't be negative")
+    return parsed
 
 
 if __name__ == "__main__":
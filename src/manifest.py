@@ -0,0 +1,260 @@
+import json
+from hashlib import sha256
+from os import listdir, makedirs, path, remove, rmdir
+
+from blockcache import render_version
+from filehash import hash_file
+from template import load_template
+
+
+MANIFEST_NAME = ".manifest.json"
+
+
+# Models the record of a previous build, stored next to the output. Each page
+# is keyed by its output path (relative to the output directory) and remembers
+# the hashes of everything that went into it, renderer included, so unchanged
+# pages can be skipped and outputs that no longer have a source can be pruned.
+class BuildManifest():
+    def __init__(self, dest_dir: str):
+        self.dest_dir = dest_dir
+        self.path = path.join(dest_dir, MANIFEST_NAME)
+        (
+            self.previous,
+            self.previous_assets,
+            self.previous_siblings,
+            self.previous_outputs
+        ) = self.load()
+        self.current: dict[str, dict] = {}
+        self.current_assets: dict[str, str] = {}
+        self.current_siblings: set[str] = set()
+        self.current_outputs: set[str] = set()
+        self.hashes: dict[str, str] = {}
+        self.renderer = render_version()
+
+    def load(
+        self
+    ) -> tuple[dict[str, dict], dict[str, str], list[str], list[str]]:
+        if not path.isfile(self.path):
+            return {}, {}, [], []
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            return (
+                data.get("pages", {}),
+                data.get("assets", {}),
+                data.get("siblings", []),
+                data.get("outputs", [])
+            )
+        except (OSError, ValueError):
+            # A corrupt manifest only costs us a full rebuild.
+            return {}, {}, [], []
+
+    def save(self) -> None:
+        makedirs(self.dest_dir, exist_ok=True)
+        data = {
+            "pages": self.current,
+            "assets": self.current_assets,
+            "siblings": sorted(self.current_siblings),
+            "outputs": sorted(self.current_outputs),
+        }
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+    # Hashes are cached for the lifetime of the manifest (a single build), so
+    # the shared template is only hashed once.
+    def hash(self, file_path: str) -> str:
+        if file_path not in self.hashes:
+            self.hashes[file_path] = hash_file(file_path)
+        return self.hashes[file_path]
+
+    # A template's hash covers its partials and parents too, so editing any of
+    # them invalidates every page.
+    def template_hash(self, template_path: str) -> str:
+        dependencies = load_template(template_path).dependencies
+        if len(dependencies) == 1:
+            return self.hash(dependencies[0])
+        digest = sha256()
+        for dependency in dependencies:
+            digest.update(self.hash(dependency).encode())
+        return digest.hexdigest()
+
+    def key(self, dest_path: str) -> str:
+        return path.relpath(dest_path, self.dest_dir)
+
+    def entry(
+        self,
+        src_path: str,
+        template_path: str,
+        base_path: str,
+        minify: bool = False
+    ) -> dict[str, str]:
+        return {
+            "source": src_path,
+            "source_hash": self.hash(src_path),
+            "template_hash": self.template_hash(template_path),
+            "base_path": base_path,
+            "minify": minify,
+            "renderer": self.renderer,
+        }
+
+    # Returns True when the page at dest_path was built from identical inputs
+    # (minified or not, as asked) and the output on disk is still the one we
+    # wrote. Current pages are carried over into this build's manifest.
+    def page_is_current(
+        self,
+        src_path: str,
+        template_path: str,
+        dest_path: str,
+        base_path: str,
+        minify: bool = False
+    ) -> bool:
+        key = self.key(dest_path)
+        previous = self.previous.get(key)
+        if previous is None or not path.isfile(dest_path):
+            return False
+        expected = self.entry(src_path, template_path, base_path, minify)
+        for field, value in expected.items():
+            if previous.get(field) != value:
+                return False
+        if previous.get("output_hash") != hash_file(dest_path):
+            return False
+        self.current[key] = previous
+        return True
+
+    def record_page(
+        self,
+        src_path: str,
+        template_path: str,
+        dest_path: str,
+        base_path: str,
+        output_hash: str | None = None,
+        page_info=None,
+        minify: bool = False,
+        dependencies: dict | None = None
+    ) -> None:
+        entry = self.entry(src_path, template_path, base_path, minify)
+        # Callers that still hold the written bytes can pass their hash rather
+        # than have the output read back from disk.
+        entry["output_hash"] = output_hash or hash_file(dest_path)
+        # The page's title, anchors and links (see siteindex.PageInfo) are
+        # kept, so unchanged pages can be indexed without rendering them again.
+        if page_info is not None:
+            entry["info"] = page_info.to_dict()
+        # As are the asset names and image sizes it was rendered against (see
+        # gencontent.page_dependencies), so it's rendered again when they
+        # change, even if the build that changed them never finished.
+        if dependencies is not None:
+            entry["dependencies"] = dependencies
+        self.current[self.key(dest_path)] = entry
+
+    def page_info(self, dest_path: str) -> dict | None:
+        entry = self.current.get(self.key(dest_path))
+        if entry is None:
+            return None
+        return entry.get("info")
+
+    def page_dependencies(self, dest_path: str) -> dict | None:
+        entry = self.current.get(self.key(dest_path))
+        if entry is None:
+            return None
+        return entry.get("dependencies")
+
+    # Starts this build's manifest from the previous one, for partial rebuilds
+    # (e.g. watch mode) that only record what they touch.
+    def carry_over(self) -> None:
+        self.current = dict(self.previous)
+        self.current_assets = dict(self.previous_assets)
+        self.current_siblings = set(self.previous_siblings)
+        self.current_outputs = set(self.previous_outputs)
+
+    # Keeps the previous entry of a page that failed to build, so its last
+    # good output is neither pruned nor taken for current next time.
+    def keep(self, dest_path: str) -> None:
+        key = self.key(dest_path)
+        if key in self.previous:
+            self.current[key] = self.previous[key]
+
+    def forget(self, dest_path: str) -> None:
+        key = self.key(dest_path)
+        self.current.pop(key, None)
+        self.current_assets.pop(key, None)
+
+    # Deletes outputs that were built previously but have no source in this
+    # build, along with any directories left empty. Returns the removed paths.
+    def prune(self) -> list[str]:
+        removed = []
+        for key in self.previous:
+            if key in self.current:
+                continue
+            stale = path.join(self.dest_dir, key)
+            if path.isfile(stale):
+                remove(stale)
+                removed.append(stale)
+                self.remove_empty_dirs(path.dirname(stale))
+        return removed
+
+    # Static assets are tracked by output path, pointing back at their source,
+    # so files deleted from ./static can be removed from the output without
+    # touching anything else in it.
+    def record_asset(self, src_path: str, dest_path: str) -> None:
+        self.current_assets[self.key(dest_path)] = src_path
+
+    def prune_assets(self) -> list[str]:
+        removed = []
+        for key in self.previous_assets:
+            if key in self.current_assets or key in self.current:
+                continue
+            stale = path.join(self.dest_dir, key)
+            if path.isfile(stale):
+                remove(stale)
+                removed.append(stale)
+                self.remove_empty_dirs(path.dirname(stale))
+        return removed
+
+    # Precompressed siblings (see compress) are tracked as well, so a build
+    # that doesn't write them (one without --precompress) removes those that
+    # earlier builds left, which servers would send in place of newer outputs.
+    def record_sibling(self, dest_path: str) -> None:
+        self.current_siblings.add(self.key(dest_path))
+
+    def prune_siblings(self) -> list[str]:
+        removed = []
+        for key in self.previous_siblings:
+            if key in self.current_siblings:
+                continue
+            stale = path.join(self.dest_dir, key)
+            if path.isfile(stale):
+                remove(stale)
+                removed.append(stale)
+        return removed
+
+    # Files written from the whole site (the sitemap, feeds and the asset
+    # manifest) are tracked too, so a build without the option that wrote
+    # one removes it.
+    def record_output(self, dest_path: str) -> None:
+        self.current_outputs.add(self.key(dest_path))
+
+    def prune_outputs(self) -> list[str]:
+        removed = []
+        for key in self.previous_outputs:
+            if (
+                key in self.current_outputs
+                or key in self.current
+                or key in self.current_assets
+            ):
+                continue
+            stale = path.join(self.dest_dir, key)
+            if path.isfile(stale):
+                remove(stale)
+                removed.append(stale)
+                self.remove_empty_dirs(path.dirname(stale))
+        return removed
+
+    def remove_empty_dirs(self, directory: str) -> None:
+        root = path.abspath(self.dest_dir)
+        directory = path.abspath(directory)
+        while directory != root and directory.startswith(root):
+            if listdir(directory):
+                return
+            rmdir(directory)
+            directory = path.dirname(directory)
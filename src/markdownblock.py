@@ -1,7 +1,10 @@
+from collections.abc import Callable, Iterable, Iterator
 from enum import Enum
+from re import compile
 
-from htmlnode import ParentNode, LeafNode
-from textnode import text_to_textnodes, textnode_to_htmlnode
+from htmlnode import HEADING_TAGS, HTMLNode, ParentNode, LeafNode
+from textnode import TextType, text_to_textnodes, textnode_to_htmlnode
+from urlpolicy import URLPolicy
 
 
 class BlockType(Enum):
@@ -13,147 +16,560 @@ class BlockType(Enum):
     ORDERED_LIST = "ol",
 
 
+HEADING_PREFIXES: tuple[str, ...] = (
+    "# ", "## ", "### ", "#### ", "##### ", "###### ",
+)
+CODE_FENCE = "```"
+# Matches what a heading's anchor leaves out: anything but word characters,
+# hyphens and spaces (which become hyphens).
+ANCHOR_EXCLUDED = compile(r"[^\w\- ]")
+
+
+# Models one block of a markdown document, as yielded by the block scanner:
+# its type (a BlockType, or whatever a plugin's BlockHandler uses), the range
+# of source lines it spans (start inclusive, end exclusive) and its lines,
+# with the block's surrounding whitespace stripped.
+class Block():
+    def __init__(
+        self,
+        block_type: BlockType,
+        start: int,
+        end: int,
+        lines: list[str]
+    ):
+        self.block_type = block_type
+        self.start = start
+        self.end = end
+        self.lines = lines
+
+    def __eq__(self, other):
+        return (
+            self.block_type == other.block_type
+            and self.start == other.start
+            and self.end == other.end
+            and self.lines == other.lines
+        )
+
+    def __repr__(self):
+        name = self.block_type
+        if isinstance(name, BlockType):
+            name = name.value[0]
+        return f"Block({name}, {self.start}, {self.end}, {self.lines})"
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
 # Breaks a given markdown document into blocks - stripped of surrounding
 # whitespace.
 def markdown_to_blocks(markdown: str) -> list[str]:
-    split_markdown: list[str] = markdown.split("\n\n")
+    return [block.text for block in iter_blocks(markdown)]
+
+
+def iter_blocks(markdown: str) -> Iterator[Block]:
+    return scan_blocks(markdown.split("\n"))
+
+
+# Models one type of markdown block: which first lines open it, which lines
+# continue it and how it's rendered. A handler is registered (see
+# register_block_handler) under every character its first line can start
+# with, so classifying a block only tries the handlers for its first
+# character, however many types there are. Every other line opens a
+# paragraph.
+#   opens(line):            whether the block's first line opens this type.
+#   continues(line, index): whether the line at index (within the block)
+#                           keeps it this type; otherwise it's a paragraph.
+#                           None continues with any line.
+#   closes(line):           for fenced blocks, which run (blank lines and
+#                           all) until a line closes them.
+#   render(block, url_policy, images, links): the block's HTMLNode, with
+#                           the (TextType, url) of its links appended to
+#                           links, when given (see get_leafnodes).
+class BlockHandler():
+    def __init__(
+        self,
+        block_type,
+        first_chars: str,
+        opens: Callable[[str], bool],
+        render: Callable[..., HTMLNode],
+        continues: Callable[[str, int], bool] | None = None,
+        closes: Callable[[str], bool] | None = None
+    ):
+        self.block_type = block_type
+        self.first_chars = first_chars
+        self.opens = opens
+        self.render = render
+        self.continues = continues
+        self.closes = closes
+
+
+# First character of a block -> the handlers its first line may open, most
+# recently registered first.
+_handlers_by_char: dict[str, list[BlockHandler]] = {}
+_handlers_by_type: dict[object, BlockHandler] = {}
+
+
+# Adds a block type. A handler registered later is tried before those
+# registered under the same characters earlier, so plugins can take over
+# lines the built-in types would open.
+def register_block_handler(handler: BlockHandler) -> None:
+    for char in handler.first_chars:
+        _handlers_by_char.setdefault(char, []).insert(0, handler)
+    _handlers_by_type[handler.block_type] = handler
 
-    # We expect all LeafNodes to have a value, so blocks should not be empty.
-    blocks: list[str] = []
-    for block in split_markdown:
-        if block != "":
-            blocks.append(block.strip())
-    return blocks
 
+def unregister_block_handler(handler: BlockHandler) -> None:
+    for char in handler.first_chars:
+        handlers = _handlers_by_char.get(char, [])
+        if handler in handlers:
+            handlers.remove(handler)
+    if _handlers_by_type.get(handler.block_type) is handler:
+        del _handlers_by_type[handler.block_type]
 
-def block_to_blocktype(block: str) -> BlockType:
+
+# Returns every registered handler, in the order they were registered.
+def block_handlers() -> list[BlockHandler]:
+    return list(_handlers_by_type.values())
+
+
+# Returns the handler of the block a first line opens.
+def block_handler(line: str) -> BlockHandler:
+    for handler in _handlers_by_char.get(line[:1], ()):
+        if handler.opens(line):
+            return handler
+    return PARAGRAPH_HANDLER
+
+
+# Reads markdown line by line, yielding each Block as soon as it ends. Blocks
+# are separated by blank lines, except within a fenced block (such as code),
+# which runs until its closing line. Each block is classified while its lines
+# are read (see BlockHandler). Line numbers count from first_line, for
+# documents whose blocks don't start on their first line (see document).
+def scan_blocks(lines: Iterable[str], first_line: int = 0) -> Iterator[Block]:
+    handler: BlockHandler | None = None
+    block_lines: list[str] = []
+    start = 0
+
+    def end_block(end: int) -> Block:
+        block_lines[-1] = block_lines[-1].rstrip()
+        return Block(handler.block_type, start, end, block_lines)
+
+    for number, line in enumerate(lines, first_line):
+        line = line.rstrip("\r\n")
+        if handler is None:
+            if line.strip() == "":
+                continue
+            line = line.lstrip()
+            start = number
+            block_lines = [line]
+            handler = block_handler(line)
+            continue
+
+        if handler.closes is not None:
+            block_lines.append(line)
+            if handler.closes(line):
+                yield end_block(number + 1)
+                handler = None
+            continue
+
+        if line.strip() == "":
+            yield end_block(number)
+            handler = None
+            continue
+
+        if handler.continues is not None and not handler.continues(
+            line,
+            len(block_lines)
+        ):
+            handler = PARAGRAPH_HANDLER
+        block_lines.append(line)
+
+    if handler is not None:
+        yield end_block(number + 1)
+
+
+# Classifies a block already split from its document, checking every line
+# the way scan_blocks does. A fenced block must be closed by its last line.
+def block_to_blocktype(block: str):
     lines = block.split("\n")
-    # To hedge against processing large blocks repeatedly, we can start by
-    # checking the first character.
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
-        return BlockType.HEADING
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-        return BlockType.CODE
-    if block.startswith(">"):
-        for line in lines:
-            if not line.startswith(">"):
-                return BlockType.PARAGRAPH
-        return BlockType.QUOTE
-    if block.startswith("- "):
-        for line in lines:
-            if not line.startswith("- "):
-                return BlockType.PARAGRAPH
-        return BlockType.UNORDERED_LIST
-    if block.startswith("1. "):
-        for i, line in enumerate(lines):
-            if not line.startswith(f"{i+1}. "):
+    handler = block_handler(lines[0])
+    if handler.closes is not None:
+        if len(lines) > 1 and handler.closes(lines[-1]):
+            return handler.block_type
+        return BlockType.PARAGRAPH
+    if handler.continues is not None:
+        for index, line in enumerate(lines):
+            if not handler.continues(line, index):
                 return BlockType.PARAGRAPH
-        return BlockType.ORDERED_LIST
-
-    return BlockType.PARAGRAPH
+    return handler.block_type
 
 
 # Coverts a markdown document into a single ParentNode containing all HTMLNodes
-# for all segments of the document.
-def markdown_to_htmlnode(markdown: str) -> ParentNode:
+# for all segments of the document. Link and image URLs are rewritten through
+# the url_policy, when given. With a block_cache (see blockcache), blocks
+# rendered before are taken from the cache instead of being rendered again.
+# With a page_info (see siteindex.PageInfo), the document's anchors and link
+# URLs are collected as its blocks are rendered. A tree that will be
+# serialized with minify (see htmlnode) must be built with minify, so cached
+# blocks are minified too.
+def markdown_to_htmlnode(
+    markdown: str,
+    url_policy: URLPolicy | None = None,
+    block_cache=None,
+    page_info=None,
+    images=None,
+    minify: bool = False
+) -> ParentNode:
+    return blocks_to_htmlnode(
+        iter_blocks(markdown),
+        url_policy,
+        block_cache,
+        page_info,
+        images,
+        minify
+    )
+
+
+# Like markdown_to_htmlnode, for blocks already scanned from a document.
+def blocks_to_htmlnode(
+    blocks: Iterable[Block],
+    url_policy: URLPolicy | None = None,
+    block_cache=None,
+    page_info=None,
+    images=None,
+    minify: bool = False
+) -> ParentNode:
     children = []
-    blocks: list[str] = markdown_to_blocks(markdown)
+    links = [] if page_info is not None else None
+    anchors = HeadingAnchors()
     for block in blocks:
-        children.append(block_to_htmlnode(block))
+        children.append(render_page_block(
+            block,
+            url_policy,
+            block_cache,
+            page_info,
+            images,
+            minify,
+            links,
+            anchors
+        ))
+    if page_info is not None:
+        page_info.add_links(links)
     return ParentNode("div", children)
 
 
-# Returns an appropriate ParentNode for the given block.
-def block_to_htmlnode(block: str) -> ParentNode:
-    blocktype: BlockType = block_to_blocktype(block)
-    match blocktype:
-        case BlockType.PARAGRAPH:
-            return paragraph_to_htmlnode(block)
-        case BlockType.HEADING:
-            return heading_to_htmlnode(block)
-        case BlockType.CODE:
-            return code_to_htmlnode(block)
-        case BlockType.QUOTE:
-            return quote_to_htmlnode(block)
-        case BlockType.UNORDERED_LIST:
-            return unordered_list_to_htmlnode(block)
-        case BlockType.ORDERED_LIST:
-            return ordered_list_to_htmlnode(block)
-
-
-def paragraph_to_htmlnode(block: str) -> ParentNode:
+# Like blocks_to_htmlnode, but yields the document's HTML block by block
+# instead of building its tree: each block's nodes are serialized as soon as
+# they're rendered and can be dropped right after, so memory stays flat
+# however many blocks there are. The HTML is the same as the tree's.
+def blocks_to_html(
+    blocks: Iterable[Block],
+    url_policy: URLPolicy | None = None,
+    block_cache=None,
+    page_info=None,
+    images=None,
+    minify: bool = False
+) -> Iterator[str]:
+    empty = True
+    links = [] if page_info is not None else None
+    anchors = HeadingAnchors()
+    yield "<div>"
+    for block in blocks:
+        empty = False
+        node = render_page_block(
+            block,
+            url_policy,
+            block_cache,
+            page_info,
+            images,
+            minify,
+            links,
+            anchors
+        )
+        if page_info is not None:
+            page_info.add_links(links)
+            links.clear()
+        yield from node.iter_html(minify)
+    if empty:
+        raise ValueError("all parent nodes must have children")
+    yield "</div>"
+
+
+# Returns an appropriate node for the given block, as rendered by its type's
+# BlockHandler. The block's links are appended to links, when given (see
+# textnode.textnode_to_htmlnode).
+# Renders one block of a page, through the block_cache when given. Headings
+# are handed their ids by the page's HeadingAnchors, which page_info records.
+# A heading whose id repeats an earlier one is rendered apart from the cache,
+# as the cached heading carries the plain id.
+def render_page_block(
+    block: Block,
+    url_policy: URLPolicy | None,
+    block_cache,
+    page_info,
+    images,
+    minify: bool,
+    links,
+    anchors: "HeadingAnchors"
+) -> HTMLNode:
+    anchor = unique = ""
+    if block.block_type == BlockType.HEADING:
+        anchor = heading_anchor(heading_text(block)[1])
+        unique = anchors.unique(anchor)
+        if unique and page_info is not None:
+            page_info.add_anchor(unique)
+    if unique != anchor:
+        node = block_to_htmlnode(block, url_policy, images, links)
+        if isinstance(node, ParentNode):
+            node.props = {**(node.props or {}), "id": unique}
+        return node
+    if block_cache is None:
+        return block_to_htmlnode(block, url_policy, images, links)
+    return block_cache.render(block, url_policy, images, minify, links)
+
+
+def block_to_htmlnode(
+    block: Block,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links=None
+) -> HTMLNode:
+    handler = _handlers_by_type[block.block_type]
+    return handler.render(block, url_policy, images, links)
+
+
+def paragraph_to_htmlnode(
+    block: Block,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links=None
+) -> ParentNode:
     # HTML Paragraphs don't implement breaks like markdown does, and we should
     # probably just represent paragraph blocks as continuous text that can then
     # be styled by CSS. Breaks typically act as word separators, so we can just
-    # replace newline characters with spaces.
-    without_newlines = block.replace("\n", " ")
-    return ParentNode("p", get_leafnodes(without_newlines))
+    # join the lines with spaces.
+    without_newlines = " ".join(block.lines)
+    return ParentNode(
+        "p",
+        get_leafnodes(without_newlines, url_policy, images, links)
+    )
+
+
+def heading_to_htmlnode(
+    block: Block,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links=None
+) -> ParentNode:
+    # At this point, we know the block is a heading, so the first line starts
+    # with the hashtags that determine the heading's rank, followed by a space.
+    # The rest of the block can be converted into LeafNode(s) to be stored in
+    # the heading ParentNode. Each heading gets an id, so it can be linked to.
+    rank, text = heading_text(block)
+    textnodes = text_to_textnodes(text)
+    anchor = textnodes_anchor(textnodes)
+    return ParentNode(
+        HEADING_TAGS[rank],
+        [
+            textnode_to_htmlnode(textnode, url_policy, images, links)
+            for textnode in textnodes
+        ],
+        {"id": anchor} if anchor else None
+    )
+
+
+def heading_text(block: Block) -> tuple[int, str]:
+    first_line = block.lines[0]
+    rank: int = len(first_line) - len(first_line.lstrip("#"))
+    return rank, "\n".join([first_line[rank:].lstrip(), *block.lines[1:]])
+
 
+# Returns the id a heading is linked to by, from the plain text its markdown
+# renders to: "Why Tom _Bombadil_?" becomes "why-tom-bombadil".
+def heading_anchor(text: str) -> str:
+    return textnodes_anchor(text_to_textnodes(text))
 
-def heading_to_htmlnode(block: str) -> ParentNode:
-    # At this point, we know the block is a heading, so we can safely split it
-    # on the first space. The first element can be used to determine the
-    # heading's rank. The second element can be converted into LeafNode(s) to
-    # be stored in the heading ParentNode.
-    hashtags, text = block.split(maxsplit=1)
-    rank: int = len(hashtags)
-    return ParentNode(f"h{rank}", get_leafnodes(text))
 
+def textnodes_anchor(textnodes: list) -> str:
+    plain_text = "".join(
+        node.text for node in textnodes if node.text_type != TextType.IMAGE
+    )
+    anchor = ANCHOR_EXCLUDED.sub("", plain_text.lower())
+    return anchor.strip().replace(" ", "-")
 
-def code_to_htmlnode(block: str) -> ParentNode:
+
+# Hands out the ids of a page's headings, numbering repeats: the second
+# "Songs" heading on a page gets "songs-2".
+class HeadingAnchors():
+    def __init__(self):
+        self.used: set[str] = set()
+
+    def unique(self, anchor: str) -> str:
+        if not anchor:
+            return anchor
+        unique = anchor
+        number = 1
+        while unique in self.used:
+            number += 1
+            unique = f"{anchor}-{number}"
+        self.used.add(unique)
+        return unique
+
+
+def code_to_htmlnode(
+    block: Block,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links=None
+) -> ParentNode:
     # Code blocks can be represented as a code LeafNode within a pre ParentNode
     # (preformatted). Code blocks don't render inline formatting. Given that
     # this is a code block, we expect it to be fenced in - not inline. Because
-    # these are preformatted blocks, we must be careful when splitting/joining
-    # on newlines as we might lose any that split to empty elements (such as
-    # at the beginning and end of the block)
-    lines: list[str] = block.split("\n")
-    code: str = "\n".join(lines[1:-1]) + "\n"
+    # these are preformatted blocks, every line between the fences is kept,
+    # blank lines included. A fence left open runs to the end of the document.
+    lines = block.lines[1:]
+    if lines and lines[-1].strip().startswith(CODE_FENCE):
+        lines = lines[:-1]
+    code: str = "\n".join(lines) + "\n"
     code_node = LeafNode(code, "code")
     return ParentNode("pre", [code_node])
 
 
-def quote_to_htmlnode(block: str) -> ParentNode:
-    # Blocks are multiline, so we'll have to clean up the block and recombine
-    # it into a workable, continuous string we can then convert into
+def quote_to_htmlnode(
+    block: Block,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links=None
+) -> ParentNode:
+    # Blocks are multiline, so we'll have to clean up each line and recombine
+    # them into a workable, continuous string we can then convert into
     # LeafNode(s).
-    lines = block.split("\n")
-    cleaned_lines = [line.lstrip(">").strip() for line in lines]
+    cleaned_lines = [line.lstrip(">").strip() for line in block.lines]
     clean_block = "\n".join(cleaned_lines)
-    return ParentNode("blockquote", get_leafnodes(clean_block))
+    return ParentNode(
+        "blockquote",
+        get_leafnodes(clean_block, url_policy, images, links)
+    )
 
 
-def unordered_list_to_htmlnode(block: str) -> ParentNode:
+def unordered_list_to_htmlnode(
+    block: Block,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links=None
+) -> ParentNode:
     # Unordered lists can be represented as a single 'ul' ParentNode containing
     # one or more 'li' ParentNode(s) that each have their progeny of LeafNodes.
     # Because we're representing multiple generations, we want to avoid
     # recombining the entire block back together after we clean up the markdown
     # tags ("- ").
-    lines = block.split("\n")
-    cleaned_lines = [line[2:] for line in lines]
+    cleaned_lines = [line[2:] for line in block.lines]
     list_items = []
     for line in cleaned_lines:
-        list_items.append(ParentNode("li", get_leafnodes(line)))
+        list_items.append(
+            ParentNode(
+                "li",
+                get_leafnodes(line, url_policy, images, links)
+            )
+        )
     return ParentNode("ul", list_items)
 
 
-def ordered_list_to_htmlnode(block: str) -> ParentNode:
+def ordered_list_to_htmlnode(
+    block: Block,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links=None
+) -> ParentNode:
     # Ordered lists can be represented as a single 'ol' ParentNode containing
     # one or more 'li' ParentNode(s) that each have their progeny of LeafNodes.
     # Because HTML sorts out the numbering via the 'ol' tag, we need only
     # concern ourselves with cleaning up each line and not with numbering each
-    # of the list items.
-    lines = block.split("\n")
-    cleaned_lines = [line[3:] for line in lines]
+    # of the list items. Numbers grow past one digit, so each line's own
+    # prefix is cut rather than a fixed width.
+    cleaned_lines = [
+        line[len(f"{index + 1}. "):] for index, line in enumerate(block.lines)
+    ]
     list_items = []
     for line in cleaned_lines:
-        list_items.append(ParentNode("li", get_leafnodes(line)))
+        list_items.append(
+            ParentNode(
+                "li",
+                get_leafnodes(line, url_policy, images, links)
+            )
+        )
     return ParentNode("ol", list_items)
 
 
-def get_leafnodes(s: str) -> list[LeafNode]:
+def get_leafnodes(
+    s: str,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links=None
+) -> list[HTMLNode]:
     leafnodes = []
     textnodes = text_to_textnodes(s)
     for textnode in textnodes:
-        leafnodes.append(textnode_to_htmlnode(textnode))
+        leafnodes.append(
+            textnode_to_htmlnode(textnode, url_policy, images, links)
+        )
     return leafnodes
+
+
+def opens_code(line: str) -> bool:
+    return line.startswith(CODE_FENCE) and CODE_FENCE not in line[3:]
+
+
+def closes_code(line: str) -> bool:
+    return line.strip().startswith(CODE_FENCE)
+
+
+def continues_ordered_list(line: str, index: int) -> bool:
+    return line.startswith(f"{index + 1}. ")
+
+
+PARAGRAPH_HANDLER = BlockHandler(
+    BlockType.PARAGRAPH,
+    "",
+    lambda line: True,
+    paragraph_to_htmlnode
+)
+_handlers_by_type[BlockType.PARAGRAPH] = PARAGRAPH_HANDLER
+for built_in in (
+    BlockHandler(
+        BlockType.HEADING,
+        "#",
+        lambda line: line.startswith(HEADING_PREFIXES),
+        heading_to_htmlnode
+    ),
+    BlockHandler(
+        BlockType.CODE,
+        CODE_FENCE[0],
+        opens_code,
+        code_to_htmlnode,
+        closes=closes_code
+    ),
+    BlockHandler(
+        BlockType.QUOTE,
+        ">",
+        lambda line: True,
+        quote_to_htmlnode,
+        lambda line, index: line.startswith(">")
+    ),
+    BlockHandler(
+        BlockType.UNORDERED_LIST,
+        "-",
+        lambda line: line.startswith("- "),
+        unordered_list_to_htmlnode,
+        lambda line, index: line.startswith("- ")
+    ),
+    BlockHandler(
+        BlockType.ORDERED_LIST,
+        "1",
+        lambda line: line.startswith("1. "),
+        ordered_list_to_htmlnode,
+        continues_ordered_list
+    ),
+):
+    register_block_handler(built_in)
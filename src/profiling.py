@@ -0,0 +1,100 @@
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from time import perf_counter
+
+
+# The stages a page goes through, in order, as recorded by --profile.
+PAGE_STAGES: tuple[str, ...] = (
+    "read",
+    "blocks",
+    "inline",
+    "serialize",
+    "template",
+    "write",
+)
+
+
+# Models the time one page spent in each stage of generation, along with the
+# size of its source and output. Profiles are plain data, so they can be
+# returned from worker processes.
+class PageProfile():
+    def __init__(self, src_path: str, dest_path: str):
+        self.src_path = src_path
+        self.dest_path = dest_path
+        self.stages: dict[str, float] = dict.fromkeys(PAGE_STAGES, 0.0)
+        self.source_bytes = 0
+        self.output_bytes = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += perf_counter() - start
+
+    @property
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.src_path,
+            "output": self.dest_path,
+            "seconds": round(self.total, 6),
+            "stages": {
+                name: round(seconds, 6)
+                for name, seconds in self.stages.items()
+            },
+            "source_bytes": self.source_bytes,
+            "output_bytes": self.output_bytes,
+        }
+
+
+# Collects the PageProfiles of a build and reports the slowest pages and the
+# time spent in each stage across all of them.
+class BuildProfile():
+    def __init__(self):
+        self.pages: list[PageProfile] = []
+
+    def add(self, page: PageProfile) -> None:
+        self.pages.append(page)
+
+    def slowest_pages(self, limit: int | None = None) -> list[PageProfile]:
+        ranked = sorted(self.pages, key=lambda page: page.total, reverse=True)
+        return ranked[:limit]
+
+    def stage_totals(self) -> list[tuple[str, float]]:
+        totals = dict.fromkeys(PAGE_STAGES, 0.0)
+        for page in self.pages:
+            for name, seconds in page.stages.items():
+                totals[name] += seconds
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def report(self, limit: int = 10) -> str:
+        total = sum(page.total for page in self.pages)
+        lines = [f"Profiled {len(self.pages)} page(s) in {total:.3f}s"]
+        lines.append("")
+        lines.append("Stages (slowest first):")
+        for name, seconds in self.stage_totals():
+            share = seconds / total * 100 if total else 0.0
+            lines.append(f"  {name:<10} {seconds:>9.4f}s {share:>6.1f}%")
+        lines.append("")
+        lines.append(f"Slowest {min(limit, len(self.pages))} page(s):")
+        for page in self.slowest_pages(limit):
+            slowest_stage = max(page.stages, key=page.stages.get)
+            lines.append(
+                f"  {page.total * 1000:>9.2f}ms  {page.src_path}"
+                f"  ({page.source_bytes}B -> {page.output_bytes}B,"
+                f" mostly {slowest_stage})"
+            )
+        return "\n".join(lines)
+
+    def write_json(self, file_path: str) -> None:
+        data = {
+            "stages": dict(self.stage_totals()),
+            "pages": [page.to_dict() for page in self.slowest_pages()],
+        }
+        with open(file_path, "w") as f:
+            json.dump(data, f, indent=2)
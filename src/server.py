@@ -0,0 +1,331 @@
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from os import path, stat
+from threading import Condition, Lock, Thread
+from urllib.parse import unquote, urlsplit
+
+from gencontent import RenderOptions, render_page
+from imagesize import ImageSizes
+from template import load_template
+from urlpolicy import URLPolicy
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    "<script>new EventSource(\"" + LIVE_RELOAD_PATH + "\")"
+    ".onmessage = () => location.reload();</script>"
+)
+
+
+# Tells connected browsers to reload. Each notify() bumps a version number,
+# and every waiting live-reload stream wakes up and sends one event.
+class ReloadHub():
+    def __init__(self):
+        self.version = 0
+        self.condition = Condition()
+
+    def notify(self) -> None:
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+# Returns request_path without the base path prefix ("/SSG") the site is
+# served under, so requests map to files the way they do once published.
+# Paths outside the prefix are returned as they are.
+def strip_prefix(request_path: str, prefix: str) -> str:
+    if not prefix or not request_path.startswith(prefix):
+        return request_path
+    rest = request_path[len(prefix):]
+    if rest == "" or rest[0] in "?#":
+        return "/" + rest
+    if rest[0] != "/":
+        return request_path
+    return rest
+
+
+# Serves the output directory for local previews. HTML pages get a small
+# script injected that listens for reload events on LIVE_RELOAD_PATH; the
+# files on disk are never modified. Requests are served under prefix, the
+# base path pages link to.
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    hub: ReloadHub = ReloadHub()
+    prefix: str = ""
+
+    def translate_path(self, request_path: str) -> str:
+        return super().translate_path(strip_prefix(request_path, self.prefix))
+
+    def do_GET(self):
+        if self.path == LIVE_RELOAD_PATH:
+            self.stream_reloads()
+            return
+        file_path = self.html_path()
+        if file_path is None:
+            super().do_GET()
+            return
+        with open(file_path, "rb") as f:
+            html = f.read()
+        self.send_html(inject_live_reload(html))
+
+    # Returns the HTML file a request maps to, or None for anything else
+    # (including directories that need a trailing-slash redirect first).
+    def html_path(self) -> str | None:
+        file_path = self.translate_path(self.path)
+        if path.isdir(file_path):
+            if not self.path.split("?", 1)[0].endswith("/"):
+                return None
+            file_path = path.join(file_path, "index.html")
+        if file_path.endswith(".html") and path.isfile(file_path):
+            return file_path
+        return None
+
+    def send_html(self, html: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(html)
+
+    def stream_reloads(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.hub.version
+        try:
+            while True:
+                latest = self.hub.wait(version, timeout=15)
+                if latest != version:
+                    version = latest
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    # Keeps the connection alive and notices closed tabs.
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        if self.path != LIVE_RELOAD_PATH:
+            super().log_message(format, *args)
+
+
+def inject_live_reload(html: bytes) -> bytes:
+    script = LIVE_RELOAD_SCRIPT.encode()
+    index = html.rfind(b"</body>")
+    if index == -1:
+        return html + script
+    return html[:index] + script + html[index:]
+
+
+# Starts serving directory on a background thread and returns the server.
+# With a prefix, the directory is served under it (see LiveReloadHandler).
+def serve_directory(
+    directory: str,
+    port: int,
+    hub: ReloadHub,
+    host: str = "localhost",
+    prefix: str = ""
+) -> ThreadingHTTPServer:
+    class Handler(LiveReloadHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+    Handler.hub = hub
+    Handler.prefix = prefix
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Keeps rendered pages in memory, least recently used first out, within a
+# budget of max_bytes. Each entry remembers the mtimes it was rendered from,
+# so an edited source (or template) is rendered again on its next request.
+class RenderCache():
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: OrderedDict[str, tuple[tuple, bytes]] = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: str, version: tuple) -> bytes | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                self.discard(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, version: tuple, html: bytes) -> None:
+        if len(html) > self.max_bytes:
+            return
+        with self.lock:
+            self.discard(key)
+            self.entries[key] = (version, html)
+            self.size += len(html)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    # Callers hold the lock.
+    def discard(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+# Renders pages straight from content/ on request, for previews that never
+# write the site to disk. Request paths map to markdown the same way a build
+# maps markdown to output paths: /blog/tom/ is content/blog/tom/index.md.
+# With minify, pages are minified as a build with --minify writes them.
+class PageRenderer():
+    def __init__(
+        self,
+        content_dir: str,
+        template_path: str,
+        url_policy: URLPolicy,
+        cache: RenderCache,
+        image_sizes: ImageSizes | None = None,
+        minify: bool = False
+    ):
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.url_policy = url_policy
+        self.cache = cache
+        self.image_sizes = image_sizes
+        self.minify = minify
+        # Pages are served as if built into the policy's output directory,
+        # which relative URLs are computed against.
+        self.output_dir = url_policy.output_dir or "docs"
+
+    # Returns the markdown source a request path maps to, or None.
+    def source_for(self, request_path: str) -> str | None:
+        url_path = unquote(urlsplit(request_path).path)
+        url_path = strip_prefix(url_path, self.url_policy.prefix)
+        relative = url_path.lstrip("/")
+        if relative == "" or relative.endswith("/"):
+            relative += "index.html"
+        if not relative.endswith(".html"):
+            return None
+        src = path.normpath(path.join(self.content_dir, relative[:-4] + "md"))
+        if not is_within(src, self.content_dir) or not path.isfile(src):
+            return None
+        return src
+
+    def render(self, src: str) -> bytes:
+        template = load_template(self.template_path)
+        version = (self.minify, stat(src).st_mtime_ns) + tuple(
+            stat(dependency).st_mtime_ns
+            for dependency in template.dependencies
+        )
+        html = self.cache.get(src, version)
+        if html is not None:
+            return html
+        relative = path.relpath(src, self.content_dir)[:-2] + "html"
+        dest = path.join(self.output_dir, relative)
+        fragments = render_page(
+            src,
+            self.template_path,
+            dest,
+            RenderOptions(
+                self.url_policy,
+                image_sizes=self.image_sizes,
+                minify=self.minify
+            )
+        )
+        html = "".join(fragments).encode()
+        self.cache.put(src, version, html)
+        return html
+
+
+# Serves rendered pages through a PageRenderer and everything else straight
+# from the static directory, under the URL policy's base path.
+class RenderHandler(SimpleHTTPRequestHandler):
+    renderer: PageRenderer
+
+    def translate_path(self, request_path: str) -> str:
+        prefix = self.renderer.url_policy.prefix
+        return super().translate_path(strip_prefix(request_path, prefix))
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def serve(self, send_body: bool) -> None:
+        url_path = urlsplit(self.path).path
+        if not url_path.endswith(("/", ".html")):
+            # Directories with a page get the same redirect a file server
+            # would give them.
+            if self.renderer.source_for(url_path + "/") is not None:
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        src = self.renderer.source_for(self.path)
+        if src is None:
+            if send_body:
+                super().do_GET()
+            else:
+                super().do_HEAD()
+            return
+        try:
+            html = self.renderer.render(src)
+        except Exception as e:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(html)
+
+
+# Builds the on-demand render server; callers run serve_forever() themselves.
+# Image sizes are read from static_dir once, when the server is built.
+def render_server(
+    content_dir: str,
+    static_dir: str,
+    template_path: str,
+    url_policy: URLPolicy,
+    port: int,
+    cache_bytes: int,
+    minify: bool = False,
+    host: str = "localhost"
+) -> ThreadingHTTPServer:
+    renderer = PageRenderer(
+        content_dir,
+        template_path,
+        url_policy,
+        RenderCache(cache_bytes),
+        ImageSizes(static_dir).scan(),
+        minify
+    )
+
+    class Handler(RenderHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=static_dir, **kwargs)
+
+    Handler.renderer = renderer
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def is_within(file_path: str, directory: str) -> bool:
+    relative = path.relpath(path.abspath(file_path), path.abspath(directory))
+    return not relative.startswith("..")
@@ -0,0 +1,110 @@
+from os import path
+from posixpath import dirname, join, normpath
+
+from textnode import TextType
+from urlpolicy import is_external, resolve_markdown_link, split_url_suffix
+
+
+# Models what the rest of the build needs to know about a page, collected
+# while it is rendered: its title, its front-matter date (if any), the anchors
+# of its headings and every link and image URL, as written in the markdown.
+# Links are collected as text nodes are rendered (see
+# textnode.textnode_to_htmlnode); a BlockCache keeps them with each block's
+# HTML, so blocks taken from the cache are covered too.
+class PageInfo():
+    def __init__(
+        self,
+        title: str = "",
+        anchors: list[str] | None = None,
+        urls: list[str] | None = None,
+        date: float | None = None
+    ):
+        self.title = title
+        self.date = date
+        self.anchors = anchors if anchors is not None else []
+        self.urls = urls if urls is not None else []
+        # The image sizes and asset names the page was rendered with (see
+        # gencontent.page_dependencies), kept in the manifest apart from the
+        # rest.
+        self.dependencies: dict | None = None
+
+    def add_anchor(self, anchor: str) -> None:
+        self.anchors.append(anchor)
+
+    # Adds the (TextType, url) pairs collected while rendering the page.
+    def add_links(self, links: list[tuple[TextType, str]]) -> None:
+        self.urls.extend(url for _, url in links)
+
+    def to_dict(self) -> dict:
+        return {
+            "title": self.title,
+            "anchors": self.anchors,
+            "urls": self.urls,
+            "date": self.date,
+        }
+
+
+# Indexes every page and asset of a build by URL path (relative to the site
+# root, before any base path), along with the anchors on each page. Pages are
+# added as they are rendered, with their PageInfo and modification time, and
+# every link is checked once the whole site is known: each check is a
+# dictionary lookup, so checking a site is linear in its number of links.
+class SiteIndex():
+    def __init__(self, dest_dir: str):
+        self.dest_dir = dest_dir
+        # Normalized URL path -> anchors on the page (none for assets).
+        self.targets: dict[str, set[str]] = {}
+        # URL path of each page -> its PageInfo and modification time.
+        self.pages: dict[str, tuple[PageInfo, float]] = {}
+
+    def url(self, dest_path: str) -> str:
+        relative = path.relpath(dest_path, self.dest_dir)
+        return "/" + relative.replace(path.sep, "/")
+
+    def add_asset(self, dest_path: str) -> None:
+        self.targets.setdefault(normpath(self.url(dest_path)), set())
+
+    # A page is reachable by its file name and, for index.html pages, by
+    # its directory, with or without a trailing slash.
+    def add_page(
+        self,
+        dest_path: str,
+        page_info: PageInfo,
+        updated: float = 0.0
+    ) -> None:
+        page_url = self.url(dest_path)
+        anchors = set(page_info.anchors)
+        self.targets[normpath(page_url)] = anchors
+        if page_url.endswith("/index.html"):
+            self.targets[normpath(dirname(page_url))] = anchors
+        self.pages[page_url] = (page_info, updated)
+
+    # Returns why url, linked from the page at page_url, doesn't resolve, or
+    # None when it does.
+    def check(self, page_url: str, url: str) -> str | None:
+        if is_external(url):
+            return None
+        url_path, suffix = split_url_suffix(resolve_markdown_link(url))
+        fragment = suffix.partition("#")[2]
+        if url_path == "":
+            target = page_url
+        elif url_path.startswith("/"):
+            target = url_path
+        else:
+            target = join(dirname(page_url), url_path)
+        anchors = self.targets.get(normpath(target))
+        if anchors is None:
+            return "no such page or file"
+        if fragment and fragment not in anchors:
+            return f"no heading #{fragment}"
+        return None
+
+    # Returns (page URL, link, reason) for every link that doesn't resolve.
+    def broken_links(self) -> list[tuple[str, str, str]]:
+        broken = []
+        for page_url, (page_info, _) in self.pages.items():
+            for url in page_info.urls:
+                reason = self.check(page_url, url)
+                if reason is not None:
+                    broken.append((page_url, url, reason))
+        return broken
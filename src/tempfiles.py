@@ -0,0 +1,13 @@
+from os import makedirs, path
+
+
+# File helpers shared by the tests that build sites in temporary directories.
+def write(file_path: str, text: str) -> None:
+    makedirs(path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        f.write(text)
+
+
+def read(file_path: str) -> str:
+    with open(file_path, "r") as f:
+        return f.read()
@@ -0,0 +1,439 @@
+from collections.abc import Iterable, Iterator
+from functools import cached_property
+from os import path, stat
+from re import DOTALL, compile
+from typing import TextIO
+
+from htmlnode import UNQUOTED_VALUE, VOID_TAGS, WHITESPACE, WHITESPACE_TAGS
+
+
+# Matches the template syntax: {{ Slot }} placeholders and {% tag %} tags.
+TEMPLATE_SYNTAX = compile(r"\{\{\s*(\w+)\s*\}\}|\{%\s*(.*?)\s*%\}")
+TAG_ARGUMENT = compile(r"""^(\w+)(?:\s+(?:"([^"]*)"|'([^']*)'|(\w+)))?$""")
+# Matches site-root URLs in href/src attributes of the template's markup.
+ATTRIBUTE_URL = compile(r'((?:href|src)=")(/[^"]*)(")')
+# Splits template markup into comments, tags (a tag cut short by a slot or
+# URL runs to the end of its part) and text, for minifying it.
+MARKUP_TOKEN = compile(r"<!--.*?-->|<[^>]*>?|[^<]+", DOTALL)
+TAG_NAME = compile(r"</?([!\w-]*)")
+QUOTED_ATTRIBUTE = compile(r'(\s[\w:-]+=)"([^"]*)"')
+# Whitespace next to these tags (or at either end of the page) never shows,
+# so minified templates leave it out. "" stands for the page's ends.
+BLOCK_TAGS = frozenset((
+    "", "!doctype", "html", "head", "body", "meta", "link", "title", "base",
+    "script", "style", "noscript", "header", "footer", "main", "nav",
+    "article", "section", "aside", "div", "p", "h1", "h2", "h3", "h4", "h5",
+    "h6", "ul", "ol", "li", "blockquote", "pre", "hr", "table", "tr", "td",
+    "th", "thead", "tbody", "form", "figure", "figcaption",
+))
+
+
+# Models a named placeholder in a compiled template. raw keeps the original
+# text, which is rendered as-is when no value is given for the slot.
+class Slot():
+    def __init__(self, name: str, raw: str):
+        self.name = name
+        self.raw = raw
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Slot)
+            and self.name == other.name
+            and self.raw == other.raw
+        )
+
+    def __repr__(self):
+        return f"Slot({self.name})"
+
+
+# Models a site-root URL in one of the template's href/src attributes. URLs
+# are found once, at compile time, and rewritten per page when rendering.
+class URLRef():
+    def __init__(self, url: str):
+        self.url = url
+
+    def __eq__(self, other):
+        return isinstance(other, URLRef) and self.url == other.url
+
+    def __repr__(self):
+        return f"URLRef({self.url})"
+
+
+# Models a {% block name %} section while a template is being resolved. Blocks
+# only exist until inheritance is resolved; compiled templates are flat.
+class TemplateBlock():
+    def __init__(self, name: str, children: list):
+        self.name = name
+        self.children = children
+
+
+# Models a compiled template: a flat list of literal strings, Slots and
+# URLRefs, with partials and inheritance already resolved. Compiled templates
+# hold no open files or compiled regexes, so they can be sent to worker
+# processes.
+class Template():
+    def __init__(
+        self,
+        parts: list[str | Slot | URLRef],
+        dependencies: list[str]
+    ):
+        self.parts = parts
+        self.dependencies = dependencies
+
+    @property
+    def slots(self) -> set[str]:
+        return {part.name for part in self.parts if isinstance(part, Slot)}
+
+    @property
+    def urls(self) -> set[str]:
+        return {part.url for part in self.parts if isinstance(part, URLRef)}
+
+    # The template with its markup minified (see minify_parts), worked out
+    # once rather than for every page.
+    @cached_property
+    def minified(self) -> "Template":
+        return Template(minify_parts(self.parts), self.dependencies)
+
+    # Yields the rendered page in a single pass over the parts. A slot's value
+    # may be a string or an iterable of fragments (e.g. HTMLNode.iter_html()).
+    # URLs are rewritten through the url_policy (see urlpolicy), when given.
+    def render(
+        self,
+        values: dict[str, str | Iterable[str]],
+        url_policy=None
+    ) -> Iterator[str]:
+        for part in self.parts:
+            if isinstance(part, str):
+                yield part
+                continue
+            if isinstance(part, URLRef):
+                if url_policy is None:
+                    yield part.url
+                else:
+                    yield url_policy.rewrite(part.url)
+                continue
+            value = values.get(part.name)
+            if value is None:
+                yield part.raw
+            elif isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+    def render_to(
+        self,
+        fp: TextIO,
+        values: dict[str, str | Iterable[str]],
+        url_policy=None
+    ) -> None:
+        fp.writelines(self.render(values, url_policy))
+
+    def render_to_string(
+        self,
+        values: dict[str, str | Iterable[str]],
+        url_policy=None
+    ) -> str:
+        return "".join(self.render(values, url_policy))
+
+
+# Compiled templates are cached per process, keyed by path. An entry is reused
+# until the template or any of its partials/parents changes on disk.
+_template_cache: dict[str, tuple[Template, dict[str, int]]] = {}
+
+
+def load_template(template_path: str) -> Template:
+    key = path.abspath(template_path)
+    cached = _template_cache.get(key)
+    if cached is not None:
+        template, mtimes = cached
+        if all(mtime_ns(dep) == mtime for dep, mtime in mtimes.items()):
+            return template
+    template = compile_template_file(template_path)
+    cache_template(template_path, template)
+    return template
+
+
+# Seeds the cache with an already compiled template, e.g. one compiled by the
+# parent process and handed to a worker.
+def cache_template(template_path: str, template: Template) -> None:
+    mtimes = {dep: mtime_ns(dep) for dep in template.dependencies}
+    _template_cache[path.abspath(template_path)] = (template, mtimes)
+
+
+def mtime_ns(file_path: str) -> int:
+    try:
+        return stat(file_path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def compile_template_file(template_path: str) -> Template:
+    dependencies: list[str] = []
+    tree = resolve_template(template_path, dependencies, ())
+    return Template(split_urls(flatten(tree)), dependencies)
+
+
+def compile_template(text: str, base_dir: str = ".") -> Template:
+    dependencies: list[str] = []
+    tree = resolve_source(text, base_dir, dependencies, ())
+    return Template(split_urls(flatten(tree)), dependencies)
+
+
+def resolve_template(
+    template_path: str,
+    dependencies: list[str],
+    chain: tuple[str, ...]
+) -> list:
+    template_path = path.abspath(template_path)
+    if template_path in chain:
+        raise ValueError(f"template {template_path} includes itself")
+    dependencies.append(template_path)
+    with open(template_path, "r") as f:
+        text = f.read()
+    return resolve_source(
+        text,
+        path.dirname(template_path),
+        dependencies,
+        chain + (template_path,)
+    )
+
+
+# Parses template text into a tree, inlining partials and, when the template
+# extends a parent, filling the parent's blocks with this template's blocks.
+def resolve_source(
+    text: str,
+    base_dir: str,
+    dependencies: list[str],
+    chain: tuple[str, ...]
+) -> list:
+    def include(name: str) -> list:
+        return resolve_template(
+            path.join(base_dir, name),
+            dependencies,
+            chain
+        )
+
+    parent, tree = parse(text, include)
+    if parent is None:
+        return tree
+    parent_tree = resolve_template(
+        path.join(base_dir, parent),
+        dependencies,
+        chain
+    )
+    overrides = {node.name: node for node in walk_blocks(tree)}
+    return override_blocks(parent_tree, overrides)
+
+
+# Returns the name of the template extended (if any) and the parsed tree of
+# strings, Slots and TemplateBlocks.
+def parse(text: str, include) -> tuple[str | None, list]:
+    parent: str | None = None
+    root: list = []
+    stack: list[tuple[str | None, list]] = [(None, root)]
+    position = 0
+    for match in TEMPLATE_SYNTAX.finditer(text):
+        children = stack[-1][1]
+        if match.start() > position:
+            children.append(text[position:match.start()])
+        position = match.end()
+
+        if match.group(1):
+            children.append(Slot(match.group(1), match.group(0)))
+            continue
+
+        tag, argument = parse_tag(match.group(2))
+        match tag:
+            case "extends":
+                if parent is not None or len(stack) > 1 or any(
+                    not (isinstance(node, str) and node.strip() == "")
+                    for node in root
+                ):
+                    raise ValueError("extends must be the template's first tag")
+                parent = argument
+            case "include":
+                children.extend(include(argument))
+            case "block":
+                block = TemplateBlock(argument, [])
+                children.append(block)
+                stack.append((argument, block.children))
+            case "endblock":
+                if len(stack) == 1:
+                    raise ValueError("endblock without an open block")
+                stack.pop()
+            case _:
+                raise ValueError(f"unknown template tag: {tag}")
+
+    if len(stack) > 1:
+        raise ValueError(f"block {stack[-1][0]} is never closed")
+    if position < len(text):
+        stack[-1][1].append(text[position:])
+    return parent, root
+
+
+def parse_tag(body: str) -> tuple[str, str | None]:
+    match = TAG_ARGUMENT.match(body)
+    if match is None:
+        raise ValueError(f"malformed template tag: {body}")
+    tag = match.group(1)
+    argument = match.group(2) or match.group(3) or match.group(4)
+    if tag in ("extends", "include", "block") and not argument:
+        raise ValueError(f"template tag {tag} needs an argument")
+    return tag, argument
+
+
+def walk_blocks(tree: list) -> Iterator[TemplateBlock]:
+    for node in tree:
+        if isinstance(node, TemplateBlock):
+            yield node
+            yield from walk_blocks(node.children)
+
+
+def override_blocks(tree: list, overrides: dict[str, TemplateBlock]) -> list:
+    resolved = []
+    for node in tree:
+        if not isinstance(node, TemplateBlock):
+            resolved.append(node)
+        elif node.name in overrides:
+            resolved.append(overrides[node.name])
+        else:
+            children = override_blocks(node.children, overrides)
+            resolved.append(TemplateBlock(node.name, children))
+    return resolved
+
+
+# Flattens a resolved tree into parts, merging neighbouring literal strings so
+# rendering does as few writes as possible.
+def flatten(tree: list) -> list[str | Slot]:
+    parts: list[str | Slot] = []
+    for node in tree:
+        if isinstance(node, TemplateBlock):
+            nested = flatten(node.children)
+        else:
+            nested = [node]
+        for part in nested:
+            if isinstance(part, str) and parts and isinstance(parts[-1], str):
+                parts[-1] += part
+            else:
+                parts.append(part)
+    return parts
+
+
+# Splits the site-root URLs of href/src attributes out of literal parts.
+def split_urls(parts: list[str | Slot]) -> list[str | Slot | URLRef]:
+    split: list[str | Slot | URLRef] = []
+    for part in parts:
+        if not isinstance(part, str):
+            split.append(part)
+            continue
+        position = 0
+        for match in ATTRIBUTE_URL.finditer(part):
+            split.append(part[position:match.end(1)])
+            split.append(URLRef(match.group(2)))
+            position = match.start(3)
+        if position < len(part):
+            split.append(part[position:])
+    return split
+
+
+# Minifies the literal parts of a compiled template: comments are dropped
+# (bar conditional ones), whitespace is collapsed to single spaces and left
+# out next to block-level tags, void elements lose their closing slash and
+# attribute values lose quotes they don't need. Text within WHITESPACE_TAGS is
+# kept as written. Slots and URLs are left alone, and whitespace next to a
+# slot is only collapsed, as what the slot holds isn't known until rendering.
+def minify_parts(
+    parts: list[str | Slot | URLRef]
+) -> list[str | Slot | URLRef]:
+    minified: list[str | Slot | URLRef] = []
+    # The tag before the current text; None after a slot.
+    previous: str | None = ""
+    # The <pre>, <script>... whose text is being kept as written.
+    raw_tag: str | None = None
+    # Whether the part starts within a tag cut short by a URL.
+    in_tag = False
+    for index, part in enumerate(parts):
+        if not isinstance(part, str):
+            if isinstance(part, Slot):
+                previous = None
+            minified.append(part)
+            continue
+        tokens = []
+        if in_tag:
+            end = part.find(">") + 1
+            if end == 0:
+                tokens.append(WHITESPACE.sub(" ", part))
+                minified.append("".join(tokens))
+                continue
+            tail = part[:end]
+            if tail.endswith("/>") and previous in VOID_TAGS:
+                tail = tail[:-2].rstrip() + ">"
+            tokens.append(minify_tag(tail))
+            if previous in WHITESPACE_TAGS:
+                raw_tag = previous
+            in_tag = False
+            part = part[end:]
+        at_end = index == len(parts) - 1
+        position = 0
+        while position < len(part):
+            if raw_tag is not None:
+                close = part.lower().find(f"</{raw_tag}", position)
+                if close == -1:
+                    tokens.append(part[position:])
+                    break
+                tokens.append(part[position:close])
+                position = close
+                raw_tag = None
+            token = MARKUP_TOKEN.match(part, position).group(0)
+            position += len(token)
+            if token.startswith("<!--") and token.endswith("-->"):
+                if token.startswith("<!--[if"):
+                    tokens.append(token)
+                continue
+            if token.startswith("<"):
+                name = tag_name(token)
+                previous = name
+                if not token.endswith(">"):
+                    in_tag = True
+                    tokens.append(WHITESPACE.sub(" ", token))
+                    continue
+                if token.endswith("/>") and name in VOID_TAGS:
+                    token = token[:-2].rstrip() + ">"
+                tokens.append(minify_tag(token))
+                if name in WHITESPACE_TAGS and not token.startswith("</"):
+                    raw_tag = name
+                continue
+            if not token.isspace():
+                tokens.append(WHITESPACE.sub(" ", token))
+                continue
+            if position < len(part):
+                following = tag_name(MARKUP_TOKEN.match(part, position)[0])
+            else:
+                following = "" if at_end else None
+            if previous not in BLOCK_TAGS and following not in BLOCK_TAGS:
+                tokens.append(" ")
+        text = "".join(tokens)
+        if text:
+            minified.append(text)
+    return minified
+
+
+def tag_name(token: str) -> str | None:
+    if not token.startswith("<"):
+        return None
+    return TAG_NAME.match(token).group(1).lower()
+
+
+# Collapses the whitespace within a tag and unquotes its attribute values
+# where that's unambiguous.
+def minify_tag(tag: str) -> str:
+    def unquote(match) -> str:
+        value = match.group(2)
+        # A value right before "/>" would take the slash in.
+        if UNQUOTED_VALUE.fullmatch(value) and not tag.startswith(
+            "/", match.end()
+        ):
+            return match.group(1) + value
+        return match.group(0)
+
+    return QUOTED_ATTRIBUTE.sub(unquote, WHITESPACE.sub(" ", tag))
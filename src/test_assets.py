@@ -0,0 +1,178 @@
+import json
+import unittest
+from os import listdir, makedirs, path
+from tempfile import TemporaryDirectory
+
+from assets import AssetManifest, fingerprinted
+from buildlog import BuildSummary
+from copystatic import static_to_public
+from filehash import FileHashes, hash_file
+from gencontent import RenderOptions, generate_pages_recursive
+from manifest import BuildManifest
+from markdownblock import markdown_to_htmlnode
+from urlpolicy import RELATIVE, URLPolicy
+
+
+class TestAssetManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.static = path.join(self.tmp.name, "static")
+        self.cache_path = path.join(self.tmp.name, "files.json")
+        self.write("index.css", b"body {}")
+        self.write("images/tom.png", b"\x89PNG")
+        self.write("robots.txt", b"User-agent: *")
+
+    def write(self, name: str, data: bytes) -> None:
+        file_path = path.join(self.static, name)
+        makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+    def asset_manifest(self) -> AssetManifest:
+        file_hashes = FileHashes(self.static, self.cache_path)
+        return AssetManifest(self.static, file_hashes)
+
+    def test_fingerprinted(self):
+        self.assertEqual(
+            fingerprinted("/index.css", "3f9a1c2e77"),
+            "/index.3f9a1c2e.css"
+        )
+        self.assertEqual(
+            fingerprinted("js/app.min.js", "0123456789"),
+            "js/app.min.01234567.js"
+        )
+
+    def test_scan_and_cache(self):
+        css_hash = hash_file(path.join(self.static, "index.css"))
+        assets = self.asset_manifest().scan()
+        self.assertEqual(set(assets.names), {"/index.css", "/images/tom.png"})
+        self.assertEqual(
+            assets.names["/index.css"],
+            f"/index.{css_hash[:8]}.css"
+        )
+        self.assertEqual(assets.changed, {"/index.css", "/images/tom.png"})
+
+        again = self.asset_manifest().scan()
+        self.assertEqual(again.names, assets.names)
+        self.assertEqual(again.changed, set())
+
+        self.write("index.css", b"body { margin: 0 }")
+        edited = self.asset_manifest().scan()
+        self.assertNotEqual(
+            edited.names["/index.css"],
+            assets.names["/index.css"]
+        )
+        self.assertEqual(edited.changed, {"/index.css"})
+
+    def test_rewrite(self):
+        assets = AssetManifest(self.static).scan()
+        css = assets.names["/index.css"]
+        self.assertEqual(assets.rewrite("/index.css?v=1#x"), css + "?v=1#x")
+        self.assertEqual(assets.rewrite("/robots.txt"), "/robots.txt")
+
+    def test_url_policy_rewrites_assets(self):
+        assets = AssetManifest(self.static).scan()
+        png = assets.names["/images/tom.png"]
+        base = URLPolicy(base_path="/SSG/", assets=assets)
+        self.assertEqual(base.rewrite("/images/tom.png"), "/SSG" + png)
+        self.assertEqual(base.rewrite("/blog/"), "/SSG/blog/")
+        relative = URLPolicy(RELATIVE, output_dir="docs", assets=assets)
+        page = relative.for_page("docs/blog/tom/index.html")
+        self.assertEqual(page.rewrite("/images/tom.png"), "../.." + png)
+        self.assertNotEqual(base.key, URLPolicy(base_path="/SSG/").key)
+
+    def test_page_policy_records_asset_urls(self):
+        assets = AssetManifest(self.static).scan()
+        css = assets.names["/index.css"]
+        policy = URLPolicy(base_path="/SSG/", assets=assets)
+        page = policy.for_page("docs/index.html")
+        for url in ("/index.css#top", "/blog/", "https://example.com/a.css"):
+            page.rewrite(url)
+        self.assertEqual(
+            page.asset_urls,
+            {"/index.css#top": css + "#top", "/blog/": "/blog/"}
+        )
+        self.assertIsNone(policy.asset_urls)
+
+    def test_rendered_links(self):
+        assets = AssetManifest(self.static).scan()
+        policy = URLPolicy(assets=assets)
+        node = markdown_to_htmlnode("![tom](/images/tom.png)", policy)
+        html = node.to_html()
+        self.assertIn(f'src="{assets.names["/images/tom.png"]}"', html)
+
+    def test_static_files_published_under_fingerprinted_names(self):
+        dest = path.join(self.tmp.name, "docs")
+        assets = self.asset_manifest().scan()
+        manifest = BuildManifest(dest)
+        static_to_public(self.static, dest, manifest, assets=assets)
+        manifest.save()
+        css = assets.names["/index.css"][1:]
+        self.assertEqual(
+            sorted(listdir(dest)),
+            sorted([".manifest.json", css, "images", "robots.txt"])
+        )
+
+        self.write("index.css", b"body { margin: 0 }")
+        assets.scan()
+        manifest = BuildManifest(dest)
+        static_to_public(self.static, dest, manifest, assets=assets)
+        self.assertFalse(path.exists(path.join(dest, css)))
+        self.assertTrue(
+            path.isfile(path.join(dest, assets.names["/index.css"][1:]))
+        )
+
+    def test_renamed_asset_renders_linking_pages_again(self):
+        content = path.join(self.tmp.name, "content")
+        dest = path.join(self.tmp.name, "docs")
+        template = path.join(self.tmp.name, "template.html")
+        makedirs(content)
+        makedirs(dest)
+        for name, markdown in {
+            "index.md": "# Home",
+            "tom.md": "# Tom\n\n![tom](/images/tom.png)",
+        }.items():
+            with open(path.join(content, name), "w") as f:
+                f.write(markdown)
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+        def build() -> int:
+            assets = self.asset_manifest().scan()
+            manifest = BuildManifest(dest)
+            summary = BuildSummary()
+            generate_pages_recursive(
+                content,
+                template,
+                dest,
+                RenderOptions(URLPolicy(assets=assets)),
+                manifest=manifest,
+                summary=summary
+            )
+            manifest.save()
+            with open(path.join(dest, "tom.html"), "r") as f:
+                self.assertIn(assets.names["/images/tom.png"], f.read())
+            return summary.pages_rendered
+
+        self.assertEqual(build(), 2)
+        self.assertEqual(build(), 0)
+        self.write("images/tom.png", b"\x89PNG edited")
+        self.assertEqual(build(), 1)
+        # A build interrupted after hashing the assets leaves their cache
+        # ahead of the pages, which are still rendered again.
+        self.write("images/tom.png", b"\x89PNG edited again")
+        self.asset_manifest().scan()
+        self.assertEqual(build(), 1)
+
+    def test_write(self):
+        dest = path.join(self.tmp.name, "docs")
+        makedirs(dest)
+        assets = AssetManifest(self.static).scan()
+        with open(assets.write(dest), "r") as f:
+            self.assertEqual(json.load(f), assets.names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from os import listdir, path, utime
+from tempfile import TemporaryDirectory
+
+from blockcache import BlockCache
+from htmlnode import LeafNode
+from imagesize import ImageSizes, PageImages
+from markdownblock import (
+    BlockHandler,
+    iter_blocks,
+    markdown_to_htmlnode,
+    register_block_handler,
+    unregister_block_handler,
+)
+from siteindex import PageInfo
+from urlpolicy import RELATIVE, URLPolicy
+
+
+class TestBlockCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = BlockCache(self.tmp.name, 1024 * 1024)
+
+    def test_cached_render_matches_render(self):
+        md = "# Title\n\nSome **bold** [link](/blog)\n\n- one\n- two"
+        policy = URLPolicy(base_path="/SSG/")
+        expected = markdown_to_htmlnode(md, policy).to_html()
+        cold = markdown_to_htmlnode(md, policy, self.cache).to_html()
+        warm = markdown_to_htmlnode(md, policy, self.cache).to_html()
+        self.assertEqual(cold, expected)
+        self.assertEqual(warm, expected)
+        self.assertEqual((self.cache.misses, self.cache.hits), (3, 3))
+
+    def test_only_changed_blocks_rendered(self):
+        markdown_to_htmlnode("# Title\n\nfirst\n\nsecond", None, self.cache)
+        markdown_to_htmlnode("# Title\n\nedited\n\nsecond", None, self.cache)
+        self.assertEqual((self.cache.misses, self.cache.hits), (4, 2))
+
+    def test_key_covers_url_policy(self):
+        block = next(iter_blocks("[link](/blog)"))
+        base = URLPolicy(base_path="/SSG/")
+        relative = URLPolicy(RELATIVE, output_dir="docs")
+        keys = {
+            self.cache.key(block, None),
+            self.cache.key(block, base),
+            self.cache.key(block, relative.for_page("docs/a/index.html")),
+            self.cache.key(block, relative.for_page("docs/index.html")),
+        }
+        self.assertEqual(len(keys), 4)
+
+    def test_key_covers_block_handlers(self):
+        block = next(iter_blocks("!!! Careful"))
+        before = self.cache.key(block, None)
+        handler = BlockHandler(
+            "note",
+            "!",
+            lambda line: line.startswith("!!! "),
+            lambda block, url_policy, images, links: LeafNode(block.text)
+        )
+        register_block_handler(handler)
+        self.addCleanup(unregister_block_handler, handler)
+        after = BlockCache(self.tmp.name, 1024).key(block, None)
+        self.assertNotEqual(after, before)
+
+    def test_key_covers_minify(self):
+        md = "A   paragraph\nover  two lines"
+        plain = markdown_to_htmlnode(md, None, self.cache).to_html()
+        minified = markdown_to_htmlnode(
+            md, None, self.cache, minify=True
+        ).to_html(minify=True)
+        self.assertEqual(
+            plain,
+            "<div><p>A   paragraph over  two lines</p></div>"
+        )
+        self.assertEqual(
+            minified,
+            "<div><p>A paragraph over two lines</p></div>"
+        )
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_cached_blocks_report_links(self):
+        md = "# Title\n\n[home](/) and ![tom](/images/tom.png)"
+        cold = PageInfo()
+        warm = PageInfo()
+        markdown_to_htmlnode(md, None, self.cache, cold)
+        markdown_to_htmlnode(md, None, self.cache, warm)
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(cold.urls, ["/", "/images/tom.png"])
+        self.assertEqual(warm.urls, cold.urls)
+
+    def test_entry_checks_image_attributes(self):
+        md = "![tom](/images/tom.png)"
+        sizes = ImageSizes(self.tmp.name)
+        eager = markdown_to_htmlnode(
+            md, None, self.cache, images=PageImages(sizes)
+        ).to_html()
+        lazy = markdown_to_htmlnode(
+            md, None, self.cache, images=PageImages(sizes, eager=0)
+        ).to_html()
+        self.assertNotIn("lazy", eager)
+        self.assertIn('loading="lazy"', lazy)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_evicts_least_recently_used(self):
+        cache = BlockCache(self.tmp.name, 10)
+        cache.put("aa1", "x" * 6)
+        cache.put("aa2", "y" * 6)
+        utime(cache.entry_path("aa1"), ns=(1, 1))
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual(listdir(path.join(self.tmp.name, "aa")), ["aa2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
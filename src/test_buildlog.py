@@ -0,0 +1,51 @@
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import buildlog
+from buildlog import BuildSummary, detail, info, set_level
+
+
+class TestLogLevels(unittest.TestCase):
+
+    def tearDown(self):
+        set_level(buildlog.NORMAL)
+
+    def logged(self, level: str) -> str:
+        set_level(level)
+        out = StringIO()
+        with redirect_stdout(out):
+            info("stage")
+            detail("file")
+        return out.getvalue()
+
+    def test_levels(self):
+        self.assertEqual(self.logged(buildlog.QUIET), "")
+        self.assertEqual(self.logged(buildlog.NORMAL), "stage\n")
+        self.assertEqual(self.logged(buildlog.VERBOSE), "stage\nfile\n")
+
+
+class TestBuildSummary(unittest.TestCase):
+
+    def test_to_dict(self):
+        summary = BuildSummary()
+        summary.pages_rendered = 4
+        summary.bytes_in = 100
+        summary.record_stage("render", 4, 0.5)
+        data = summary.to_dict()
+        self.assertEqual(data["pages"]["rendered"], 4)
+        self.assertEqual(data["bytes"], {"in": 100, "out": 0})
+        self.assertEqual(
+            data["stages"]["render"],
+            {"files": 4, "seconds": 0.5, "per_second": 8.0}
+        )
+        self.assertIn("render", summary.report())
+
+    def test_rate_without_time(self):
+        summary = BuildSummary()
+        summary.record_stage("static", 0, 0.0)
+        self.assertEqual(summary.rate("static"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import gzip
+import unittest
+from os import listdir, makedirs, path, remove, stat, utime
+from tempfile import TemporaryDirectory
+
+from compress import GZIP, ZSTD, gzip_compress, precompress
+from manifest import BuildManifest
+
+
+PAGE = b"<p>" + b"Tom Bombadil " * 100 + b"</p>"
+
+
+class TestPrecompress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dest = self.tmp.name
+        self.write("index.html", PAGE)
+        self.write("small.css", b"body {}")
+        self.write("images/tom.png", PAGE)
+        self.write("archive.tar.gz", b"not a sibling")
+
+    def write(self, name: str, data: bytes) -> str:
+        file_path = path.join(self.dest, name)
+        makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return file_path
+
+    def test_compresses_text_outputs(self):
+        self.assertEqual(precompress(self.dest, 2), (1, 1))
+        self.assertEqual(
+            sorted(listdir(self.dest)),
+            ["archive.tar.gz", "images", "index.html", "index.html.gz",
+             "small.css"]
+        )
+        with gzip.open(path.join(self.dest, "index.html.gz")) as f:
+            self.assertEqual(f.read(), PAGE)
+        self.assertEqual(
+            stat(path.join(self.dest, "index.html.gz")).st_mtime_ns,
+            stat(path.join(self.dest, "index.html")).st_mtime_ns
+        )
+
+    def test_unchanged_files_skipped(self):
+        precompress(self.dest)
+        self.assertEqual(precompress(self.dest), (0, 2))
+        page = self.write("index.html", PAGE + b"<p>more</p>")
+        utime(page, ns=(1, 1))
+        self.assertEqual(precompress(self.dest), (1, 1))
+        with gzip.open(path.join(self.dest, "index.html.gz")) as f:
+            self.assertEqual(f.read(), PAGE + b"<p>more</p>")
+
+    def test_stale_siblings_removed(self):
+        encoders = {GZIP: gzip_compress, ZSTD: lambda data: data[::-1]}
+        precompress(self.dest, encoders=encoders)
+        self.assertTrue(path.isfile(path.join(self.dest, "index.html.zst")))
+        # zstd is no longer available.
+        precompress(self.dest)
+        self.assertFalse(path.exists(path.join(self.dest, "index.html.zst")))
+        remove(path.join(self.dest, "index.html"))
+        precompress(self.dest)
+        self.assertFalse(path.exists(path.join(self.dest, "index.html.gz")))
+        self.assertTrue(path.isfile(path.join(self.dest, "archive.tar.gz")))
+
+    def test_build_without_precompress_removes_siblings(self):
+        manifest = BuildManifest(self.dest)
+        precompress(self.dest, manifest=manifest)
+        manifest.save()
+        sibling = path.join(self.dest, "index.html.gz")
+        self.assertTrue(path.isfile(sibling))
+
+        manifest = BuildManifest(self.dest)
+        precompress(self.dest, manifest=manifest)
+        self.assertEqual(manifest.prune_siblings(), [])
+        manifest.save()
+        self.assertTrue(path.isfile(sibling))
+
+        manifest = BuildManifest(self.dest)
+        self.assertEqual(manifest.prune_siblings(), [sibling])
+        self.assertFalse(path.exists(sibling))
+        self.assertTrue(path.isfile(path.join(self.dest, "archive.tar.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from os import path, remove, stat, utime
+from tempfile import TemporaryDirectory
+
+from copystatic import HARDLINK, is_up_to_date, static_to_public
+from manifest import BuildManifest
+from tempfiles import read, write
+
+
+class TestStaticToPublic(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = path.join(self.tmp.name, "static")
+        self.dst = path.join(self.tmp.name, "docs")
+        write(path.join(self.src, "index.css"), "body {}")
+        write(path.join(self.src, "images", "logo.png"), "\x89PNG")
+
+    def sync(self, **kwargs) -> None:
+        manifest = BuildManifest(self.dst)
+        static_to_public(self.src, self.dst, manifest, **kwargs)
+        manifest.save()
+
+    def test_copies_tree(self):
+        self.sync()
+        self.assertEqual(read(path.join(self.dst, "index.css")), "body {}")
+        self.assertTrue(path.isfile(path.join(self.dst, "images", "logo.png")))
+
+    def test_unchanged_files_are_not_copied(self):
+        self.sync()
+        # Same size and mtime, different content: only a copy would undo it.
+        css = path.join(self.dst, "index.css")
+        times = stat(css)
+        write(css, "body ()")
+        utime(css, ns=(times.st_atime_ns, times.st_mtime_ns))
+        self.sync()
+        self.assertEqual(read(css), "body ()")
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        write(path.join(self.src, "index.css"), "body { margin: 0 }")
+        self.sync()
+        self.assertEqual(
+            read(path.join(self.dst, "index.css")),
+            "body { margin: 0 }"
+        )
+
+    def test_removed_files_are_deleted_but_pages_kept(self):
+        page = path.join(self.dst, "index.html")
+        self.sync()
+        write(page, "<p>generated</p>")
+        remove(path.join(self.src, "images", "logo.png"))
+        self.sync()
+        self.assertFalse(path.exists(path.join(self.dst, "images")))
+        self.assertTrue(path.isfile(page))
+
+    def test_checksum_detects_same_size_edit(self):
+        self.sync()
+        css = path.join(self.src, "index.css")
+        times = stat(path.join(self.dst, "index.css"))
+        write(css, "body {{")
+        utime(css, ns=(times.st_atime_ns, times.st_mtime_ns))
+        dst_css = path.join(self.dst, "index.css")
+        self.assertTrue(is_up_to_date(css, dst_css))
+        self.assertFalse(is_up_to_date(css, dst_css, checksum=True))
+
+    def test_hardlink_binary_assets_only(self):
+        self.sync(link_mode=HARDLINK)
+        png = stat(path.join(self.dst, "images", "logo.png"))
+        css = stat(path.join(self.dst, "index.css"))
+        self.assertEqual(
+            png.st_ino,
+            stat(path.join(self.src, "images", "logo.png")).st_ino
+        )
+        self.assertNotEqual(
+            css.st_ino,
+            stat(path.join(self.src, "index.css")).st_ino
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from datetime import datetime, timezone
+
+from io import StringIO
+
+from document import Document, DocumentStream, iter_lines
+from markdownblock import BlockType
+from siteindex import PageInfo
+from urlpolicy import URLPolicy
+
+
+FRONT_MATTER = """---
+title: "Tom, Revisited"
+date: 2024-05-01
+---
+# Why Tom Bombadil Was a Mistake
+
+See [the others](/blog/).
+"""
+
+
+class TestDocument(unittest.TestCase):
+
+    def test_plain_document(self):
+        document = Document("# Title\n\nSome *text*")
+        self.assertEqual(document.metadata, {})
+        self.assertEqual(document.title, "Title")
+        self.assertIsNone(document.date)
+        self.assertEqual(
+            [block.block_type for block in document.blocks],
+            [BlockType.HEADING, BlockType.PARAGRAPH]
+        )
+
+    def test_front_matter(self):
+        document = Document(FRONT_MATTER)
+        self.assertEqual(
+            document.metadata,
+            {"title": "Tom, Revisited", "date": "2024-05-01"}
+        )
+        self.assertEqual(document.title, "Tom, Revisited")
+        self.assertEqual(
+            document.date,
+            datetime(2024, 5, 1, tzinfo=timezone.utc).timestamp()
+        )
+        # Blocks keep their line numbers within the whole source.
+        self.assertEqual(document.blocks[0].start, 4)
+        self.assertEqual(
+            document.blocks[0].text,
+            "# Why Tom Bombadil Was a Mistake"
+        )
+
+    def test_unclosed_fence_is_content(self):
+        document = Document("---\n# Title")
+        self.assertEqual(document.metadata, {})
+        self.assertEqual(document.blocks[0].text, "---\n# Title")
+
+    def test_bad_front_matter(self):
+        with self.assertRaises(ValueError):
+            Document("---\nnot a pair\n---\n# Title").metadata
+        with self.assertRaises(ValueError):
+            Document("---\ndate: someday\n---\n# Title").date
+
+    def test_missing_title(self):
+        with self.assertRaises(ValueError):
+            Document("## Sub-heading\n\n# Title").title
+
+    def test_tree_is_rendered_once_per_policy(self):
+        document = Document("# Title\n\n[home](/)")
+        policy = URLPolicy(base_path="/SSG/")
+        tree = document.htmlnode(policy)
+        self.assertIs(document.htmlnode(policy), tree)
+        self.assertIn('href="/SSG/"', tree.to_html())
+        self.assertIn('href="/"', document.htmlnode().to_html())
+
+    def test_describe(self):
+        info = Document(FRONT_MATTER).describe(PageInfo())
+        self.assertEqual(info.title, "Tom, Revisited")
+        self.assertEqual(info.anchors, ["why-tom-bombadil-was-a-mistake"])
+        self.assertEqual(info.urls, ["/blog/"])
+        self.assertIsNotNone(info.date)
+
+
+class TestDocumentStream(unittest.TestCase):
+
+    def test_iter_lines_matches_split(self):
+        for text in ("", "a", "a\n", "a\n\nb", "a\nb\n\n"):
+            self.assertEqual(
+                list(iter_lines(StringIO(text))),
+                text.split("\n")
+            )
+
+    def test_matches_document(self):
+        for text in (
+            FRONT_MATTER,
+            "# Title\n\n```\nopen fence\n",
+            "---\ntitle: Notes\n---\nJust text",
+        ):
+            document = Document(text)
+            stream = DocumentStream(iter_lines(StringIO(text)))
+            self.assertEqual(stream.metadata, document.metadata)
+            self.assertEqual(stream.title, document.title)
+            self.assertEqual(stream.date, document.date)
+            self.assertEqual(list(stream.blocks), document.blocks)
+
+    def test_unclosed_fence_is_content(self):
+        # Without its closing fence, the title line is just a paragraph, so
+        # the document has no title.
+        with self.assertRaises(ValueError):
+            DocumentStream(iter_lines(StringIO("---\ntitle: Notes\n\nText")))
+
+    def test_missing_title(self):
+        with self.assertRaises(ValueError):
+            DocumentStream(iter_lines(StringIO("Just text")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import tempfile
+import unittest
+from os import path
+from xml.dom.minidom import parse
+
+import feeds
+from feeds import ATOM, public_path, write_feed, write_sitemap
+from siteindex import PageInfo, SiteIndex
+
+
+SITE_URL = "https://example.com/SSG"
+
+
+class TestFeeds(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = self.tmp.name
+        self.index = SiteIndex(self.dest)
+        self.add("index.html", "Home", 100.0)
+        self.add("blog/index.html", "Blog & Notes", 200.0)
+        self.add("blog/tom/index.html", "Tom", 300.0)
+        self.add("blog/majesty/index.html", "Majesty", 400.0)
+        self.add("contact/index.html", "Contact", 500.0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, page: str, title: str, updated: float):
+        dest = path.join(self.dest, page)
+        self.index.add_page(dest, PageInfo(title), updated)
+
+    def read(self, *parts: str) -> str:
+        with open(path.join(self.dest, *parts)) as f:
+            return f.read()
+
+    def test_public_path(self):
+        self.assertEqual(public_path("/blog/tom/index.html"), "/blog/tom/")
+        self.assertEqual(public_path("/notes.html"), "/notes.html")
+
+    def test_sitemap_lists_every_page(self):
+        written = write_sitemap(self.index, SITE_URL, self.dest)
+        self.assertEqual(written, [path.join(self.dest, "sitemap.xml")])
+        locs = [
+            loc.firstChild.data
+            for loc in parse(written[0]).getElementsByTagName("loc")
+        ]
+        self.assertEqual(locs, [
+            "https://example.com/SSG/blog/",
+            "https://example.com/SSG/blog/majesty/",
+            "https://example.com/SSG/blog/tom/",
+            "https://example.com/SSG/contact/",
+            "https://example.com/SSG/",
+        ])
+        self.assertIn("<lastmod>1970-01-01</lastmod>", self.read("sitemap.xml"))
+
+    def test_large_sitemap_is_split(self):
+        limit = feeds.SITEMAP_LIMIT
+        feeds.SITEMAP_LIMIT = 2
+        try:
+            written = write_sitemap(self.index, SITE_URL, self.dest)
+        finally:
+            feeds.SITEMAP_LIMIT = limit
+        self.assertEqual(
+            [path.basename(p) for p in written],
+            ["sitemap.xml", "sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml"]
+        )
+        index = self.read("sitemap.xml")
+        self.assertIn("<sitemapindex", index)
+        self.assertIn(f"<loc>{SITE_URL}/sitemap-3.xml</loc>", index)
+
+    def test_rss_feed_of_section(self):
+        feed_path = write_feed(self.index, SITE_URL, self.dest, "blog")
+        self.assertEqual(feed_path, path.join(self.dest, "blog", "feed.xml"))
+        document = parse(feed_path)
+        titles = [
+            title.firstChild.data
+            for title in document.getElementsByTagName("title")
+        ]
+        # The section's index page titles the feed, newest pages first.
+        self.assertEqual(titles, ["Blog & Notes", "Majesty", "Tom"])
+        self.assertIn(
+            "<link>https://example.com/SSG/blog/majesty/</link>",
+            self.read("blog", "feed.xml")
+        )
+
+    def test_atom_feed_is_limited(self):
+        feed_path = write_feed(
+            self.index,
+            SITE_URL,
+            self.dest,
+            "/blog/",
+            ATOM,
+            limit=1
+        )
+        feed = self.read("blog", "feed.xml")
+        entries = parse(feed_path).getElementsByTagName("entry")
+        self.assertEqual(len(entries), 1)
+        self.assertIn('<link href="https://example.com/SSG/blog/majesty/"/>',
+                      feed)
+        self.assertIn("<updated>1970-01-01T00:06:40Z</updated>", feed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import filehash
+from assets import AssetManifest
+from filehash import FileHashes, hash_file
+from imagesize import ImageSizes
+from tempfiles import write
+
+
+class TestFileHashes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.static = path.join(self.tmp.name, "static")
+        self.cache_path = path.join(self.tmp.name, "files.json")
+        write(path.join(self.static, "images", "tom.png"), "\x89PNG")
+        write(path.join(self.static, "index.css"), "body {}")
+
+    def test_scan_and_cache(self):
+        hashes = FileHashes(self.static, self.cache_path).scan((".css",))
+        css = hash_file(path.join(self.static, "index.css"))
+        self.assertEqual(hashes, {"index.css": css})
+        with patch.object(filehash, "hash_file") as hashed:
+            again = FileHashes(self.static, self.cache_path)
+            self.assertEqual(again.scan((".css",)), hashes)
+            hashed.assert_not_called()
+
+    def test_other_extensions_are_kept(self):
+        file_hashes = FileHashes(self.static, self.cache_path)
+        file_hashes.scan((".png",))
+        file_hashes.scan((".css",))
+        self.assertEqual(
+            set(FileHashes(self.static, self.cache_path).files),
+            {path.join("images", "tom.png"), "index.css"}
+        )
+
+    def test_images_and_assets_hash_each_file_once(self):
+        file_hashes = FileHashes(self.static, self.cache_path)
+        with patch.object(
+            filehash,
+            "hash_file",
+            side_effect=hash_file
+        ) as hashed:
+            ImageSizes(self.static, file_hashes=file_hashes).scan()
+            AssetManifest(self.static, file_hashes).scan()
+        hashed_paths = [call.args[0] for call in hashed.call_args_list]
+        self.assertEqual(
+            sorted(hashed_paths),
+            [
+                path.join(self.static, "images", "tom.png"),
+                path.join(self.static, "index.css"),
+            ]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
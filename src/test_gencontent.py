@@ -1,6 +1,15 @@
 import unittest
+from os import path
+from tempfile import TemporaryDirectory
 
-from gencontent import extract_title
+from gencontent import (
+    RenderOptions,
+    extract_title,
+    generate_pages_recursive
+)
+from manifest import BuildManifest
+from profiling import PAGE_STAGES, BuildProfile
+from tempfiles import read, write
 
 
 class TestGeneratePage(unittest.TestCase):
@@ -19,3 +28,138 @@ class TestGeneratePage(unittest.TestCase):
         md = "## Sub-heading\n\n# Title"
         with self.assertRaises(Exception):
             extract_title(md)
+
+    # generate_pages_recursive()
+    def test_parallel_matches_serial(self):
+        with TemporaryDirectory() as tmp:
+            content, template = make_site(tmp)
+            serial = path.join(tmp, "serial")
+            parallel = path.join(tmp, "parallel")
+            options = RenderOptions("/")
+            generate_pages_recursive(content, template, serial, options)
+            generate_pages_recursive(
+                content,
+                template,
+                parallel,
+                options,
+                jobs=2
+            )
+            for page in ("index.html", path.join("blog", "index.html")):
+                self.assertEqual(
+                    read(path.join(serial, page)),
+                    read(path.join(parallel, page))
+                )
+
+    def test_failed_page_does_not_stop_others(self):
+        with TemporaryDirectory() as tmp:
+            content, template = make_site(tmp)
+            write(path.join(content, "broken.md"), "No title here")
+            dest = path.join(tmp, "out")
+            failures = generate_pages_recursive(
+                content,
+                template,
+                dest,
+                RenderOptions("/"),
+                jobs=2
+            )
+            self.assertEqual([src for src, _ in failures],
+                             [path.join(content, "broken.md")])
+            self.assertTrue(path.isfile(path.join(dest, "index.html")))
+            self.assertFalse(path.exists(path.join(dest, "broken.html")))
+
+    def test_failed_page_keeps_last_good_output(self):
+        with TemporaryDirectory() as tmp:
+            content, template = make_site(tmp)
+            dest = path.join(tmp, "out")
+            blog = path.join(dest, "blog", "index.html")
+            options = RenderOptions("/")
+
+            def build() -> list:
+                manifest = BuildManifest(dest)
+                failures = generate_pages_recursive(
+                    content,
+                    template,
+                    dest,
+                    options,
+                    manifest=manifest
+                )
+                manifest.prune()
+                manifest.save()
+                return failures
+
+            build()
+            published = read(blog)
+            write(path.join(content, "blog", "index.md"), "No title here")
+            self.assertEqual(len(build()), 1)
+            self.assertEqual(read(blog), published)
+            # The page is still rendered again once its source is fixed.
+            write(path.join(content, "blog", "index.md"), "# Fixed")
+            self.assertEqual(build(), [])
+            self.assertIn("Fixed", read(blog))
+
+    def test_profile_matches_plain_build(self):
+        with TemporaryDirectory() as tmp:
+            content, template = make_site(tmp)
+            plain = path.join(tmp, "plain")
+            profiled = path.join(tmp, "profiled")
+            profile = BuildProfile()
+            options = RenderOptions("/")
+            generate_pages_recursive(content, template, plain, options)
+            generate_pages_recursive(
+                content,
+                template,
+                profiled,
+                options,
+                profile=profile
+            )
+            self.assertEqual(
+                read(path.join(plain, "index.html")),
+                read(path.join(profiled, "index.html"))
+            )
+            self.assertEqual(len(profile.pages), 2)
+            page = profile.slowest_pages(1)[0]
+            self.assertEqual(set(page.stages), set(PAGE_STAGES))
+            self.assertEqual(
+                page.output_bytes,
+                len(read(page.dest_path).encode())
+            )
+
+    def test_streamed_pages_match_rendered(self):
+        with TemporaryDirectory() as tmp:
+            content, template = make_site(tmp)
+            write(path.join(content, "broken.md"), "No title here")
+            rendered = path.join(tmp, "rendered")
+            streamed = path.join(tmp, "streamed")
+            generate_pages_recursive(
+                content,
+                template,
+                rendered,
+                RenderOptions("/SSG/")
+            )
+            failures = generate_pages_recursive(
+                content,
+                template,
+                streamed,
+                RenderOptions("/SSG/", stream_threshold=0)
+            )
+            self.assertEqual([src for src, _ in failures],
+                             [path.join(content, "broken.md")])
+            for page in ("index.html", path.join("blog", "index.html")):
+                self.assertEqual(
+                    read(path.join(rendered, page)),
+                    read(path.join(streamed, page))
+                )
+            self.assertFalse(path.exists(path.join(streamed, "broken.html")))
+
+
+def make_site(root: str) -> tuple[str, str]:
+    content = path.join(root, "content")
+    template = path.join(root, "template.html")
+    write(path.join(content, "index.md"), "# Home\n\nA [link](/blog)")
+    write(path.join(content, "blog", "index.md"), "# Blog\n\n- one\n- two")
+    write(template, "<title>{{ Title }}</title>{{ Content }}")
+    return content, template
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,14 @@
 import unittest
+from io import StringIO
 
 from htmlnode import (
     HTMLNode,
     LeafNode,
     ParentNode,
+    RawNode,
+    SHARED_LEAF_MAX_VALUE,
+    VoidNode,
+    shared_leaf,
 )
 
 
@@ -95,6 +100,88 @@ class TestHTMLNode(unittest.TestCase):
             '<div1><div2><p font="calibri">wowee</p></div2></div1>'
         )
 
+    def test_iter_html(self):
+        node = ParentNode("ul", [
+            ParentNode("li", [LeafNode("one")]),
+            ParentNode("li", [LeafNode("two", "b")]),
+        ])
+        self.assertEqual(
+            list(node.iter_html()),
+            ["<ul>", "<li>", "one", "</li>", "<li>", "<b>two</b>", "</li>",
+             "</ul>"]
+        )
+
+    def test_write_html(self):
+        node = ParentNode("div", [LeafNode("link", "a", {"href": "/x"})])
+        buffer = StringIO()
+        node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+        self.assertEqual(buffer.getvalue(), '<div><a href="/x">link</a></div>')
+
+    def test_to_html_base_node(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("p", "text").to_html()
+
+    def test_nodes_have_no_dict(self):
+        for node in (HTMLNode(), LeafNode("x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_shared_leaf(self):
+        self.assertIs(shared_leaf(" "), shared_leaf(" "))
+        self.assertIs(shared_leaf("word", "b"), shared_leaf("word", "b"))
+        self.assertIsNot(shared_leaf("word", "b"), shared_leaf("word", "i"))
+        self.assertEqual(shared_leaf("word", "b").to_html(), "<b>word</b>")
+
+    def test_shared_leaf_long_value(self):
+        value = "x" * (SHARED_LEAF_MAX_VALUE + 1)
+        self.assertIsNot(shared_leaf(value), shared_leaf(value))
+
+    def test_minify_collapses_whitespace(self):
+        node = ParentNode("p", [
+            LeafNode("some \n  text "),
+            LeafNode("bold\ttext", "b"),
+        ])
+        self.assertEqual(
+            node.to_html(minify=True),
+            "<p>some text <b>bold text</b></p>"
+        )
+
+    def test_minify_keeps_pre(self):
+        node = ParentNode("div", [
+            ParentNode("pre", [LeafNode("a  =\n    1\n", "code")]),
+            LeafNode("a  =\n    1", "p"),
+        ])
+        self.assertEqual(
+            node.to_html(minify=True),
+            "<div><pre><code>a  =\n    1\n</code></pre><p>a = 1</p></div>"
+        )
+
+    def test_minify_unquotes_props(self):
+        node = LeafNode("x", "a", {"href": "/blog/tom", "title": "a b"})
+        self.assertEqual(
+            node.to_html(minify=True),
+            '<a href=/blog/tom title="a b">x</a>'
+        )
+        self.assertEqual(
+            node.to_html(),
+            '<a href="/blog/tom" title="a b">x</a>'
+        )
+
+    def test_raw_node_is_not_minified_again(self):
+        html = "<pre><code>a  b</code></pre>"
+        node = ParentNode("div", [RawNode(html)])
+        self.assertEqual(node.to_html(minify=True), f"<div>{html}</div>")
+
+    def test_void_node(self):
+        node = VoidNode("img", {"src": "/a.png", "alt": "an a"})
+        self.assertEqual(node.to_html(), '<img src="/a.png" alt="an a">')
+        self.assertEqual(
+            node.to_html(minify=True),
+            '<img src=/a.png alt="an a">'
+        )
+        with self.assertRaises(ValueError):
+            VoidNode("p").to_html()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+from os import makedirs, path
+from struct import pack
+from tempfile import TemporaryDirectory
+
+from blockcache import BlockCache
+from filehash import FileHashes
+from imagesize import ImageSizes, PageImages, read_image_size
+from markdownblock import markdown_to_htmlnode
+
+
+def png(width: int, height: int) -> bytes:
+    return (
+        b"\x89PNG\r\n\x1a\n" + pack(">I", 13) + b"IHDR"
+        + pack(">II", width, height) + bytes(5)
+    )
+
+
+def jpeg(width: int, height: int) -> bytes:
+    app0 = b"\xff\xe0" + pack(">H", 16) + b"JFIF\x00" + bytes(9)
+    sof = b"\xff\xc0" + pack(">HBHH", 17, 8, height, width) + bytes(12)
+    return b"\xff\xd8" + app0 + sof + b"\xff\xd9"
+
+
+def webp(chunk: bytes, payload: bytes) -> bytes:
+    header = b"RIFF" + pack("<I", 30) + b"WEBP"
+    return header + chunk + pack("<I", 14) + payload
+
+
+class TestReadImageSize(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def size_of(self, data: bytes):
+        file_path = path.join(self.tmp.name, "image")
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return read_image_size(file_path)
+
+    def test_formats(self):
+        vp8 = b"\x00\x00\x00\x9d\x01\x2a" + pack("<HH", 640, 480)
+        vp8l = b"\x2f" + pack("<I", (640 - 1) | (480 - 1) << 14)
+        vp8x = bytes(4) + (640 - 1).to_bytes(3, "little") + (
+            480 - 1).to_bytes(3, "little")
+        cases = {
+            "png": png(640, 480),
+            "gif": b"GIF89a" + pack("<HH", 640, 480) + bytes(8),
+            "jpeg": jpeg(640, 480),
+            "webp vp8": webp(b"VP8 ", vp8),
+            "webp vp8l": webp(b"VP8L", vp8l),
+            "webp vp8x": webp(b"VP8X", vp8x),
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.size_of(data), (640, 480))
+
+    def test_unknown_or_truncated(self):
+        self.assertIsNone(self.size_of(b"not an image"))
+        self.assertIsNone(self.size_of(b"\xff\xd8\xff\xe0\x00"))
+
+
+class TestImageSizes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.static = path.join(self.tmp.name, "static")
+        self.cache_path = path.join(self.tmp.name, "images.json")
+        self.hash_path = path.join(self.tmp.name, "files.json")
+        self.write("images/tom.png", png(928, 468))
+        self.write("index.css", b"body {}")
+
+    def write(self, name: str, data: bytes) -> None:
+        file_path = path.join(self.static, name)
+        makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+    def image_sizes(self) -> ImageSizes:
+        file_hashes = FileHashes(self.static, self.hash_path)
+        return ImageSizes(self.static, self.cache_path, file_hashes)
+
+    def test_scan_and_cache(self):
+        sizes = self.image_sizes().scan()
+        self.assertEqual(sizes.sizes, {"/images/tom.png": (928, 468)})
+        self.assertEqual(sizes.changed, {"/images/tom.png"})
+
+        again = self.image_sizes().scan()
+        self.assertEqual(again.sizes, sizes.sizes)
+        self.assertEqual(again.changed, set())
+
+        self.write("images/tom.png", png(100, 50))
+        resized = self.image_sizes().scan()
+        self.assertEqual(resized.size("/images/tom.png"), (100, 50))
+        self.assertEqual(resized.changed, {"/images/tom.png"})
+
+
+class TestPageImages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        static = path.join(self.tmp.name, "static")
+        makedirs(path.join(static, "images"))
+        with open(path.join(static, "images", "tom.png"), "wb") as f:
+            f.write(png(928, 468))
+        self.sizes = ImageSizes(static).scan()
+
+    def test_first_image_stays_eager(self):
+        images = PageImages(self.sizes, "/blog/tom/index.html")
+        self.assertEqual(
+            images.props("/images/tom.png"),
+            {"width": "928", "height": "468"}
+        )
+        self.assertEqual(
+            images.props("../../images/tom.png?v=1"),
+            {
+                "width": "928",
+                "height": "468",
+                "loading": "lazy",
+                "decoding": "async",
+            }
+        )
+        self.assertEqual(
+            images.props("https://example.com/x.png"),
+            {"loading": "lazy", "decoding": "async"}
+        )
+
+    def test_rendered_page(self):
+        md = "![tom](/images/tom.png)\n\n![again](/images/tom.png)"
+        html = markdown_to_htmlnode(
+            md,
+            images=PageImages(self.sizes)
+        ).to_html()
+        self.assertEqual(
+            html,
+            '<div><p><img src="/images/tom.png" alt="tom" width="928" '
+            'height="468"></p><p><img src="/images/tom.png" alt="again" '
+            'width="928" height="468" loading="lazy" decoding="async"></p>'
+            '</div>'
+        )
+
+    def test_cached_blocks_keep_first_image_eager(self):
+        cache = BlockCache(path.join(self.tmp.name, "cache"), 1024 * 1024)
+        md = "![tom](/images/tom.png)\n\n![again](/images/tom.png)"
+        expected = markdown_to_htmlnode(
+            md,
+            images=PageImages(self.sizes)
+        ).to_html()
+        for _ in range(2):
+            html = markdown_to_htmlnode(
+                md,
+                block_cache=cache,
+                images=PageImages(self.sizes)
+            ).to_html()
+            self.assertEqual(html, expected)
+        self.assertEqual((cache.misses, cache.hits), (2, 2))
+
+    def test_rendered_sizes_are_recorded(self):
+        images = PageImages(self.sizes, "/blog/tom/index.html")
+        images.props("../../images/tom.png")
+        images.props("/images/other.png")
+        images.props("https://example.com/x.png")
+        self.assertEqual(
+            images.rendered,
+            {"/images/tom.png": [928, 468], "/images/other.png": None}
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+from manifest import BuildManifest
+from tempfiles import write
+
+
+class TestBuildManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        self.src = path.join(root, "index.md")
+        self.template = path.join(root, "template.html")
+        self.dest = path.join(root, "index.html")
+        write(self.src, "# Title")
+        write(self.template, "{{ Content }}")
+        write(self.dest, "<h1>Title</h1>")
+
+    def build(self) -> BuildManifest:
+        manifest = BuildManifest(self.tmp.name)
+        manifest.record_page(self.src, self.template, self.dest, "/")
+        manifest.save()
+        return BuildManifest(self.tmp.name)
+
+    def test_unchanged_page_is_current(self):
+        manifest = self.build()
+        self.assertTrue(
+            manifest.page_is_current(self.src, self.template, self.dest, "/")
+        )
+
+    def test_source_edit_invalidates(self):
+        manifest = self.build()
+        write(self.src, "# New title")
+        self.assertFalse(
+            manifest.page_is_current(self.src, self.template, self.dest, "/")
+        )
+
+    def test_template_edit_invalidates(self):
+        manifest = self.build()
+        write(self.template, "<main>{{ Content }}</main>")
+        self.assertFalse(
+            manifest.page_is_current(self.src, self.template, self.dest, "/")
+        )
+
+    def test_base_path_invalidates(self):
+        manifest = self.build()
+        self.assertFalse(
+            manifest.page_is_current(self.src, self.template, self.dest, "SSG")
+        )
+
+    def test_renderer_change_invalidates(self):
+        manifest = self.build()
+        manifest.renderer = "an older renderer"
+        self.assertFalse(
+            manifest.page_is_current(self.src, self.template, self.dest, "/")
+        )
+
+    def test_modified_output_invalidates(self):
+        manifest = self.build()
+        write(self.dest, "<h1>Edited by hand</h1>")
+        self.assertFalse(
+            manifest.page_is_current(self.src, self.template, self.dest, "/")
+        )
+
+    def test_prune_removes_stale_outputs(self):
+        manifest = self.build()
+        removed = manifest.prune()
+        self.assertEqual(removed, [self.dest])
+        self.assertFalse(path.exists(self.dest))
+
+    def test_prune_outputs_removes_unwritten_outputs(self):
+        sitemap = path.join(self.tmp.name, "sitemap.xml")
+        feed = path.join(self.tmp.name, "blog", "feed.xml")
+        write(sitemap, "<urlset/>")
+        write(feed, "<rss/>")
+        manifest = BuildManifest(self.tmp.name)
+        manifest.record_output(sitemap)
+        manifest.record_output(feed)
+        manifest.save()
+
+        manifest = BuildManifest(self.tmp.name)
+        manifest.record_output(sitemap)
+        self.assertEqual(manifest.prune_outputs(), [feed])
+        self.assertTrue(path.isfile(sitemap))
+        self.assertFalse(path.exists(path.dirname(feed)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,20 @@
 import unittest
+from tempfile import TemporaryDirectory
 
 from markdownblock import (
     markdown_to_blocks,
+    markdown_to_htmlnode,
     block_to_blocktype,
+    iter_blocks,
+    register_block_handler,
+    unregister_block_handler,
+    Block,
+    BlockHandler,
     BlockType,
 )
+from blockcache import BlockCache
+from htmlnode import LeafNode
+from urlpolicy import BASE, URLPolicy
 
 
 class TestMarkdownBlocks(unittest.TestCase):
@@ -138,3 +148,116 @@ in double-backticks
         self.assertEqual(result_fail_space_more, expect_fail)
         self.assertEqual(result_fail_num_one, expect_fail)
         self.assertEqual(result_fail_num_more, expect_fail)
+
+    # iter_blocks()
+    def test_iter_blocks_records(self):
+        markdown = "# Title\n\n- one\n- two\n\n1. first\n3. third\n"
+        result = list(iter_blocks(markdown))
+        expect = [
+            Block(BlockType.HEADING, 0, 1, ["# Title"]),
+            Block(BlockType.UNORDERED_LIST, 2, 4, ["- one", "- two"]),
+            Block(BlockType.PARAGRAPH, 5, 7, ["1. first", "3. third"]),
+        ]
+        self.assertEqual(result, expect)
+
+    def test_iter_blocks_fence_keeps_blank_lines(self):
+        markdown = "Intro\n\n```\nfirst\n\nsecond\n```\n\nOutro"
+        result = list(iter_blocks(markdown))
+        self.assertEqual(
+            [block.block_type for block in result],
+            [BlockType.PARAGRAPH, BlockType.CODE, BlockType.PARAGRAPH]
+        )
+        self.assertEqual(result[1].lines, ["```", "first", "", "second", "```"])
+        self.assertEqual(
+            markdown_to_htmlnode(markdown).to_html(),
+            "<div><p>Intro</p><pre><code>first\n\nsecond\n</code></pre>"
+            "<p>Outro</p></div>"
+        )
+
+    def test_iter_blocks_is_lazy(self):
+        blocks = iter_blocks("# Title\n\nbody")
+        self.assertEqual(next(blocks).lines, ["# Title"])
+
+    def test_ordered_list_past_nine(self):
+        markdown = "\n".join(f"{i}. item {i}" for i in range(1, 12))
+        html = markdown_to_htmlnode(markdown).to_html()
+        self.assertIn("<li>item 10</li><li>item 11</li>", html)
+
+    # register_block_handler()
+    def test_plugin_block_handlers(self):
+        html = BlockHandler(
+            "html",
+            "<",
+            lambda line: line.startswith("<div"),
+            lambda block, url_policy, images, links: LeafNode(block.text)
+        )
+        note = BlockHandler(
+            "note",
+            "!",
+            lambda line: line.startswith("!!! "),
+            lambda block, url_policy, images, links: LeafNode(
+                " ".join(block.lines)[4:], "aside"
+            ),
+            lambda line, index: index == 0 or line.startswith("    ")
+        )
+        for handler in (html, note):
+            register_block_handler(handler)
+            self.addCleanup(unregister_block_handler, handler)
+
+        markdown = (
+            '<div class="x">\n<b>raw</b></div>\n\n'
+            "!!! Careful\n    now\n\n"
+            "!!! not\na note\n\n"
+            "![img](/a.png) <i>x</i>"
+        )
+        self.assertEqual(
+            [block.block_type for block in iter_blocks(markdown)],
+            ["html", "note", BlockType.PARAGRAPH, BlockType.PARAGRAPH]
+        )
+        self.assertEqual(block_to_blocktype("!!! Careful\n    now"), "note")
+        self.assertEqual(
+            markdown_to_htmlnode(markdown).to_html(),
+            '<div><div class="x">\n<b>raw</b></div>'
+            "<aside>Careful     now</aside>"
+            "<p>!!! not a note</p>"
+            '<p><img src="/a.png" alt="img"> <i>x</i></p></div>'
+        )
+
+    def test_unregistered_handler_is_gone(self):
+        note = BlockHandler(
+            "note",
+            "!",
+            lambda line: line.startswith("!!! "),
+            lambda block, url_policy, images, links: LeafNode(block.text)
+        )
+        register_block_handler(note)
+        unregister_block_handler(note)
+        self.assertEqual(block_to_blocktype("!!! x"), BlockType.PARAGRAPH)
+
+    # markdown_to_htmlnode()
+    def test_url_policy_skips_code(self):
+        markdown = '[home](/)\n\n```\n<a href="/x">raw</a>\n```'
+        html = markdown_to_htmlnode(markdown, URLPolicy(BASE, "SSG")).to_html()
+        self.assertEqual(
+            html,
+            '<div><p><a href="/SSG/">home</a></p>'
+            '<pre><code><a href="/x">raw</a>\n</code></pre></div>'
+        )
+
+    def test_heading_ids_from_plain_text_and_numbered(self):
+        markdown = "## Songs\n\n## _Tom_'s **Songs**\n\n## Songs\n\n## Songs-2"
+        expected = (
+            '<div><h2 id="songs">Songs</h2>'
+            '<h2 id="toms-songs"><i>Tom</i>\'s <b>Songs</b></h2>'
+            '<h2 id="songs-2">Songs</h2>'
+            '<h2 id="songs-2-2">Songs-2</h2></div>'
+        )
+        self.assertEqual(markdown_to_htmlnode(markdown).to_html(), expected)
+        with TemporaryDirectory() as tmp:
+            cache = BlockCache(tmp, 1024 * 1024)
+            for _ in range(2):
+                html = markdown_to_htmlnode(
+                    markdown,
+                    block_cache=cache
+                ).to_html()
+                self.assertEqual(html, expected)
@@ -0,0 +1,168 @@
+import unittest
+from os import path, stat, utime
+from tempfile import TemporaryDirectory
+from threading import Thread
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from gencontent import RenderOptions, generate_pages_recursive
+from server import PageRenderer, RenderCache, render_server
+from tempfiles import write
+from urlpolicy import URLPolicy
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def test_stale_version_misses(self):
+        cache = RenderCache(100)
+        cache.put("a", (1,), b"<p>a</p>")
+        self.assertEqual(cache.get("a", (1,)), b"<p>a</p>")
+        self.assertIsNone(cache.get("a", (2,)))
+        self.assertEqual(cache.size, 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(10)
+        cache.put("a", (1,), b"aaaa")
+        cache.put("b", (1,), b"bbbb")
+        cache.get("a", (1,))
+        cache.put("c", (1,), b"cccc")
+        self.assertIsNone(cache.get("b", (1,)))
+        self.assertEqual(cache.get("a", (1,)), b"aaaa")
+        self.assertEqual(cache.size, 8)
+
+    def test_oversized_page_not_cached(self):
+        cache = RenderCache(4)
+        cache.put("a", (1,), b"too large")
+        self.assertIsNone(cache.get("a", (1,)))
+
+
+class TestPageRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        self.content = path.join(root, "content")
+        self.static = path.join(root, "static")
+        self.template = path.join(root, "template.html")
+        write(path.join(self.content, "index.md"), "# Home")
+        write(path.join(self.content, "blog", "index.md"), "# Blog")
+        write(path.join(self.content, "about.md"), "# About\n\n[home](/)")
+        write(path.join(self.static, "index.css"), "body {}")
+        write(self.template, "<body>{{ Content }}</body>")
+        self.renderer = PageRenderer(
+            self.content,
+            self.template,
+            URLPolicy(base_path="/SSG/"),
+            RenderCache(1024)
+        )
+
+    def test_source_for(self):
+        self.assertEqual(
+            self.renderer.source_for("/SSG/"),
+            path.join(self.content, "index.md")
+        )
+        self.assertEqual(
+            self.renderer.source_for("/SSG/blog/index.html?x=1"),
+            path.join(self.content, "blog", "index.md")
+        )
+        self.assertEqual(
+            self.renderer.source_for("/SSG/about.html"),
+            path.join(self.content, "about.md")
+        )
+        self.assertIsNone(self.renderer.source_for("/SSG/index.css"))
+        self.assertIsNone(self.renderer.source_for("/SSG/missing/"))
+        self.assertIsNone(self.renderer.source_for("/SSG/../template.html"))
+
+    def test_edit_invalidates_cached_page(self):
+        src = path.join(self.content, "blog", "index.md")
+        self.assertEqual(
+            self.renderer.render(src),
+            b'<body><div><h1 id="blog">Blog</h1></div></body>'
+        )
+        mtime = stat(src).st_mtime_ns
+        write(src, "# Edited")
+        utime(src, ns=(mtime + 10**9, mtime + 10**9))
+        self.assertEqual(
+            self.renderer.render(src),
+            b'<body><div><h1 id="edited">Edited</h1></div></body>'
+        )
+
+    def test_minified_pages_match_build(self):
+        write(self.template, "<body>\n  {{ Content }}\n</body>")
+        write(path.join(self.content, "index.md"), "# Home\n\n- one\n- two")
+        policy = URLPolicy(base_path="/SSG/")
+        dest = path.join(self.tmp.name, "docs")
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            dest,
+            RenderOptions(policy, minify=True)
+        )
+        renderer = PageRenderer(
+            self.content,
+            self.template,
+            policy,
+            RenderCache(1024),
+            minify=True
+        )
+        with open(path.join(dest, "index.html"), "rb") as f:
+            built = f.read()
+        self.assertEqual(
+            renderer.render(path.join(self.content, "index.md")),
+            built
+        )
+        self.assertNotEqual(
+            self.renderer.render(path.join(self.content, "index.md")),
+            built
+        )
+
+    def test_serves_pages_and_static_files(self):
+        server = render_server(
+            self.content,
+            self.static,
+            self.template,
+            URLPolicy(),
+            0,
+            1024
+        )
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = f"http://localhost:{server.server_address[1]}"
+        with urlopen(base + "/about.html") as response:
+            self.assertEqual(
+                response.read(),
+                b'<body><div><h1 id="about">About</h1>'
+                b'<p><a href="/">home</a></p></div></body>'
+            )
+        with urlopen(base + "/blog") as response:
+            self.assertEqual(response.url, base + "/blog/")
+        with urlopen(base + "/index.css") as response:
+            self.assertEqual(response.read(), b"body {}")
+        with self.assertRaises(HTTPError):
+            urlopen(base + "/missing.html")
+
+    def test_serves_static_files_under_base_path(self):
+        server = render_server(
+            self.content,
+            self.static,
+            self.template,
+            URLPolicy(base_path="/SSG/"),
+            0,
+            1024
+        )
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = f"http://localhost:{server.server_address[1]}/SSG"
+        with urlopen(base + "/about.html") as response:
+            self.assertIn(b'<a href="/SSG/">', response.read())
+        with urlopen(base + "/index.css") as response:
+            self.assertEqual(response.read(), b"body {}")
+        with urlopen(base + "/blog") as response:
+            self.assertEqual(response.url, base + "/blog/")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from markdownblock import markdown_to_htmlnode
+from siteindex import PageInfo, SiteIndex
+
+
+def page_info(markdown: str) -> PageInfo:
+    info = PageInfo()
+    markdown_to_htmlnode(markdown, page_info=info)
+    return info
+
+
+class TestPageInfo(unittest.TestCase):
+
+    def test_collects_anchors_and_urls(self):
+        info = page_info(
+            "# Tom Bombadil\n\n"
+            "**[home](/)** and ![tom](/images/tom.png)\n\n"
+            "```\n[not a link](/code)\n```"
+        )
+        self.assertEqual(info.anchors, ["tom-bombadil"])
+        self.assertEqual(info.urls, ["/", "/images/tom.png"])
+
+    def test_repeated_anchors_are_numbered(self):
+        info = page_info("# Home\n\n## _Songs_\n\n## Songs")
+        self.assertEqual(info.anchors, ["home", "songs", "songs-2"])
+
+
+class TestSiteIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SiteIndex("docs")
+        self.index.add_asset("docs/images/tom.png")
+        self.index.add_page("docs/index.html", page_info("# Home"))
+        self.index.add_page(
+            "docs/blog/tom/index.html",
+            page_info("# Tom\n\n## Songs")
+        )
+        self.index.add_page("docs/notes.html", page_info("# Notes"))
+
+    def check(self, url: str, page_url: str = "/blog/tom/index.html"):
+        return self.index.check(page_url, url)
+
+    def test_valid_links(self):
+        for url in (
+            "/",
+            "/blog/tom",
+            "/blog/tom/",
+            "/blog/tom/index.html#songs",
+            "/blog/tom/index.md#songs",
+            "/notes.md",
+            "/images/tom.png",
+            "../../notes.html",
+            "#songs",
+            "https://example.com/missing",
+            "mailto:tom@example.com",
+        ):
+            self.assertIsNone(self.check(url), url)
+
+    def test_broken_links(self):
+        self.assertEqual(self.check("/blog/bob"), "no such page or file")
+        self.assertEqual(self.check("/notes.md#x"), "no heading #x")
+        self.assertEqual(self.check("../tom.png"), "no such page or file")
+
+    def test_broken_links_lists_each_page(self):
+        self.index.add_page(
+            "docs/contact/index.html",
+            page_info("# Contact\n\n[gone](/gone) [home](/)")
+        )
+        self.assertEqual(
+            self.index.broken_links(),
+            [("/contact/index.html", "/gone", "no such page or file")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import pickle
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+from template import Slot, compile_template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, text: str) -> str:
+        file_path = path.join(self.tmp.name, name)
+        with open(file_path, "w") as f:
+            f.write(text)
+        return file_path
+
+    def test_compile_slots(self):
+        template = compile_template("<title>{{ Title }}</title>{{Content}}")
+        self.assertEqual(
+            template.parts,
+            ["<title>", Slot("Title", "{{ Title }}"), "</title>",
+             Slot("Content", "{{Content}}")]
+        )
+
+    def test_render_single_pass(self):
+        template = compile_template("<h1>{{ Title }}</h1><div>{{ Content }}</div>")
+        result = template.render_to_string({
+            "Title": "Hello",
+            "Content": iter(["<p>", "body", "</p>"]),
+        })
+        self.assertEqual(result, "<h1>Hello</h1><div><p>body</p></div>")
+
+    def test_missing_slot_is_kept(self):
+        template = compile_template("{{ Title }} {{ Other }}")
+        result = template.render_to_string({"Title": "Hello"})
+        self.assertEqual(result, "Hello {{ Other }}")
+
+    def test_include_partial(self):
+        self.write("nav.html", "<nav>{{ Title }}</nav>")
+        page = self.write("page.html", '{% include "nav.html" %}<main></main>')
+        result = load_template(page).render_to_string({"Title": "Home"})
+        self.assertEqual(result, "<nav>Home</nav><main></main>")
+
+    def test_extends_overrides_blocks(self):
+        self.write(
+            "base.html",
+            "<head>{% block head %}<title>{{ Title }}</title>{% endblock %}"
+            "</head><body>{% block body %}default{% endblock %}</body>"
+        )
+        page = self.write(
+            "page.html",
+            '{% extends "base.html" %}'
+            "{% block body %}<article>{{ Content }}</article>{% endblock %}"
+        )
+        template = load_template(page)
+        result = template.render_to_string({"Title": "T", "Content": "C"})
+        self.assertEqual(
+            result,
+            "<head><title>T</title></head><body><article>C</article></body>"
+        )
+        self.assertEqual(len(template.dependencies), 2)
+
+    def test_load_template_is_cached(self):
+        page = self.write("page.html", "{{ Content }}")
+        self.assertIs(load_template(page), load_template(page))
+
+    def test_compiled_template_pickles(self):
+        template = compile_template("<p>{{ Content }}</p>")
+        clone = pickle.loads(pickle.dumps(template))
+        self.assertEqual(
+            clone.render_to_string({"Content": "x"}),
+            "<p>x</p>"
+        )
+
+    def test_minified(self):
+        template = compile_template(
+            '<!doctype html>\n<html>\n  <head>\n'
+            '    <meta charset="utf-8" />\n'
+            '    <link href="/index.css" rel="stylesheet" />\n'
+            '  </head>\n  <!-- page -->\n'
+            '  <body>\n    <p>Hello,   <b>{{ Name }}</b> !</p>\n'
+            '    <pre>\n  {{ Code }}\n</pre>\n  </body>\n</html>\n'
+        )
+        result = template.minified.render_to_string(
+            {"Name": "x", "Code": "y"}
+        )
+        self.assertEqual(
+            result,
+            "<!doctype html><html><head><meta charset=utf-8>"
+            '<link href="/index.css" rel=stylesheet></head><body>'
+            "<p>Hello, <b>x</b> !</p><pre>\n  y\n</pre></body></html>"
+        )
+
+    def test_minified_keeps_space_next_to_slots(self):
+        template = compile_template(
+            "<p>\n  <i>\n  {{ A }}\n  <b>{{ B }}</b></i></p>"
+        )
+        self.assertEqual(
+            template.minified.render_to_string({"A": "a", "B": "b"}),
+            "<p><i> a <b>b</b></i></p>"
+        )
+
+    def test_minified_keeps_script(self):
+        script = '<script>\n  if (a < b) { f("  x") }\n</script>'
+        template = compile_template(f"<div>\n  {script}\n</div>")
+        self.assertEqual(
+            template.minified.render_to_string({}),
+            f"<div>{script}</div>"
+        )
+
+    def test_unclosed_block(self):
+        with self.assertRaises(ValueError):
+            compile_template("{% block body %}never closed")
+
+    def test_self_include(self):
+        page = self.write("page.html", '{% include "page.html" %}')
+        with self.assertRaises(ValueError):
+            load_template(page)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -72,6 +72,18 @@ class TestTextNode(unittest.TestCase):
             "<b>a bold text node</b>"
         )
 
+    def test_image_to_html(self):
+        node = TextNode('a "big" cat', TextType.IMAGE, "cat.png")
+        self.assertEqual(
+            textnode_to_htmlnode(node).to_html(),
+            '<img src="cat.png" alt="a &quot;big&quot; cat">'
+        )
+        empty = TextNode("", TextType.IMAGE, "cat.png")
+        self.assertEqual(
+            textnode_to_htmlnode(empty).to_html(),
+            '<img src="cat.png" alt="">'
+        )
+
     # split_nodes_delimiter()
     def test_split_nodes_delimiter(self):
         nodes = [TextNode("text with an _italic_ word", TextType.NORMAL)]
@@ -287,6 +299,19 @@ class TestTextNode(unittest.TestCase):
         ]
         self.assertEqual(result, expect)
 
+    def test_underscores_within_words_are_not_italic(self):
+        result = text_to_textnodes("see my_var_name and [x](/a_b)")
+        expect = [
+            TextNode("see my_var_name and ", TextType.NORMAL),
+            TextNode("x", TextType.LINK, "/a_b"),
+        ]
+        self.assertEqual(result, expect)
+        result = text_to_textnodes("(_one_), _two_.")
+        self.assertEqual(
+            [node.text for node in result if node.text_type == TextType.ITALIC],
+            ["one", "two"]
+        )
+
     def test_text_to_text_nodes_with_tail(self):
         text = "normal `code` **bold**"
         result = text_to_textnodes(text)
@@ -298,6 +323,76 @@ class TestTextNode(unittest.TestCase):
         ]
         self.assertEqual(result, expect)
 
+    def test_text_to_text_nodes_unclosed(self):
+        text = "a **bold** word and a **stray delimiter"
+        result = text_to_textnodes(text)
+        expect = [
+            TextNode("a ", TextType.NORMAL),
+            TextNode("bold", TextType.BOLD),
+            TextNode(" word and a **stray delimiter", TextType.NORMAL),
+        ]
+        self.assertEqual(result, expect)
+
+    def test_text_to_text_nodes_multiple_images(self):
+        text = "![one](1.png) and ![two](2.png)"
+        result = text_to_textnodes(text)
+        expect = [
+            TextNode("one", TextType.IMAGE, "1.png"),
+            TextNode(" and ", TextType.NORMAL),
+            TextNode("two", TextType.IMAGE, "2.png"),
+        ]
+        self.assertEqual(result, expect)
+
+    def test_text_to_text_nodes_code_is_literal(self):
+        text = "`a **not bold** span`"
+        result = text_to_textnodes(text)
+        expect = [TextNode("a **not bold** span", TextType.CODE)]
+        self.assertEqual(result, expect)
+
+    def test_text_to_text_nodes_bold_in_link(self):
+        text = "a [**bold** link](url)"
+        result = text_to_textnodes(text)
+        expect = [
+            TextNode("a ", TextType.NORMAL),
+            TextNode("bold link", TextType.LINK, "url", [
+                TextNode("bold", TextType.BOLD),
+                TextNode(" link", TextType.NORMAL),
+            ]),
+        ]
+        self.assertEqual(result, expect)
+        self.assertEqual(
+            textnode_to_htmlnode(result[1]).to_html(),
+            '<a href="url"><b>bold</b> link</a>'
+        )
+
+    def test_text_to_text_nodes_image_in_link(self):
+        text = "[![alt](img.png)](url)"
+        result = text_to_textnodes(text)
+        expect = [
+            TextNode("alt", TextType.LINK, "url", [
+                TextNode("alt", TextType.IMAGE, "img.png"),
+            ]),
+        ]
+        self.assertEqual(result, expect)
+
+    def test_collects_links(self):
+        text = "**[a](/a)** `[b](/b)` [![c](/c.png)](/d.md)"
+        links = []
+        for node in text_to_textnodes(text):
+            textnode_to_htmlnode(node, links=links)
+        self.assertEqual(links, [
+            (TextType.LINK, "/a"),
+            (TextType.IMAGE, "/c.png"),
+            (TextType.LINK, "/d.md"),
+        ])
+
+    def test_markdown_links_point_at_pages(self):
+        node = TextNode("tom", TextType.LINK, "/blog/tom/index.md#songs")
+        self.assertEqual(
+            textnode_to_htmlnode(node).to_html(),
+            '<a href="/blog/tom/#songs">tom</a>'
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from urlpolicy import (
+    ABSOLUTE,
+    BASE,
+    RELATIVE,
+    URLPolicy,
+    is_external,
+    resolve_markdown_link,
+    split_url_suffix,
+)
+
+
+class TestURLPolicy(unittest.TestCase):
+
+    def test_base(self):
+        policy = URLPolicy(BASE, "SSG")
+        self.assertEqual(policy.rewrite("/index.css"), "/SSG/index.css")
+        self.assertEqual(policy.rewrite("/"), "/SSG/")
+
+    def test_default_base_is_unchanged(self):
+        policy = URLPolicy(BASE, "/")
+        self.assertEqual(policy.rewrite("/index.css"), "/index.css")
+
+    def test_only_site_root_urls_rewritten(self):
+        policy = URLPolicy(BASE, "SSG")
+        for url in ("https://x.io/a", "//cdn.x.io/a", "page.html", "#top"):
+            self.assertEqual(policy.rewrite(url), url)
+
+    def test_absolute(self):
+        policy = URLPolicy(ABSOLUTE, "/SSG/", "https://x.io/")
+        self.assertEqual(
+            policy.rewrite("/images/tom.png"),
+            "https://x.io/SSG/images/tom.png"
+        )
+
+    def test_relative(self):
+        policy = URLPolicy(RELATIVE, output_dir="docs")
+        page = policy.for_page("docs/blog/tom/index.html")
+        self.assertEqual(page.rewrite("/images/tom.png"), "../../images/tom.png")
+        self.assertEqual(page.rewrite("/blog/"), "../")
+        self.assertEqual(page.rewrite("/contact#form"), "../../contact#form")
+        root = policy.for_page("docs/index.html")
+        self.assertEqual(root.rewrite("/index.css"), "index.css")
+
+    def test_relative_needs_page(self):
+        with self.assertRaises(ValueError):
+            URLPolicy(RELATIVE).rewrite("/index.css")
+
+    def test_key(self):
+        self.assertEqual(URLPolicy(BASE, "SSG").key, "SSG")
+        self.assertEqual(URLPolicy(RELATIVE).key, RELATIVE)
+
+
+class TestMarkdownLinks(unittest.TestCase):
+
+    def test_resolve_markdown_link(self):
+        cases = {
+            "/blog/tom/index.md": "/blog/tom/",
+            "/blog/tom/index.md#songs": "/blog/tom/#songs",
+            "notes.md?x=1": "notes.html?x=1",
+            "index.md": "./",
+            "../index.md": "../",
+            "/blog/tom": "/blog/tom",
+            "https://example.com/README.md": "https://example.com/README.md",
+        }
+        for url, expected in cases.items():
+            self.assertEqual(resolve_markdown_link(url), expected, url)
+
+    def test_is_external(self):
+        self.assertTrue(is_external("https://boot.dev"))
+        self.assertTrue(is_external("//cdn.example.com/x.js"))
+        self.assertTrue(is_external("mailto:tom@example.com"))
+        self.assertFalse(is_external("/blog/tom:songs"))
+        self.assertFalse(is_external("notes.html"))
+
+    def test_split_url_suffix(self):
+        cases = {
+            "/blog/": ("/blog/", ""),
+            "/a?x=1#top": ("/a", "?x=1#top"),
+            "/a#top?x=1": ("/a", "#top?x=1"),
+            "#top": ("", "#top"),
+        }
+        for url, expected in cases.items():
+            self.assertEqual(split_url_suffix(url), expected, url)
+
+
+if __name__ == "__main__":
+    unittest.main()
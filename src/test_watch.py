@@ -0,0 +1,131 @@
+import unittest
+from os import path, remove, stat, utime
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from urllib.request import urlopen
+
+from buildlog import BuildSummary
+from gencontent import RenderOptions, generate_pages
+from manifest import BuildManifest
+from server import LIVE_RELOAD_PATH, ReloadHub, serve_directory
+from siteindex import SiteIndex
+from tempfiles import read, write
+from urlpolicy import URLPolicy
+from watch import SiteWatcher
+
+
+class TestSiteWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        self.content = path.join(root, "content")
+        self.static = path.join(root, "static")
+        self.template = path.join(root, "template.html")
+        self.dest = path.join(root, "docs")
+        write(path.join(self.content, "index.md"), "# Home")
+        write(path.join(self.content, "blog", "index.md"), "# Blog")
+        write(path.join(self.static, "index.css"), "body {}")
+        write(self.template, "<body>{{ Content }}</body>")
+        self.hub = ReloadHub()
+        self.watcher = SiteWatcher(
+            self.content,
+            self.static,
+            self.template,
+            self.dest,
+            URLPolicy(),
+            self.hub
+        )
+
+    def touch(self, file_path: str, text: str) -> None:
+        # Bumps the mtime explicitly, as edits within one tick look unchanged.
+        mtime = stat(file_path).st_mtime_ns if path.exists(file_path) else 0
+        write(file_path, text)
+        utime(file_path, ns=(mtime + 10**9, mtime + 10**9))
+
+    def test_edited_page_rebuilt_alone(self):
+        self.touch(path.join(self.content, "blog", "index.md"), "# Edited")
+        start = perf_counter()
+        changed = self.watcher.poll()
+        elapsed = perf_counter() - start
+        self.assertEqual(changed, [path.join(self.content, "blog", "index.md")])
+        self.assertEqual(
+            read(path.join(self.dest, "blog", "index.html")),
+            '<body><div><h1 id="edited">Edited</h1></div></body>'
+        )
+        self.assertFalse(path.exists(path.join(self.dest, "index.html")))
+        self.assertLess(elapsed, 0.1)
+        self.assertEqual(self.hub.version, 1)
+
+    def test_rebuilt_page_is_skipped_by_next_build(self):
+        blog = path.join(self.content, "blog", "index.md")
+        self.touch(blog, "# Edited")
+        self.watcher.poll()
+        summary = BuildSummary()
+        generate_pages(
+            [(blog, path.join(self.dest, "blog", "index.html"))],
+            self.template,
+            RenderOptions(URLPolicy(output_dir=self.dest)),
+            manifest=BuildManifest(self.dest),
+            summary=summary,
+            site_index=SiteIndex(self.dest)
+        )
+        self.assertEqual(summary.pages_unchanged, 1)
+        self.assertEqual(summary.pages_rendered, 0)
+
+    def test_template_edit_rebuilds_every_page(self):
+        self.touch(self.template, "<main>{{ Content }}</main>")
+        self.watcher.poll()
+        self.assertTrue(path.isfile(path.join(self.dest, "index.html")))
+        self.assertTrue(path.isfile(path.join(self.dest, "blog", "index.html")))
+
+    def test_static_sync_and_removal(self):
+        css = path.join(self.static, "index.css")
+        self.touch(css, "body { margin: 0 }")
+        self.watcher.poll()
+        self.assertEqual(
+            read(path.join(self.dest, "index.css")),
+            "body { margin: 0 }"
+        )
+        remove(css)
+        self.watcher.poll()
+        self.assertFalse(path.exists(path.join(self.dest, "index.css")))
+
+    def test_no_change_no_rebuild(self):
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.hub.version, 0)
+
+
+class TestLiveReloadServer(unittest.TestCase):
+
+    def test_serves_html_with_reload_script(self):
+        with TemporaryDirectory() as tmp:
+            write(path.join(tmp, "index.html"), "<body><p>hi</p></body>")
+            server = serve_directory(tmp, 0, ReloadHub())
+            self.addCleanup(server.shutdown)
+            port = server.server_address[1]
+            with urlopen(f"http://localhost:{port}/") as response:
+                html = response.read().decode()
+            self.assertIn(LIVE_RELOAD_PATH, html)
+            self.assertTrue(html.startswith("<body><p>hi</p><script>"))
+            with open(path.join(tmp, "index.html"), "r") as f:
+                self.assertNotIn(LIVE_RELOAD_PATH, f.read())
+
+    def test_serves_under_base_path(self):
+        with TemporaryDirectory() as tmp:
+            write(path.join(tmp, "index.html"), "<body><p>hi</p></body>")
+            write(path.join(tmp, "index.css"), "body {}")
+            server = serve_directory(tmp, 0, ReloadHub(), prefix="/SSG")
+            self.addCleanup(server.shutdown)
+            base = f"http://localhost:{server.server_address[1]}/SSG"
+            with urlopen(base + "/") as response:
+                self.assertIn(LIVE_RELOAD_PATH, response.read().decode())
+            with urlopen(base + "/index.css") as response:
+                self.assertEqual(response.read(), b"body {}")
+            with urlopen(base) as response:
+                self.assertEqual(response.url, base + "/")
+
+
+if __name__ == "__main__":
+    unittest.main()
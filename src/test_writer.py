@@ -0,0 +1,87 @@
+import unittest
+from os import listdir, path, stat, utime
+from tempfile import TemporaryDirectory
+
+from hashlib import sha256
+
+from writer import OutputWriter, write_if_changed, write_stream_if_changed
+
+
+class TestWriteIfChanged(unittest.TestCase):
+
+    def test_identical_bytes_not_rewritten(self):
+        with TemporaryDirectory() as tmp:
+            dest = path.join(tmp, "index.html")
+            self.assertTrue(write_if_changed(dest, b"<p>hi</p>"))
+            utime(dest, ns=(1, 1))
+            self.assertFalse(write_if_changed(dest, b"<p>hi</p>"))
+            self.assertEqual(stat(dest).st_mtime_ns, 1)
+
+    def test_changed_bytes_replace_file(self):
+        with TemporaryDirectory() as tmp:
+            dest = path.join(tmp, "index.html")
+            write_if_changed(dest, b"<p>hi</p>")
+            self.assertTrue(write_if_changed(dest, b"<p>yo</p>"))
+            with open(dest, "rb") as f:
+                self.assertEqual(f.read(), b"<p>yo</p>")
+            self.assertEqual(listdir(tmp), ["index.html"])
+
+
+class TestWriteStreamIfChanged(unittest.TestCase):
+
+    def test_stream_written_in_chunks(self):
+        with TemporaryDirectory() as tmp:
+            dest = path.join(tmp, "index.html")
+            fragments = ["<p>", "x" * 100000, "</p>"]
+            written, hexdigest, size = write_stream_if_changed(dest, fragments)
+            data = "".join(fragments).encode()
+            self.assertTrue(written)
+            self.assertEqual(hexdigest, sha256(data).hexdigest())
+            self.assertEqual(size, len(data))
+            with open(dest, "rb") as f:
+                self.assertEqual(f.read(), data)
+
+    def test_identical_stream_not_rewritten(self):
+        with TemporaryDirectory() as tmp:
+            dest = path.join(tmp, "index.html")
+            write_if_changed(dest, b"<p>hi</p>")
+            utime(dest, ns=(1, 1))
+            written, _, _ = write_stream_if_changed(dest, ["<p>", "hi</p>"])
+            self.assertFalse(written)
+            self.assertEqual(stat(dest).st_mtime_ns, 1)
+            self.assertEqual(listdir(tmp), ["index.html"])
+
+    def test_failing_stream_leaves_file(self):
+        def fragments():
+            yield "<p>half"
+            raise ValueError("no title")
+
+        with TemporaryDirectory() as tmp:
+            dest = path.join(tmp, "index.html")
+            write_if_changed(dest, b"<p>hi</p>")
+            with self.assertRaises(ValueError):
+                write_stream_if_changed(dest, fragments())
+            self.assertEqual(listdir(tmp), ["index.html"])
+            with open(dest, "rb") as f:
+                self.assertEqual(f.read(), b"<p>hi</p>")
+
+
+class TestOutputWriter(unittest.TestCase):
+
+    def test_counts(self):
+        with TemporaryDirectory() as tmp:
+            write_if_changed(path.join(tmp, "same.html"), b"same")
+            with OutputWriter(2) as writer:
+                writer.submit(path.join(tmp, "same.html"), b"same")
+                writer.submit(path.join(tmp, "new.html"), b"new")
+                failed = writer.submit(path.join(tmp, "no", "x.html"), b"x")
+            self.assertIsInstance(failed.exception(), FileNotFoundError)
+            self.assertEqual(
+                (writer.written, writer.skipped, writer.failed),
+                (1, 1, 1)
+            )
+            self.assertEqual(sorted(listdir(tmp)), ["new.html", "same.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
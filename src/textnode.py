@@ -1,7 +1,17 @@
 from enum import Enum
-from re import findall
+from re import DOTALL, Match, compile, findall
 
-from htmlnode import LeafNode
+from htmlnode import (
+    ALT,
+    HREF,
+    SRC,
+    HTMLNode,
+    LeafNode,
+    ParentNode,
+    VoidNode,
+    shared_leaf
+)
+from urlpolicy import URLPolicy, resolve_markdown_link
 
 
 class TextType(Enum):
@@ -20,47 +30,132 @@ DELIMITERS: dict[TextType:str] = {
 }
 
 
+# Matches one complete piece of inline markup. Scanning a paragraph with
+# finditer() visits each character once, and alternatives are tried in order
+# at each position, so the leftmost piece of markup always wins and markup
+# that is never closed simply doesn't match. Link text may hold one level of
+# brackets, so an image can be placed within a link. Underscores only
+# delimit italics at word boundaries, so snake_case names stay as written.
+INLINE_MARKUP = compile(
+    r"\*\*(?P<bold>.+?)\*\*"
+    r"|(?<!\w)_(?P<italic>.+?)_(?!\w)"
+    r"|`(?P<code>.+?)`"
+    r"|!\[(?P<alt>.*?)\]\((?P<src>.*?)\)"
+    r"|\[(?P<anchor>(?:[^\[\]]|\[[^\[\]]*\])+)\]\((?P<href>.*?)\)",
+    DOTALL
+)
+
+
 # Models a unit of text within the html document (any of the above TextTypes).
+# Bold, italic and link nodes can hold their own children (e.g. bold text
+# within a link), in which case text is the plain text of those children.
 class TextNode():
-    def __init__(self, text: str, text_type: TextType, url: str | None = None):
+    __slots__ = ("text", "text_type", "url", "children")
+
+    def __init__(
+        self,
+        text: str,
+        text_type: TextType,
+        url: str | None = None,
+        children: list | None = None
+    ):
         self.text = text
         self.text_type = text_type
         self.url = url
+        self.children = children
 
     def __eq__(self, other):
         return (
             self.text == other.text
             and self.text_type == other.text_type
             and self.url == other.url
+            and self.children == other.children
         )
 
     def __repr__(self):
+        if self.children:
+            return (
+                f"TextNode({self.text}, {self.text_type.value[0]}, "
+                f"{self.url}, {self.children})"
+            )
         return f"TextNode({self.text}, {self.text_type.value[0]}, {self.url})"
 
 
 # Converts the given TextNode into a LeafNode (HTMLNode with no children).
 # These represent the innermost tag of nested HTML elements that contain some
-# content.
-def textnode_to_htmlnode(text_node: TextNode) -> LeafNode:
+# content. TextNodes with children become ParentNodes instead. Link and image
+# URLs are rewritten through the url_policy, when given, as their props are
+# built. Images are given their attributes by images (see
+# imagesize.PageImages), when given. The (TextType, url) of every link and
+# image, as written in the markdown, is appended to links, when given.
+def textnode_to_htmlnode(
+    text_node: TextNode,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links: list[tuple[TextType, str]] | None = None
+) -> HTMLNode:
+    if text_node.children:
+        return textnode_to_parentnode(text_node, url_policy, images, links)
+    if links is not None and text_node.url is not None:
+        links.append((text_node.text_type, text_node.url))
     match text_node.text_type:
         case TextType.NORMAL:
-            return LeafNode(text_node.text)
+            return shared_leaf(text_node.text)
         case TextType.BOLD:
-            return LeafNode(text_node.text, "b")
+            return shared_leaf(text_node.text, "b")
         case TextType.ITALIC:
-            return LeafNode(text_node.text, "i")
+            return shared_leaf(text_node.text, "i")
         case TextType.CODE:
-            return LeafNode(text_node.text, "code")
+            return shared_leaf(text_node.text, "code")
         case TextType.LINK:
-            props = {"href": text_node.url}
+            props = {HREF: rewrite_url(text_node.url, url_policy)}
             return LeafNode(text_node.text, "a", props)
         case TextType.IMAGE:
-            props = {"src": text_node.url}
-            return LeafNode(text_node.text, "img", props)
+            # The alt text is an attribute value, so it can't hold quotes.
+            props = {
+                SRC: rewrite_url(text_node.url, url_policy),
+                ALT: text_node.text.replace('"', "&quot;")
+            }
+            if images is not None:
+                props.update(images.props(text_node.url))
+            return VoidNode("img", props)
         case _:
             raise Exception("text node has invalid text type")
 
 
+def textnode_to_parentnode(
+    text_node: TextNode,
+    url_policy: URLPolicy | None = None,
+    images=None,
+    links: list[tuple[TextType, str]] | None = None
+) -> ParentNode:
+    children = [
+        textnode_to_htmlnode(child, url_policy, images, links)
+        for child in text_node.children
+    ]
+    if links is not None and text_node.url is not None:
+        links.append((text_node.text_type, text_node.url))
+    match text_node.text_type:
+        case TextType.BOLD:
+            return ParentNode("b", children)
+        case TextType.ITALIC:
+            return ParentNode("i", children)
+        case TextType.LINK:
+            props = {HREF: rewrite_url(text_node.url, url_policy)}
+            return ParentNode("a", children, props)
+        case _:
+            raise Exception("text node type cannot have children")
+
+
+# Links to markdown sources are pointed at the pages built from them before
+# the url_policy (when given) rewrites the URL.
+def rewrite_url(url: str, url_policy: URLPolicy | None) -> str:
+    url = resolve_markdown_link(url)
+    if url_policy is None:
+        return url
+    return url_policy.rewrite(url)
+
+
 # With a given list of TextNode (old_nodes), a delimiter ("**"), and TextType,
 # splits the text of each node to create a list of new TextNodes with
 # appropriate metadata.
@@ -206,12 +301,56 @@ def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
     return new_nodes
 
 
-# Combine all text parsing to convert a markdown string to a list of TextNodes.
+# Converts a markdown string to a list of TextNodes in a single left-to-right
+# scan. Markup that is never closed is kept as normal text. The contents of
+# bold, italic and link text are tokenized in turn, so they can nest.
 def text_to_textnodes(text: str) -> list[TextNode]:
-    text_nodes = [TextNode(text, TextType.NORMAL)]
-
-    for text_type, delimiter in DELIMITERS.items():
-        text_nodes = split_nodes_delimiter(text_nodes, delimiter, text_type)
+    nodes: list[TextNode] = []
+    start = 0
+    for match in INLINE_MARKUP.finditer(text):
+        index = match.start()
+        if index > start:
+            nodes.append(TextNode(text[start:index], TextType.NORMAL))
+        nodes.append(match_to_textnode(match))
+        start = match.end()
+
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.NORMAL))
+    return nodes
+
+
+# Converts a match of INLINE_MARKUP into a TextNode. lastgroup names the
+# final group of whichever alternative matched.
+def match_to_textnode(match: Match) -> TextNode:
+    match match.lastgroup:
+        case "bold":
+            return nested_textnode(match["bold"], TextType.BOLD)
+        case "italic":
+            return nested_textnode(match["italic"], TextType.ITALIC)
+        case "code":
+            # Code is preformatted, so its contents are never tokenized.
+            return TextNode(match["code"], TextType.CODE)
+        case "src":
+            return TextNode(match["alt"], TextType.IMAGE, match["src"])
+        case "href":
+            return nested_textnode(
+                match["anchor"],
+                TextType.LINK,
+                match["href"]
+            )
+    raise Exception("inline markup has no matching text type")
+
+
+# Builds a TextNode of text_type around content, only keeping children when
+# the content holds markup of its own.
+def nested_textnode(
+    content: str,
+    text_type: TextType,
+    url: str | None = None
+) -> TextNode:
+    children = text_to_textnodes(content)
+    if len(children) == 1 and children[0].text_type == TextType.NORMAL:
+        return TextNode(content, text_type, url)
+    plain_text = "".join(child.text for child in children)
+    return TextNode(plain_text, text_type, url, children)
 
-    with_images = split_nodes_image(text_nodes)
-    return split_nodes_link(with_images)
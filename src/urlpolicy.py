@@ -0,0 +1,165 @@
+from posixpath import dirname, relpath
+from os import path
+from re import compile
+
+
+BASE = "base"
+ABSOLUTE = "absolute"
+RELATIVE = "relative"
+URL_MODES: tuple[str, ...] = (BASE, ABSOLUTE, RELATIVE)
+URL_SUFFIX = compile(r"[?#]")
+
+
+# Decides how site-root URLs ("/images/tom.png") are written into pages. Only
+# root-relative URLs are rewritten; external, protocol-relative ("//cdn..."),
+# page-relative and fragment URLs are left alone.
+#   base:     prefixed with the base path       -> /SSG/images/tom.png
+#   absolute: prefixed with origin + base path  -> https://x.io/SSG/images/...
+#   relative: relative to the page being built  -> ../../images/tom.png
+# Relative URLs depend on the page, so policies are bound to a page with
+# for_page() before rendering. Given an AssetManifest (see assets), URLs of
+# static assets are first swapped for their fingerprinted names.
+class URLPolicy():
+    def __init__(
+        self,
+        mode: str = BASE,
+        base_path: str = "/",
+        origin: str | None = None,
+        output_dir: str | None = None,
+        page_url: str | None = None,
+        assets=None
+    ):
+        if mode not in URL_MODES:
+            raise ValueError(f"unknown url mode: {mode}")
+        if mode == ABSOLUTE and not origin:
+            raise ValueError("absolute urls need an origin")
+        self.mode = mode
+        self.base_path = base_path
+        self.origin = origin.rstrip("/") if origin else origin
+        self.output_dir = output_dir
+        self.page_url = page_url
+        self.assets = assets
+        # Site-root URL -> the URL its asset name was rewritten to, for every
+        # URL a page-bound policy rewrote (see rewrite_asset).
+        self.asset_urls: dict[str, str] | None = None
+        stripped = base_path.strip("/")
+        self.prefix = f"/{stripped}" if stripped else ""
+
+    def __repr__(self):
+        return f"URLPolicy({self.key})"
+
+    # Identifies the policy in the build manifest. The plain base mode is
+    # keyed by the base path alone, as it was before policies existed. Which
+    # names assets have is tracked apart (see gencontent.generate_pages), so
+    # fingerprinting only adds a marker.
+    @property
+    def key(self) -> str:
+        if self.mode == BASE:
+            key = self.base_path
+        elif self.mode == ABSOLUTE:
+            key = f"{ABSOLUTE}:{self.origin}{self.prefix}"
+        else:
+            key = RELATIVE
+        if self.assets is not None:
+            key += " fingerprinted"
+        return key
+
+    # Returns the policy bound to the page at dest_path. With assets, each
+    # page gets its own, which records the asset names the page links to.
+    def for_page(self, dest_path: str) -> "URLPolicy":
+        page_url = self.page_url
+        if self.mode == RELATIVE:
+            if self.output_dir is None:
+                raise ValueError("relative urls need the output directory")
+            page = path.relpath(dest_path, self.output_dir)
+            page_url = "/" + page.replace(path.sep, "/")
+        elif self.assets is None:
+            return self
+        page_policy = URLPolicy(
+            self.mode,
+            self.base_path,
+            self.origin,
+            self.output_dir,
+            page_url,
+            self.assets
+        )
+        if self.assets is not None:
+            page_policy.asset_urls = {}
+        return page_policy
+
+    def with_output_dir(self, output_dir: str) -> "URLPolicy":
+        if self.output_dir is not None:
+            return self
+        return URLPolicy(
+            self.mode,
+            self.base_path,
+            self.origin,
+            output_dir,
+            self.page_url,
+            self.assets
+        )
+
+    def rewrite(self, url: str) -> str:
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+        if self.assets is not None:
+            url = self.rewrite_asset(url)
+        if self.mode == BASE:
+            return self.prefix + url
+        if self.mode == ABSOLUTE:
+            return self.origin + self.prefix + url
+        if self.page_url is None:
+            raise ValueError("relative urls need to be bound to a page")
+        # Queries and fragments aren't part of the path being made relative.
+        url_path, suffix = split_url_suffix(url)
+        relative = relpath(url_path, dirname(self.page_url))
+        if url_path.endswith("/") and not relative.endswith("/"):
+            relative += "/"
+        return relative + suffix
+
+
+    # Returns the site-root url with its path swapped for the asset's
+    # fingerprinted name, if it names an asset, recording the result when
+    # bound to a page.
+    def rewrite_asset(self, url: str) -> str:
+        rewritten = self.assets.rewrite(url)
+        if self.asset_urls is not None:
+            self.asset_urls[url] = rewritten
+        return rewritten
+
+
+# Points a link to a markdown source at the page built from it:
+# /blog/tom/index.md becomes /blog/tom/ and notes.md#x becomes notes.html#x.
+# Relative links stay relative; external links are left alone.
+def resolve_markdown_link(url: str) -> str:
+    url_path, suffix = split_url_suffix(url)
+    if not url_path.endswith(".md") or is_external(url_path):
+        return url
+    if url_path == "index.md" or url_path.endswith("/index.md"):
+        return (url_path[:-len("index.md")] or "./") + suffix
+    return url_path[:-len(".md")] + ".html" + suffix
+
+
+# URLs with a scheme (https:, mailto:) or protocol-relative URLs point off
+# the site.
+def is_external(url: str) -> bool:
+    if url.startswith("//"):
+        return True
+    scheme, colon, _ = url.partition(":")
+    return bool(colon) and "/" not in scheme
+
+
+# Splits url into its path and its query or fragment (whichever comes first).
+def split_url_suffix(url: str) -> tuple[str, str]:
+    match = URL_SUFFIX.search(url)
+    if match is None:
+        return url, ""
+    index = match.start()
+    return url[:index], url[index:]
+
+
+# Accepts either a URLPolicy or a plain base path, as given on the command line.
+def as_url_policy(base_path: "str | URLPolicy") -> URLPolicy:
+    if isinstance(base_path, URLPolicy):
+        return base_path
+    return URLPolicy(BASE, base_path)
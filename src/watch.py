@@ -0,0 +1,207 @@
+from os import makedirs, path, remove, stat, walk
+from time import perf_counter, sleep
+
+from buildlog import detail, error, info
+from copystatic import COPY, place_file
+from gencontent import RenderOptions, generate_page
+from imagesize import ImageSizes
+from manifest import BuildManifest
+from server import ReloadHub, is_within
+from siteindex import PageInfo
+from template import load_template
+from urlpolicy import URLPolicy
+
+
+# Watches the content, static and template files of a site by polling their
+# mtimes, and rebuilds only what a change affects: an edited page is rendered
+# again on its own, a static file is copied on its own, and a template edit
+# (including its partials and parents) renders every page again, as does
+# resizing an image, given ImageSizes, or renaming an asset the URL policy
+# fingerprints (see assets). Pages are minified when the build was
+# (see gencontent.generate_page). Browsers are told to reload through the
+# ReloadHub after each rebuild.
+class SiteWatcher():
+    def __init__(
+        self,
+        content_dir: str,
+        static_dir: str,
+        template_path: str,
+        dest_dir: str,
+        url_policy: URLPolicy,
+        hub: ReloadHub | None = None,
+        link_mode: str = COPY,
+        image_sizes: ImageSizes | None = None,
+        minify: bool = False
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.url_policy = url_policy
+        self.hub = hub
+        self.link_mode = link_mode
+        self.image_sizes = image_sizes
+        self.minify = minify
+        self.mtimes: dict[str, int] = self.scan()
+
+    def template_files(self) -> list[str]:
+        try:
+            return load_template(self.template_path).dependencies
+        except (OSError, ValueError):
+            return [path.abspath(self.template_path)]
+
+    def scan(self) -> dict[str, int]:
+        mtimes = {}
+        for directory in (self.content_dir, self.static_dir):
+            for root, _, files in walk(directory):
+                for name in files:
+                    file_path = path.join(root, name)
+                    try:
+                        mtimes[file_path] = stat(file_path).st_mtime_ns
+                    except OSError:
+                        continue
+        for file_path in self.template_files():
+            try:
+                mtimes[file_path] = stat(file_path).st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    # Checks for changes once, rebuilding if needed. Returns the paths that
+    # changed or were removed.
+    def poll(self) -> list[str]:
+        mtimes = self.scan()
+        changed = [
+            file_path for file_path, mtime in mtimes.items()
+            if self.mtimes.get(file_path) != mtime
+        ]
+        removed = [
+            file_path for file_path in self.mtimes if file_path not in mtimes
+        ]
+        self.mtimes = mtimes
+        if changed or removed:
+            self.rebuild(changed, removed)
+        return changed + removed
+
+    def watch(self, interval: float = 0.05) -> None:
+        info(
+            f"Watching {self.content_dir}, {self.static_dir} and "
+            f"{self.template_path} for changes ..."
+        )
+        while True:
+            sleep(interval)
+            self.poll()
+
+    def rebuild(self, changed: list[str], removed: list[str]) -> None:
+        start = perf_counter()
+        manifest = BuildManifest(self.dest_dir)
+        manifest.carry_over()
+        template_files = set(self.template_files())
+        static_changes = [
+            file_path for file_path in changed + removed
+            if self.is_static(file_path)
+        ]
+        # Outputs are found before fingerprinted assets are hashed again, so
+        # an asset's output under its previous name can be removed.
+        previous_dests = {src: self.static_dest(src) for src in static_changes}
+        images_resized = False
+        if self.image_sizes is not None and static_changes:
+            images_resized = bool(self.image_sizes.scan().changed)
+        assets_renamed = False
+        if self.url_policy.assets is not None and static_changes:
+            assets_renamed = bool(self.url_policy.assets.scan().changed)
+
+        if (
+            images_resized
+            or assets_renamed
+            or template_files.intersection(changed + removed)
+        ):
+            pages = [
+                file_path for file_path in self.mtimes
+                if self.is_page(file_path)
+            ]
+        else:
+            pages = [
+                file_path for file_path in changed if self.is_page(file_path)
+            ]
+
+        for src in pages:
+            self.build_page(src, manifest)
+        for src in changed:
+            if self.is_static(src):
+                dest = self.static_dest(src)
+                makedirs(path.dirname(dest), exist_ok=True)
+                detail(f"Copying {src} to {dest}")
+                place_file(src, dest, self.link_mode)
+                if previous_dests[src] != dest:
+                    self.remove_output(previous_dests[src], manifest)
+                manifest.record_asset(src, dest)
+        for src in removed:
+            if self.is_page(src):
+                self.remove_output(self.page_dest(src), manifest)
+            elif self.is_static(src):
+                self.remove_output(previous_dests[src], manifest)
+
+        manifest.save()
+        elapsed = (perf_counter() - start) * 1000
+        info(f"Rebuilt in {elapsed:.1f}ms")
+        if self.hub is not None:
+            self.hub.notify()
+
+    def build_page(self, src: str, manifest: BuildManifest) -> None:
+        dest = self.page_dest(src)
+        makedirs(path.dirname(dest), exist_ok=True)
+        # The page's entry is as complete as a full build's, so the next
+        # build can skip it.
+        page_info = PageInfo()
+        try:
+            generate_page(
+                src,
+                self.template_path,
+                dest,
+                RenderOptions(
+                    self.url_policy.with_output_dir(self.dest_dir),
+                    image_sizes=self.image_sizes,
+                    minify=self.minify
+                ),
+                page_info=page_info
+            )
+        except Exception as e:
+            error(f"Failed to generate page from {src}: {e}")
+            return
+        manifest.record_page(
+            src,
+            self.template_path,
+            dest,
+            self.url_policy.key,
+            page_info=page_info,
+            minify=self.minify,
+            dependencies=page_info.dependencies
+        )
+
+    def remove_output(self, dest: str, manifest: BuildManifest) -> None:
+        manifest.forget(dest)
+        if path.isfile(dest):
+            detail(f"Removing {dest}")
+            remove(dest)
+            manifest.remove_empty_dirs(path.dirname(dest))
+
+    def is_page(self, file_path: str) -> bool:
+        return (
+            is_within(file_path, self.content_dir)
+            and file_path.endswith(".md")
+        )
+
+    def is_static(self, file_path: str) -> bool:
+        return is_within(file_path, self.static_dir)
+
+    def page_dest(self, src: str) -> str:
+        relative = path.relpath(src, self.content_dir)
+        return path.join(self.dest_dir, relative[:-2] + "html")
+
+    def static_dest(self, src: str) -> str:
+        relative = path.relpath(src, self.static_dir)
+        if self.url_policy.assets is not None:
+            relative = self.url_policy.assets.dest_name(relative)
+        return path.join(self.dest_dir, relative)
+
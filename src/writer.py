@@ -0,0 +1,180 @@
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import file_digest, sha256
+from os import getpid, path, remove, replace, stat
+from threading import Lock, get_ident
+from time import perf_counter
+
+
+# Writes data to dest_path unless the file already holds exactly those bytes,
+# leaving its mtime alone so rsync and CDN diffing see no change. Writes go to
+# a temporary file next to the destination, which is then renamed over it, so
+# readers never see a half-written page. Returns True when the file was
+# written.
+def write_if_changed(dest_path: str, data: bytes) -> bool:
+    try:
+        if stat(dest_path).st_size == len(data):
+            with open(dest_path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+    directory, name = path.split(dest_path)
+    temp_path = path.join(directory, f".{name}.{getpid()}.{get_ident()}.tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        replace(temp_path, dest_path)
+    except BaseException:
+        if path.exists(temp_path):
+            remove(temp_path)
+        raise
+    return True
+
+
+# Text is encoded and written out in chunks of about this many characters.
+STREAM_CHUNK = 1 << 16
+
+
+# Writes a page handed over as a stream of text fragments, like
+# write_if_changed, but without ever holding the whole page: fragments go
+# straight to the temporary file, hashed along the way, and the existing file
+# is only compared by hash once the stream ends. Returns whether the file was
+# written, along with the sha256 digest and size of its bytes.
+def write_stream_if_changed(
+    dest_path: str,
+    fragments: Iterable[str]
+) -> tuple[bool, str, int]:
+    directory, name = path.split(dest_path)
+    temp_path = path.join(directory, f".{name}.{getpid()}.{get_ident()}.tmp")
+    digest = sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as f:
+            chunk: list[str] = []
+            chunk_length = 0
+            for fragment in fragments:
+                chunk.append(fragment)
+                chunk_length += len(fragment)
+                if chunk_length < STREAM_CHUNK:
+                    continue
+                data = "".join(chunk).encode()
+                f.write(data)
+                digest.update(data)
+                size += len(data)
+                chunk.clear()
+                chunk_length = 0
+            data = "".join(chunk).encode()
+            f.write(data)
+            digest.update(data)
+            size += len(data)
+        if same_file(dest_path, size, digest.hexdigest()):
+            remove(temp_path)
+            return False, digest.hexdigest(), size
+        replace(temp_path, dest_path)
+    except BaseException:
+        if path.exists(temp_path):
+            remove(temp_path)
+        raise
+    return True, digest.hexdigest(), size
+
+
+def same_file(file_path: str, size: int, hexdigest: str) -> bool:
+    try:
+        if stat(file_path).st_size != size:
+            return False
+        with open(file_path, "rb") as f:
+            return file_digest(f, "sha256").hexdigest() == hexdigest
+    except FileNotFoundError:
+        return False
+
+
+# Models the output stage of a build: pages are handed over as bytes and
+# written by a pool of threads, so rendering never waits on the disk. At most
+# max_pending writes are queued at once, which bounds the rendered pages held
+# in memory. Counts of written, skipped (identical) and failed files are kept
+# for the build summary (see buildlog).
+class OutputWriter():
+    def __init__(self, threads: int = 4, max_pending: int | None = None):
+        self.pool = ThreadPoolExecutor(
+            max_workers=threads,
+            thread_name_prefix="writer"
+        )
+        self.max_pending = max_pending or threads * 4
+        self.pending: deque[Future] = deque()
+        self.written = 0
+        self.skipped = 0
+        self.failed = 0
+        # Time spent writing, summed over every thread.
+        self.seconds = 0.0
+        self.lock = Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Queues data to be written to dest_path. The returned Future resolves to
+    # (written, seconds spent), or raises what the write raised.
+    def submit(self, dest_path: str, data: bytes) -> Future:
+        while len(self.pending) >= self.max_pending:
+            wait_quietly(self.pending.popleft())
+        future = self.pool.submit(self.write, dest_path, data)
+        self.pending.append(future)
+        return future
+
+    def write(self, dest_path: str, data: bytes) -> tuple[bool, float]:
+        start = perf_counter()
+        try:
+            written = write_if_changed(dest_path, data)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+                self.seconds += perf_counter() - start
+            raise
+        elapsed = perf_counter() - start
+        with self.lock:
+            self.seconds += elapsed
+            if written:
+                self.written += 1
+            else:
+                self.skipped += 1
+        return written, elapsed
+
+    # Writes a page streamed as text fragments (see write_stream_if_changed)
+    # right away, on the calling thread, counting it like any other write.
+    # The time counted includes producing the fragments.
+    def write_stream(
+        self,
+        dest_path: str,
+        fragments: Iterable[str]
+    ) -> tuple[bool, str, int]:
+        start = perf_counter()
+        try:
+            written, hexdigest, size = write_stream_if_changed(
+                dest_path,
+                fragments
+            )
+        except Exception:
+            with self.lock:
+                self.failed += 1
+                self.seconds += perf_counter() - start
+            raise
+        with self.lock:
+            self.seconds += perf_counter() - start
+            if written:
+                self.written += 1
+            else:
+                self.skipped += 1
+        return written, hexdigest, size
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+        self.pending.clear()
+
+
+def wait_quietly(future: Future) -> None:
+    # Errors are reported by whoever holds the future, not here.
+    future.exception()